@@ -1,19 +1,94 @@
 # app/routers/analyzer.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.code_analyzer import analyze_code
+import asyncio
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Response
+from typing import List, Optional
+from app.services.project_analyzer import analyze_project_async, read_project_uploads
+from app.services.analysis_session import get_session
+from app.services.code_analyzer import parse_sections
+from app.services.analysis_cache import analysis_cache, cache_key_from_digests, render_analysis
+from app.services.analysis_workers import AnalysisBusyError, analyze_files_and_render, run_in_pool, run_in_thread
+from app.services.stage_timing import record_stages, timed
+from app.services.upload_spool import UploadTooLargeError, spool_upload
 import traceback
 
 router = APIRouter(prefix="/analyze", tags=["analyzer"])
 
+def busy_response(error: AnalysisBusyError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
 @router.post("/")
-async def analyze(app_file: UploadFile = File(...), api_file: UploadFile = File(...)):
+async def analyze(
+    app_file: UploadFile = File(...),
+    api_file: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+    sections: Optional[str] = Query(None, description="Comma-separated response sections, all when omitted"),
+):
+    app_upload = api_upload = None
     try:
-        app_code = (await app_file.read()).decode('utf-8')
-        api_code = (await api_file.read()).decode('utf-8')
+        # only the extractors the requested sections need are run
+        requested_sections = parse_sections(sections)
+
+        # uploads are streamed to temp files; workers map them instead of receiving copies
+        with timed('upload'):
+            app_upload = await spool_upload(app_file)
+            api_upload = await spool_upload(api_file)
 
-        analysis_result = analyze_code(app_code, api_code)
-        return analysis_result
+        # with a session id, only the statements changed since that session's last upload are re-analyzed
+        if session_id:
+            result = await run_in_thread(
+                get_session(session_id).analyze_files, app_upload.path, api_upload.path, requested_sections
+            )
+            with timed('serialize'):
+                content = render_analysis(result)
+            return Response(content=content, media_type="application/json")
+
+        key = cache_key_from_digests(app_upload.digest, api_upload.digest, sections=requested_sections)
+        with timed('cache'):
+            content = analysis_cache.get_from_memory(key)
+            if content is None:
+                content = await asyncio.to_thread(analysis_cache.get_from_disk, key)
+        if content is None:
+            # parsing and walking happen in a worker process, off the event loop
+            content, cacheable, stages = await run_in_pool(
+                analyze_files_and_render, app_upload.path, api_upload.path, requested_sections
+            )
+            record_stages(stages)
+            if cacheable:
+                with timed('cache'):
+                    await asyncio.to_thread(analysis_cache.put, key, content)
+        return Response(content=content, media_type="application/json")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except AnalysisBusyError as e:
+        raise busy_response(e)
     except Exception as e:
         traceback.print_exc()  # Prints the stack trace to the console
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for upload in (app_upload, api_upload):
+            if upload is not None:
+                upload.remove()
+
+@router.post("/project")
+async def analyze_project(files: List[UploadFile] = File(...)):
+    """Analyze a whole project uploaded as zip/tar archives and/or individual .py files."""
+    try:
+        sources = await read_project_uploads(files)
+        return await analyze_project_async(sources)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AnalysisBusyError as e:
+        raise busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and occupancy of the analysis result cache."""
+    return analysis_cache.stats()
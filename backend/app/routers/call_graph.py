@@ -0,0 +1,91 @@
+# app/routers/call_graph.py
+
+import asyncio
+import traceback
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+
+from app.services.analysis_workers import AnalysisBusyError
+from app.services.call_graph import (
+    AmbiguousFunctionError, FunctionNotFoundError, build_call_graph, get_graph, graph_id_for, store_graph,
+)
+from app.services.project_analyzer import analyze_project_async, read_project_uploads
+from app.services.upload_spool import UploadTooLargeError
+from app.routers.analyzer import busy_response
+
+router = APIRouter(prefix="/callgraph", tags=["callgraph"])
+
+
+def lookup_graph(graph_id: str):
+    graph = get_graph(graph_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail=f"Call graph '{graph_id}' not found, upload the project again")
+    return graph
+
+
+def run_query(query, *args, **kwargs):
+    try:
+        return query(*args, **kwargs)
+    except FunctionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except AmbiguousFunctionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/")
+async def create_call_graph(files: List[UploadFile] = File(...)):
+    """Analyze a project (zip/tar archives and/or .py files) and build its cross-module call graph."""
+    try:
+        sources = await read_project_uploads(files)
+        graph_id = graph_id_for(sources)
+        graph = get_graph(graph_id)
+        if graph is None:
+            project = await analyze_project_async(sources)
+            graph = await asyncio.get_running_loop().run_in_executor(None, build_call_graph, project)
+            store_graph(graph_id, graph)
+        return {'graph_id': graph_id, **graph.stats()}
+    except AnalysisBusyError as e:
+        raise busy_response(e)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{graph_id}/callees")
+async def callees(graph_id: str, function: str):
+    """Functions called directly by function ('module.Class.name', or that without the module if only one function matches)."""
+    graph = lookup_graph(graph_id)
+    return {'function': function, 'callees': run_query(graph.callees, function)}
+
+
+@router.get("/{graph_id}/callers")
+async def callers(graph_id: str, function: str):
+    """Functions that call function directly."""
+    graph = lookup_graph(graph_id)
+    return {'function': function, 'callers': run_query(graph.callers, function)}
+
+
+@router.get("/{graph_id}/reachable")
+async def reachable(
+    graph_id: str,
+    function: str,
+    direction: str = Query("callees", pattern="^(callees|callers)$"),
+    max_depth: Optional[int] = Query(None, ge=1),
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    """Functions transitively reachable from function through calls (or through callers)."""
+    graph = lookup_graph(graph_id)
+    result = run_query(graph.reachable, function, reverse=direction == "callers", max_depth=max_depth, limit=limit)
+    return {'function': function, 'direction': direction, **result}
+
+
+@router.get("/{graph_id}/path")
+async def shortest_path(graph_id: str, source: str, target: str):
+    """Shortest call chain from source to target; path is null when target is unreachable."""
+    graph = lookup_graph(graph_id)
+    return {'source': source, 'target': target, 'path': run_query(graph.shortest_path, source, target)}
@@ -1,10 +1,14 @@
 # app/routers/gpt.py
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Response
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 import logging
-from app.services.gpt_analyzer import analyze_with_gpt, batch_analyze, storage
+from app.services.gpt_analyzer import analyze_with_gpt, batch_analyze, storage, stream_with_gpt
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import api_key_configured, get_llm_client
+from app.services.local_answers import can_answer_locally, local_answer_stats
+from app.services.sse import sse_response
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +26,7 @@ GPT_CONFIG = {
 class GPTRequest(BaseModel):
     analysis_data: Dict[str, Any] = Field(..., description="Code analysis data to be processed")
     question: str = Field(..., description="Question to be answered about the code")
+    bypass_cache: bool = Field(False, description="Ask GPT again instead of serving a cached answer")
     
     class Config:
         json_schema_extra = {
@@ -38,6 +43,7 @@ class GPTRequest(BaseModel):
 class BatchGPTRequest(BaseModel):
     analysis_data: Dict[str, Any] = Field(..., description="Code analysis data to be processed")
     questions: List[str] = Field(..., description="List of questions to be answered")
+    bypass_cache: bool = Field(False, description="Ask GPT again instead of serving cached answers")
 
 class ResponseFilter(BaseModel):
     start_date: Optional[str] = Field(None, description="Start date for filtering responses (YYYY-MM-DD)")
@@ -62,7 +68,7 @@ async def gpt_analyze(request: GPTRequest, background_tasks: BackgroundTasks):
                 detail="Both analysis_data and question are required"
             )
             
-        result = await analyze_with_gpt(request.analysis_data, request.question)
+        result = await analyze_with_gpt(request.analysis_data, request.question, not request.bypass_cache)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -82,10 +88,38 @@ async def gpt_analyze(request: GPTRequest, background_tasks: BackgroundTasks):
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+@router.post("/stream")
+async def gpt_analyze_stream(request: GPTRequest, background_tasks: BackgroundTasks):
+    """
+    Same as POST /gpt/, streamed as Server-Sent Events while GPT writes the answer:
+    - delta: {"text": ...} for each piece of the answer
+    - done: the saved response, as POST /gpt/ returns it
+    - error: {"detail": ...} if the answer could not be completed
+    """
+    logger.info(f"Received streamed analysis request with question: {request.question}")
+
+    if not request.analysis_data or not request.question:
+        raise HTTPException(
+            status_code=400,
+            detail="Both analysis_data and question are required"
+        )
+    # questions answered from the analysis data don't need the key
+    if not api_key_configured() and not can_answer_locally(request.analysis_data, request.question):
+        raise HTTPException(status_code=500, detail="OpenAI API key not found in environment variables.")
+
+    background_tasks.add_task(cleanup_old_responses)
+    return sse_response(stream_with_gpt(request.analysis_data, request.question, not request.bypass_cache))
+
 @router.post("/batch", response_model=List[Dict[str, Any]])
-async def batch_gpt_analyze(request: BatchGPTRequest):
+async def batch_gpt_analyze(request: BatchGPTRequest, response: Response):
     """
     Analyze multiple questions in parallel.
+
+    Repeated questions are asked once. A question that fails gets an entry with
+    an "error" instead of failing the batch; only a batch where every question
+    failed is an error. The X-LLM-Calls header reports how the answers were
+    obtained: from the analysis data, upstream calls, cache hits, calls joined
+    while another request had them in flight, and errors.
     
     Args:
         request (BatchGPTRequest): The request containing analysis_data and list of questions
@@ -102,10 +136,12 @@ async def batch_gpt_analyze(request: BatchGPTRequest):
                 detail="Both analysis_data and questions are required"
             )
             
-        results = await batch_analyze(request.analysis_data, request.questions)
+        calls = {}
+        results = await batch_analyze(request.analysis_data, request.questions, not request.bypass_cache, calls)
+        response.headers["X-LLM-Calls"] = ", ".join(f"{name}={count}" for name, count in calls.items())
         
-        if any("error" in result for result in results):
-            errors = [result["error"] for result in results if "error" in result]
+        if all("error" in result for result in results):
+            errors = [result["error"] for result in results]
             raise HTTPException(status_code=500, detail=str(errors))
             
         return results
@@ -120,6 +156,21 @@ async def batch_gpt_analyze(request: BatchGPTRequest):
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit rate, saved upstream latency and occupancy of the LLM response cache."""
+    return llm_cache.stats()
+
+@router.get("/local/stats")
+async def local_stats():
+    """Questions asked and the fraction answered from the analysis data without GPT."""
+    return local_answer_stats()
+
+@router.get("/scheduler/stats")
+async def scheduler_stats():
+    """Upstream calls, retries, throttling and the current concurrency limit of the LLM call scheduler."""
+    return get_llm_client().scheduler.stats()
+
 @router.get("/responses/{date}")
 async def get_responses_by_date(date: str):
     """
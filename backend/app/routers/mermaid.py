@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any
-from app.services.mermaid_generator import generate_mermaid_diagram
+from app.services.mermaid_generator import generate_mermaid_diagram, stream_mermaid_diagram
+from app.services.sse import sse_response
 import os
 import logging
 
@@ -14,6 +15,8 @@ router = APIRouter(prefix="/mermaid", tags=["mermaid"])
 class MermaidRequest(BaseModel):
     analysis_data: Dict[str, Any]
     diagram_type: str = "flowchart"
+    # ask GPT again instead of serving a cached diagram
+    bypass_cache: bool = False
 
 @router.post("/")
 async def mermaid_diagram(request: MermaidRequest):
@@ -34,10 +37,11 @@ async def mermaid_diagram(request: MermaidRequest):
         # Log analysis data structure
         logger.debug(f"Analysis data structure: {type(request.analysis_data)}")
         
-        result = generate_mermaid_diagram(
+        result = await generate_mermaid_diagram(
             analysis_data=request.analysis_data,
             api_key=openai_api_key,
-            diagram_type=request.diagram_type
+            diagram_type=request.diagram_type,
+            use_cache=not request.bypass_cache
         )
         
         # Log result
@@ -51,4 +55,22 @@ async def mermaid_diagram(request: MermaidRequest):
 
     except Exception as e:
         logger.exception("Error in mermaid_diagram endpoint")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def mermaid_diagram_stream(request: MermaidRequest):
+    """Same as POST /mermaid/, streamed as Server-Sent Events: delta events with
+    {"text": ...} while GPT writes the diagram, then done with the result or error."""
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="OpenAI API key not found in environment variables"
+        )
+
+    return sse_response(stream_mermaid_diagram(
+        analysis_data=request.analysis_data,
+        api_key=openai_api_key,
+        diagram_type=request.diagram_type,
+        use_cache=not request.bypass_cache
+    ))
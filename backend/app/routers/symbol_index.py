@@ -0,0 +1,93 @@
+# app/routers/symbol_index.py
+
+import asyncio
+import traceback
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+
+from app.services.analysis_workers import AnalysisBusyError
+from app.services.project_analyzer import analyze_project_async, read_project_uploads
+from app.services.symbol_index import get_index, source_digest
+from app.services.upload_spool import UploadTooLargeError
+from app.routers.analyzer import busy_response
+
+router = APIRouter(prefix="/index", tags=["index"])
+
+
+async def in_thread(func, *args):
+    # sqlite calls block, so they run off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+@router.post("/{project}")
+async def index_project(project: str, files: List[UploadFile] = File(...)):
+    """Analyze uploaded files (zip/tar archives and/or .py files) into the project's symbol index.
+
+    The upload is the whole project: files whose content is already indexed are skipped, changed
+    files replace their previous version, and indexed files missing from the upload are removed.
+    """
+    try:
+        sources = await read_project_uploads(files)
+
+        index = get_index()
+        indexed = await in_thread(index.digests, project)
+        digests = {path: source_digest(source) for path, source in sources.items()}
+        changed = {path: source for path, source in sources.items() if indexed.get(path) != digests[path]}
+
+        removed = 0
+        if changed or indexed.keys() - sources.keys():
+            entries = []
+            if changed:
+                analysis = await analyze_project_async(changed)
+                entries = [(path, digests[path], info) for path, info in analysis['files'].items()]
+            _, removed = await in_thread(index.replace_files, project, entries, list(sources))
+        return {'project': project, 'indexed': len(changed), 'unchanged': len(sources) - len(changed),
+                'removed': removed}
+    except AnalysisBusyError as e:
+        raise busy_response(e)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{project}")
+async def delete_project(project: str):
+    removed = await in_thread(get_index().remove_project, project)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Project '{project}' is not indexed")
+    return {'project': project, 'removed_files': removed}
+
+
+@router.get("/{project}/stats")
+async def project_stats(project: str):
+    return {'project': project, **await in_thread(get_index().stats, project)}
+
+
+@router.get("/{project}/functions")
+async def find_functions(project: str, q: Optional[str] = None, limit: int = Query(50, ge=1, le=1000)):
+    """Functions whose name contains the words of q as prefixes, e.g. q=user finds get_user_by_id."""
+    return {'project': project, 'functions': await in_thread(get_index().find_functions, project, q, limit)}
+
+
+@router.get("/{project}/classes")
+async def list_classes(project: str, q: Optional[str] = None, limit: int = Query(50, ge=1, le=1000)):
+    return {'project': project, 'classes': await in_thread(get_index().list_classes, project, q, limit)}
+
+
+@router.get("/{project}/importers")
+async def importers(project: str, module: str, limit: int = Query(50, ge=1, le=1000)):
+    """Files that import module (or a submodule, or module as a name from its package)."""
+    return {'project': project, 'module': module,
+            'importers': await in_thread(get_index().importers, project, module, limit)}
+
+
+@router.get("/{project}/callers")
+async def callers(project: str, function: str, limit: int = Query(50, ge=1, le=1000)):
+    """Call sites of function, matched by the name as written at the call."""
+    return {'project': project, 'function': function,
+            'callers': await in_thread(get_index().callers, project, function, limit)}
@@ -0,0 +1,200 @@
+# app/services/analysis_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any
+
+from app.services.code_analyzer import ANALYZER_VERSION
+from app.services.symbol_table import json_default
+
+try:
+    import orjson
+except ImportError:  # the json module produces the same bytes, only slower
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Configuring cache settings
+# resolved against the backend directory rather than wherever the server was started
+CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", str(Path(__file__).resolve().parents[2] / "storage" / "analysis_cache")))
+MEMORY_MAX_ENTRIES = 128
+DISK_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key_from_digests(app_digest: bytes, api_digest: bytes, version: str = ANALYZER_VERSION,
+                           sections=None) -> str:
+    """Content address of an analysis: the analyzer version and requested sections plus the SHA-256 of both uploads."""
+    if sections is not None:
+        version = f"{version}:{','.join(sorted(sections))}"
+    digest = hashlib.sha256()
+    digest.update(len(version).to_bytes(8, 'big'))
+    digest.update(version.encode('utf-8'))
+    digest.update(app_digest)
+    digest.update(api_digest)
+    return digest.hexdigest()
+
+
+def render_analysis(result: Dict[str, Any]) -> bytes:
+    """Serialize a build_analysis() result to the compact UTF-8 JSON FastAPI's JSONResponse would send.
+
+    Sets and records are encoded straight from the symbol tables; orjson, when
+    installed, does it in one native pass.
+    """
+    if orjson is not None:
+        return orjson.dumps(result, default=json_default)
+    return json.dumps(
+        result,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=json_default,
+    ).encode("utf-8")
+
+
+class AnalysisCache:
+    """Two-tier cache of rendered analysis responses: an in-memory LRU in front of a size-bounded directory."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, memory_max_entries: int = MEMORY_MAX_ENTRIES,
+                 disk_max_bytes: int = DISK_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_evictions': 0}
+
+        # key -> size in bytes, least recently used first
+        self.disk_index = OrderedDict()
+        self.disk_bytes = 0
+        if self.disk_max_bytes > 0:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk_index[key] = size
+            self.disk_bytes += size
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, content: bytes):
+        self.memory[key] = content
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_max_entries:
+            self.memory.popitem(last=False)
+
+    def _write_disk(self, key: str, content: bytes):
+        if self.disk_max_bytes <= 0 or len(content) > self.disk_max_bytes:
+            return
+        # the file is written without the lock, so lookups don't wait on the disk;
+        # each writer has its own temp file in case two store the same key
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing analysis cache entry: {str(e)}")
+            return
+
+        evicted = []
+        with self.lock:
+            self.disk_bytes += len(content) - self.disk_index.pop(key, 0)
+            self.disk_index[key] = len(content)
+            while self.disk_bytes > self.disk_max_bytes:
+                old_key, size = self.disk_index.popitem(last=False)
+                self.disk_bytes -= size
+                self.counters['disk_evictions'] += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+
+    def get_from_memory(self, key: str):
+        """Return the response bytes for key if they are in memory, or None without touching the disk."""
+        with self.lock:
+            content = self.memory.get(key)
+            if content is not None:
+                self.memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+            return content
+
+    def get_from_disk(self, key: str):
+        """Return the response bytes for key from disk, or None; the lookup after a get_from_memory() miss.
+
+        Blocks on the read, so the request path calls it on a thread.
+        """
+        with self.lock:
+            on_disk = key in self.disk_index
+        content = None
+        if on_disk:
+            path = self._path(key)
+            try:
+                content = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                content = None
+
+        with self.lock:
+            if content is None:
+                if on_disk and key in self.disk_index:
+                    self.disk_bytes -= self.disk_index.pop(key)
+                self.counters['misses'] += 1
+                return None
+            if key in self.disk_index:
+                self.disk_index.move_to_end(key)
+            self._remember(key, content)
+            self.counters['disk_hits'] += 1
+            return content
+
+    def put(self, key: str, content: bytes):
+        """Store content under key in memory and on disk.
+
+        Blocks on the disk write, so the request path calls it on a thread.
+        """
+        with self.lock:
+            self._remember(key, content)
+        self._write_disk(key, content)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+            hits = lookups - self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'disk_entries': len(self.disk_index),
+                'disk_bytes': self.disk_bytes,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            for key in list(self.disk_index):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self.disk_index.clear()
+            self.disk_bytes = 0
+
+
+# Initializing cache
+analysis_cache = AnalysisCache()
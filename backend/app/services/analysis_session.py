@@ -0,0 +1,268 @@
+# app/services/analysis_session.py
+
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from app.services.code_analyzer import ANALYSIS_BACKENDS, build_analysis, get_parser
+from app.services.stage_timing import timed
+from app.services.symbol_table import ClassInfo, SymbolTable
+
+MAX_SESSIONS = 32
+
+
+class TextEdit(NamedTuple):
+    """Replace source bytes [start_byte, old_end_byte) with new_text."""
+    start_byte: int
+    old_end_byte: int
+    new_text: str
+
+
+def _point_at(source: bytes, offset: int) -> tuple:
+    row = source.count(b'\n', 0, offset)
+    return (row, offset - (source.rfind(b'\n', 0, offset) + 1))
+
+
+def _common_prefix_length(old: bytes, new: bytes) -> int:
+    # binary search over slice comparisons keeps the byte loop in C
+    lo, hi = 0, min(len(old), len(new))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_length(old: bytes, new: bytes, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def merge_fragments(root_type: str, fragments: List[SymbolTable]) -> SymbolTable:
+    """Combine per-statement symbol tables into what walk() returns for the whole module.
+
+    Top-level statements always start and end with no current function or
+    class, so walking them one by one and merging in document order gives the
+    same lists, counts and mappings as walking the module in one go.
+    """
+    merged = SymbolTable()
+    merged.node_types[root_type] = 1
+
+    node_types = merged.node_types
+    class_hierarchy = merged.class_hierarchy
+    for fragment in fragments:
+        for node_type, count in fragment.node_types.items():
+            node_types[node_type] = node_types.get(node_type, 0) + count
+        for class_name, hierarchy in fragment.class_hierarchy.items():
+            merged_hierarchy = class_hierarchy.get(class_name)
+            if merged_hierarchy is None:
+                merged_hierarchy = class_hierarchy[class_name] = ClassInfo()
+            merged_hierarchy.methods.extend(hierarchy.methods)
+            merged_hierarchy.parent_classes.extend(hierarchy.parent_classes)
+
+        merged.functions.update(fragment.functions)
+        merged.classes.extend(fragment.classes)
+        merged.function_calls.extend(fragment.function_calls)
+        merged.imports.extend(fragment.imports)
+        merged.relationships.extend(fragment.relationships)
+        merged.api_calls.extend(fragment.api_calls)
+        merged.decorated_functions.extend(fragment.decorated_functions)
+        merged.imported_functions.update(fragment.imported_functions)
+        merged.imported_modules.update(fragment.imported_modules)
+        merged.async_functions.update(fragment.async_functions)
+        merged.error_handling.update(fragment.error_handling)
+        # a later definition with the same name resets its dependencies, as in walk()
+        merged.function_dependencies.update(fragment.function_dependencies)
+        merged.function_metrics.update(fragment.function_metrics)
+
+    return merged
+
+
+class IncrementalFile:
+    """Parse tree and per-statement analysis of one file, updated in place on edits."""
+
+    def __init__(self, backend: str = 'walker'):
+        self.extract = ANALYSIS_BACKENDS[backend]
+        self.source = b''
+        self.tree = None
+        self.fragments = []
+        self.reanalyzed_statements = 0
+
+    def _extract_statement(self, node) -> SymbolTable:
+        return self.extract(node, self.source)
+
+    def _full_analysis(self):
+        with timed('parse'):
+            self.tree = get_parser().parse(self.source)
+        with timed('walk'):
+            self.fragments = [self._extract_statement(child) for child in self.tree.root_node.children]
+        self.reanalyzed_statements = len(self.fragments)
+
+    def update(self, new_source: bytes):
+        """Replace the whole source, re-analyzing only what differs from the previous version."""
+        if self.tree is None:
+            self.source = new_source
+            self._full_analysis()
+            return
+
+        old_source = self.source
+        prefix = _common_prefix_length(old_source, new_source)
+        suffix = _common_suffix_length(old_source, new_source, min(len(old_source), len(new_source)) - prefix)
+        if prefix == len(old_source) == len(new_source):
+            self.reanalyzed_statements = 0
+            return
+        self._apply_byte_edits([(prefix, len(old_source) - suffix, new_source[prefix:len(new_source) - suffix])])
+
+    def apply_edits(self, edits: List[TextEdit]):
+        """Apply byte-offset edits in order, then reparse reusing the previous tree."""
+        if self.tree is None:
+            raise ValueError("apply_edits needs a previous analysis, call update() first")
+        self._apply_byte_edits([(edit.start_byte, edit.old_end_byte, edit.new_text.encode('utf-8')) for edit in edits])
+
+    def _apply_byte_edits(self, edits):
+        if not edits:
+            self.reanalyzed_statements = 0
+            return
+
+        # tree.edit() shifts the old nodes, so remember where statements were first
+        old_spans = [(child.type, child.start_byte, child.end_byte) for child in self.tree.root_node.children]
+        old_length = len(self.source)
+        # the untouched head and tail of the file, measured from each end
+        prefix = suffix = None
+        source = self.source
+        for start_byte, old_end_byte, new_bytes in edits:
+            if not 0 <= start_byte <= old_end_byte <= len(source):
+                raise ValueError(f"Edit range {start_byte}-{old_end_byte} is outside the source")
+            new_end_byte = start_byte + len(new_bytes)
+            new_source = source[:start_byte] + new_bytes + source[old_end_byte:]
+            self.tree.edit(
+                start_byte=start_byte,
+                old_end_byte=old_end_byte,
+                new_end_byte=new_end_byte,
+                start_point=_point_at(source, start_byte),
+                old_end_point=_point_at(source, old_end_byte),
+                new_end_point=_point_at(new_source, new_end_byte),
+            )
+            edit_suffix = len(source) - old_end_byte
+            prefix = start_byte if prefix is None else min(prefix, start_byte)
+            suffix = edit_suffix if suffix is None else min(suffix, edit_suffix)
+            source = new_source
+
+        with timed('parse'):
+            new_tree = get_parser().parse(source, self.tree)
+        if self.tree.root_node.has_error or new_tree.root_node.has_error:
+            # error recovery can differ between incremental and fresh parses and
+            # can pull unchanged statements into ERROR nodes, so start over
+            self.source = source
+            self._full_analysis()
+            return
+        for changed in self.tree.changed_ranges(new_tree):
+            prefix = min(prefix, changed.start_byte)
+            suffix = min(suffix, len(source) - changed.end_byte)
+        self.source = source
+        self.tree = new_tree
+        self._reuse_fragments(old_spans, old_length, prefix, suffix)
+
+    def _reuse_fragments(self, old_spans, old_length, prefix, suffix):
+        new_children = self.tree.root_node.children
+        new_length = len(self.source)
+
+        # statements entirely before the first edit keep their position
+        head = 0
+        while head < len(old_spans) and head < len(new_children):
+            new_child = new_children[head]
+            if new_child.end_byte >= prefix or old_spans[head] != (new_child.type, new_child.start_byte, new_child.end_byte):
+                break
+            head += 1
+
+        # statements entirely after the last edit moved by the same amount as the file end
+        tail = 0
+        while tail < len(old_spans) - head and tail < len(new_children) - head:
+            old_type, old_start, old_end = old_spans[-1 - tail]
+            new_child = new_children[-1 - tail]
+            if (new_length - new_child.start_byte >= suffix
+                    or old_type != new_child.type
+                    or old_length - old_start != new_length - new_child.start_byte
+                    or old_length - old_end != new_length - new_child.end_byte):
+                break
+            tail += 1
+
+        changed_children = new_children[head:len(new_children) - tail]
+        with timed('walk'):
+            changed_fragments = [self._extract_statement(child) for child in changed_children]
+        self.fragments = self.fragments[:head] + changed_fragments + self.fragments[len(self.fragments) - tail:]
+        self.reanalyzed_statements = len(changed_children)
+
+    def collected_info(self) -> SymbolTable:
+        with timed('merge'):
+            return merge_fragments(self.tree.root_node.type, self.fragments)
+
+
+class AnalysisSession:
+    """Keeps the previous app.py/api.py trees so re-uploads only re-analyze changed statements."""
+
+    def __init__(self, backend: str = 'walker'):
+        if backend not in ANALYSIS_BACKENDS:
+            raise ValueError(f"Unknown analysis backend '{backend}', expected one of {list(ANALYSIS_BACKENDS)}")
+        self.app = IncrementalFile(backend)
+        self.api = IncrementalFile(backend)
+        self.lock = threading.Lock()
+
+    def analyze(self, app_code: str, api_code: str) -> dict:
+        """Same result as analyze_code(), computed incrementally against the last call."""
+        return self.analyze_sources(app_code.encode('utf-8'), api_code.encode('utf-8'))
+
+    def analyze_sources(self, app_source: bytes, api_source: bytes, sections=None) -> dict:
+        """analyze() for UTF-8 encoded sources, optionally limited to some response sections."""
+        try:
+            with self.lock:
+                self.app.update(app_source)
+                self.api.update(api_source)
+                return build_analysis(self.app.collected_info(), self.api.collected_info(), sections)
+        except Exception as e:
+            return {'error': str(e)}
+
+    def analyze_files(self, app_path: str, api_path: str, sections=None) -> dict:
+        """analyze_sources() for sources spooled to files, read on the calling thread."""
+        with open(app_path, 'rb') as f:
+            app_source = f.read()
+        with open(api_path, 'rb') as f:
+            api_source = f.read()
+        return self.analyze_sources(app_source, api_source, sections)
+
+    def apply_edits(self, app_edits: Optional[List[TextEdit]] = None, api_edits: Optional[List[TextEdit]] = None) -> dict:
+        """Apply byte-offset edits to the previously analyzed sources and return the updated analysis."""
+        try:
+            with self.lock:
+                if app_edits:
+                    self.app.apply_edits(app_edits)
+                if api_edits:
+                    self.api.apply_edits(api_edits)
+                return build_analysis(self.app.collected_info(), self.api.collected_info())
+        except Exception as e:
+            return {'error': str(e)}
+
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_session(session_id: str) -> AnalysisSession:
+    """Return the session for session_id, creating it and evicting the least recently used one if needed."""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = _sessions[session_id] = AnalysisSession()
+            if len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(session_id)
+        return session
@@ -0,0 +1,136 @@
+# app/services/analysis_workers.py
+
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.services.analysis_cache import render_analysis
+from app.services.code_analyzer import analyze_sources, get_parser, walk
+from app.services.stage_timing import collect_stages, timed
+from app.services.upload_spool import map_source
+
+logger = logging.getLogger(__name__)
+
+# Configuring worker settings
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+# jobs allowed to wait for a free worker before new ones are turned away with 429
+ANALYSIS_QUEUE_DEPTH = int(os.getenv("ANALYSIS_QUEUE_DEPTH", "8"))
+
+_pool = None
+_pool_workers = 0
+# stateful work (incremental sessions) has to stay in this process
+_threads = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+
+class AnalysisBusyError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis workers are saturated, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AnalysisLimiter:
+    """Counts analysis jobs that are running or waiting and rejects new ones past the queue depth.
+
+    Only touched from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.in_flight = 0
+        self.rejected = 0
+        # moving average of job duration, used for Retry-After
+        self.average_seconds = 1.0
+
+    def retry_after(self) -> int:
+        waves = self.in_flight / max(1, self.workers)
+        return max(1, math.ceil(waves * self.average_seconds))
+
+    @contextmanager
+    def admit(self):
+        if self.in_flight >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise AnalysisBusyError(self.retry_after())
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * (time.perf_counter() - start)
+
+
+limiter = AnalysisLimiter(ANALYSIS_WORKERS, ANALYSIS_QUEUE_DEPTH)
+
+
+def _init_worker():
+    # building this process's parser and warming up the walk code path before the first real task
+    source = b"import os\n\ndef warm_up(x):\n    return os.path.join(x)\n"
+    walk(get_parser().parse(source).root_node, source)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def start_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Create the worker pool and make every worker start up (and build its parser) right away."""
+    global _pool, _pool_workers
+    if _pool is None:
+        _pool_workers = max_workers or ANALYSIS_WORKERS
+        _pool = ProcessPoolExecutor(max_workers=_pool_workers, initializer=_init_worker)
+        # one task per worker forces all of them to spawn now rather than on the first upload
+        for future in [_pool.submit(_warm_up) for _ in range(_pool_workers)]:
+            future.result()
+        logger.info(f"Started analysis pool with {_pool_workers} workers")
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def pool_workers() -> int:
+    start_pool()
+    return _pool_workers
+
+
+def analyze_files_and_render(app_path: str, api_path: str, sections=None) -> Tuple[bytes, bool, List[Tuple[str, float]]]:
+    """Analyze two spooled uploads in a worker and return the rendered response, whether it may be cached
+    and the stages timed along the way.
+
+    Both files are memory-mapped, so the sources never cross the process boundary.
+    """
+    with collect_stages() as stages:
+        with map_source(app_path) as app_source, map_source(api_path) as api_source:
+            result = analyze_sources(app_source, api_source, sections=sections)
+        with timed('serialize'):
+            content = render_analysis(result)
+    return content, 'error' not in result, stages
+
+
+async def run_in_pool(func: Callable[..., Any], *args) -> Any:
+    """Run a picklable function in the process pool, subject to the queue limit."""
+    with limiter.admit():
+        return await asyncio.get_running_loop().run_in_executor(start_pool(), func, *args)
+
+
+async def run_in_thread(func: Callable[..., Any], *args) -> Any:
+    """Run a function on an analysis thread, subject to the queue limit."""
+    with limiter.admit():
+        # like asyncio.to_thread, so stage timers on the thread still see the current request
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await asyncio.get_running_loop().run_in_executor(_threads, call)
@@ -0,0 +1,267 @@
+# app/services/call_graph.py
+
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.project_analyzer import resolve_module
+
+MAX_GRAPHS = 16
+# cap on the functions a reachability query returns, which also bounds its work
+DEFAULT_REACHABLE_LIMIT = 1000
+
+
+class FunctionNotFoundError(KeyError):
+    pass
+
+
+class AmbiguousFunctionError(ValueError):
+    pass
+
+
+def _enclosing_class(caller: str, defined: set) -> Optional[str]:
+    """Class a method, or a function nested in one, is defined in: the innermost enclosing name that isn't a function."""
+    scope = caller.rpartition('.')[0]
+    while scope:
+        if scope not in defined:
+            return scope
+        scope = scope.rpartition('.')[0]
+    return None
+
+
+def _resolve_call(callee: str, caller: str, module: str, path: str, info: Dict[str, Any],
+                  original_names: Dict[str, str], modules: Dict[str, str], functions: Dict[str, set]) -> Optional[str]:
+    """Qualified name of the project function a call expression in caller, a function of module, refers to, or None.
+
+    Functions are named within their module by their enclosing definitions, e.g.
+    'Client.get'. original_names maps names bound by "from x import y as z" to
+    the imported name.
+    """
+    defined = functions[module]
+    if '.' not in callee:
+        # functions nested in the caller or the functions around it shadow the module's; class bodies don't
+        scope = caller
+        while scope:
+            if scope in defined and f"{scope}.{callee}" in defined:
+                return f"{module}.{scope}.{callee}"
+            scope = scope.rpartition('.')[0]
+        if callee in defined:
+            return f"{module}.{callee}"
+        imported_from = info['imported_functions'].get(callee)
+        if imported_from is None:
+            return None
+        target = resolve_module(path, imported_from, modules)
+        original = original_names.get(callee, callee)
+        if target is not None and original in functions[target]:
+            return f"{target}.{original}"
+        return None
+
+    prefix, _, name = callee.rpartition('.')
+    if prefix in ('self', 'cls'):
+        class_name = _enclosing_class(caller, defined)
+        if class_name is not None and f"{class_name}.{name}" in defined:
+            return f"{module}.{class_name}.{name}"
+        return None
+
+    imported = info['imported_modules'].get(prefix)
+    if imported is not None:
+        target = resolve_module(path, imported, modules)
+    elif prefix in info['imported_functions']:
+        # "from pkg import mod" followed by mod.func()
+        package = info['imported_functions'][prefix]
+        separator = '' if package.endswith('.') else '.'
+        target = resolve_module(path, f"{package}{separator}{original_names.get(prefix, prefix)}", modules)
+    else:
+        return None
+    if target is not None and name in functions[target]:
+        return f"{target}.{name}"
+    return None
+
+
+class CallGraph:
+    """Call graph of a whole project in CSR form.
+
+    Functions are numbered 0..n-1 in name order. The callees of function i are
+    targets[offsets[i]:offsets[i + 1]], and the reverse arrays hold the callers
+    the same way, so neighbour lookups are two array reads and a slice.
+    """
+
+    def __init__(self, names: List[str], edges: List[Tuple[int, int]], unresolved_calls: int = 0):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        # bare function name -> ids, for looking functions up without their module
+        self.by_short_name = {}
+        for i, name in enumerate(names):
+            self.by_short_name.setdefault(name.rpartition('.')[2], []).append(i)
+        self.unresolved_calls = unresolved_calls
+
+        edges = sorted(set(edges))
+        self.offsets, self.targets = self._csr(len(names), edges)
+        self.reverse_offsets, self.reverse_targets = self._csr(len(names), sorted((b, a) for a, b in edges))
+
+    @staticmethod
+    def _csr(node_count: int, edges: List[Tuple[int, int]]) -> Tuple[array, array]:
+        offsets = array('l', [0]) * (node_count + 1)
+        for source, _ in edges:
+            offsets[source + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+        targets = array('l', [target for _, target in edges])
+        return offsets, targets
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def resolve(self, name: str) -> int:
+        """Node id of a qualified name, or of a name without its module (e.g. 'run' or 'Client.run') that only one function has."""
+        node = self.index.get(name)
+        if node is not None:
+            return node
+        suffix = '.' + name
+        candidates = [i for i in self.by_short_name.get(name.rpartition('.')[2], []) if self.names[i].endswith(suffix)]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            raise AmbiguousFunctionError(
+                f"'{name}' is defined in several places: {', '.join(self.names[i] for i in candidates)}"
+            )
+        raise FunctionNotFoundError(f"Function '{name}' not found in the call graph")
+
+    def _neighbours(self, node: int, reverse: bool = False) -> array:
+        if reverse:
+            return self.reverse_targets[self.reverse_offsets[node]:self.reverse_offsets[node + 1]]
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def callees(self, name: str) -> List[str]:
+        return [self.names[i] for i in self._neighbours(self.resolve(name))]
+
+    def callers(self, name: str) -> List[str]:
+        return [self.names[i] for i in self._neighbours(self.resolve(name), reverse=True)]
+
+    def reachable(self, name: str, reverse: bool = False, max_depth: Optional[int] = None,
+                  limit: int = DEFAULT_REACHABLE_LIMIT) -> Dict[str, Any]:
+        """Functions transitively called by name (or calling it, with reverse), breadth first.
+
+        Stops after limit functions; 'truncated' tells whether there were more.
+        """
+        start = self.resolve(name)
+        offsets, targets = (self.reverse_offsets, self.reverse_targets) if reverse else (self.offsets, self.targets)
+        seen = bytearray(len(self.names))
+        seen[start] = 1
+        found = []
+        frontier = [start]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbour in targets[offsets[node]:offsets[node + 1]]:
+                    if not seen[neighbour]:
+                        seen[neighbour] = 1
+                        if len(found) == limit:
+                            return {'functions': [self.names[i] for i in found], 'truncated': True}
+                        found.append(neighbour)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return {'functions': [self.names[i] for i in found], 'truncated': False}
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """Shortest chain of calls from source to target, found by bidirectional BFS, or None."""
+        start, goal = self.resolve(source), self.resolve(target)
+        if start == goal:
+            return [self.names[start]]
+
+        # parents of the nodes each search has reached; -1 marks its root
+        forward = {start: -1}
+        backward = {goal: -1}
+        forward_frontier, backward_frontier = [start], [goal]
+        while forward_frontier and backward_frontier:
+            # expand the smaller side
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand(forward_frontier, forward, backward, reverse=False)
+            else:
+                backward_frontier, meeting = self._expand(backward_frontier, backward, forward, reverse=True)
+            if meeting is not None:
+                path = []
+                node = meeting
+                while node != -1:
+                    path.append(node)
+                    node = forward[node]
+                path.reverse()
+                node = backward[meeting]
+                while node != -1:
+                    path.append(node)
+                    node = backward[node]
+                return [self.names[i] for i in path]
+        return None
+
+    def _expand(self, frontier: List[int], parents: Dict[int, int], other: Dict[int, int], reverse: bool):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in self._neighbours(node, reverse):
+                if neighbour in parents:
+                    continue
+                parents[neighbour] = node
+                if neighbour in other:
+                    return next_frontier, neighbour
+                next_frontier.append(neighbour)
+        return next_frontier, None
+
+    def stats(self) -> Dict[str, int]:
+        return {'functions': len(self.names), 'edges': self.edge_count, 'unresolved_calls': self.unresolved_calls}
+
+
+def build_call_graph(project: Dict[str, Any]) -> CallGraph:
+    """Resolve every module's function_dependencies across the project returned by merge_project()."""
+    modules = project['modules']
+    files = project['files']
+    functions = {module: set(files[path]['function_dependencies']) for module, path in modules.items()}
+
+    names = sorted(f"{module}.{function}" for module, defined in functions.items() for function in defined)
+    index = {name: i for i, name in enumerate(names)}
+    edges = []
+    unresolved = 0
+    for module, path in modules.items():
+        info = files[path]
+        original_names = {imp['alias']: imp['name'] for imp in info['imports'] if 'alias' in imp and 'name' in imp}
+        for function, callees in info['function_dependencies'].items():
+            source = index[f"{module}.{function}"]
+            for callee in callees:
+                target = _resolve_call(callee, function, module, path, info, original_names, modules, functions)
+                if target is None:
+                    unresolved += 1
+                else:
+                    edges.append((source, index[target]))
+    return CallGraph(names, edges, unresolved)
+
+
+def graph_id_for(sources: Dict[str, bytes]) -> str:
+    """Content address of a project, so re-uploading the same files finds the existing graph."""
+    digest = hashlib.sha256()
+    for path in sorted(sources):
+        digest.update(path.encode('utf-8') + b'\0')
+        digest.update(hashlib.sha256(sources[path]).digest())
+    return digest.hexdigest()[:32]
+
+
+_graphs = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def store_graph(graph_id: str, graph: CallGraph):
+    with _graphs_lock:
+        _graphs[graph_id] = graph
+        _graphs.move_to_end(graph_id)
+        while len(_graphs) > MAX_GRAPHS:
+            _graphs.popitem(last=False)
+
+
+def get_graph(graph_id: str) -> Optional[CallGraph]:
+    with _graphs_lock:
+        graph = _graphs.get(graph_id)
+        if graph is not None:
+            _graphs.move_to_end(graph_id)
+        return graph
@@ -2,38 +2,73 @@ import tree_sitter_python as tspython
 from tree_sitter import Language, Parser
 import os
 import json
+import sys
+import threading
+from functools import lru_cache
+
+from app.services.symbol_table import (
+    ApiCall, ClassInfo, DecoratedFunction, Decorator, FunctionMetrics, Import, OrderedSet, Parameter, Relationship,
+    Scope, SymbolTable,
+)
+from app.services.route_index import HTTP_METHODS, RouteIndex, url_path
+from app.services.source_view import SourceView
+from app.services.stage_timing import timed
+
+# Bump whenever the analysis output changes, so cached results are not reused
+ANALYZER_VERSION = "5"
 
 # Initializing the language
 PY_LANGUAGE = Language(tspython.language())
-parser = Parser(PY_LANGUAGE)
 
-def get_node_text(node, source_code):
-    return source_code[node.start_byte:node.end_byte].decode('utf-8')
+# Parsers are not thread-safe, so analysis running on worker threads gets its own
+_thread_state = threading.local()
+
+def get_parser():
+    thread_parser = getattr(_thread_state, 'parser', None)
+    if thread_parser is None:
+        thread_parser = _thread_state.parser = Parser(PY_LANGUAGE)
+    return thread_parser
+
+@lru_cache(maxsize=None)
+def structure_query(node_types):
+    """One compiled query capturing every node of the given types, so the matching happens in C.
+
+    Types the grammar does not have (e.g. async_function_definition) are left out.
+    """
+    patterns = [
+        f"({node_type}) @{node_type}"
+        for node_type in sorted(node_types)
+        if PY_LANGUAGE.id_for_node_kind(node_type, True) is not None
+    ]
+    return PY_LANGUAGE.query("\n".join(patterns))
+
+# Node types whose end leave_node reacts to
+SCOPE_TYPES = frozenset(['class_definition'])
+
+# Byte suffixes of attribute calls that look like HTTP requests, e.g. b'.get'
+HTTP_CALL_SUFFIXES = tuple(b'.' + method.encode('ascii') for method in sorted(HTTP_METHODS))
 
 def extract_function_parameters(func_node, source_code):
     parameters = []
     params_node = func_node.child_by_field_name('parameters')
     if params_node:
         for param in params_node.named_children:
-            param_info = {'name': get_node_text(param, source_code)}
+            param_type = param.type
+            # the whole parameter's text is only decoded when it has no name field
+            name_node = param.child_by_field_name('name') if param_type in ('typed_parameter', 'default_parameter') else None
+            param_info = Parameter(source_code.identifier(name_node or param))
             
          
-            if param.type == 'typed_parameter':
-                name_node = param.child_by_field_name('name')
+            if param_type == 'typed_parameter':
                 type_node = param.child_by_field_name('type')
-                if name_node:
-                    param_info['name'] = get_node_text(name_node, source_code)
                 if type_node:
-                    param_info['type'] = get_node_text(type_node, source_code)
+                    param_info.type = source_code.identifier(type_node)
             
           
-            if param.type == 'default_parameter':
-                name_node = param.child_by_field_name('name')
+            if param_type == 'default_parameter':
                 value_node = param.child_by_field_name('value')
-                if name_node:
-                    param_info['name'] = get_node_text(name_node, source_code)
                 if value_node:
-                    param_info['default'] = get_node_text(value_node, source_code)
+                    param_info.default = source_code.text(value_node)
             
             parameters.append(param_info)
     return parameters
@@ -42,104 +77,105 @@ def handle_imports(node, source_code, collected_info):
     if node.type == 'import_statement':
         for child in node.named_children:
             if child.type == 'dotted_name':
-                module_name = get_node_text(child, source_code)
-                collected_info['imports'].append({'module': module_name})
+                module_name = source_code.identifier(child)
+                collected_info.imports.append(Import(module_name))
+                collected_info.imported_modules[module_name] = module_name
             elif child.type == 'aliased_import':
                 module_name_node = child.child_by_field_name('name')
                 alias_node = child.child_by_field_name('alias')
                 if module_name_node:
-                    module_name = get_node_text(module_name_node, source_code)
+                    module_name = source_code.identifier(module_name_node)
                     if alias_node:
-                        alias = get_node_text(alias_node, source_code)
-                        collected_info['imports'].append({'module': module_name, 'alias': alias})
+                        alias = source_code.identifier(alias_node)
+                        collected_info.imports.append(Import(module_name, alias=alias))
+                        collected_info.imported_modules[alias] = module_name
                     else:
-                        collected_info['imports'].append({'module': module_name})
+                        collected_info.imports.append(Import(module_name))
+                        collected_info.imported_modules[module_name] = module_name
     elif node.type == 'import_from_statement':
-        module_name_node = node.child_by_field_name('module')
-        names_node = node.child_by_field_name('names')
-        if module_name_node and names_node:
-            module_name = get_node_text(module_name_node, source_code)
-            for child in names_node.named_children:
-                imported_name = get_node_text(child, source_code)
-                collected_info['imports'].append({'module': module_name, 'name': imported_name})
-                collected_info['imported_functions'][imported_name] = module_name
-
-def handle_decorated_function(node, source_code, collected_info):
-    decorator_nodes = []
-    current_node = node
-    
-    # collecting all decorator nodes
-    while current_node.type == 'decorated_definition':
-        decorator_node = current_node.child_by_field_name('decorator')
-        if decorator_node:
-            decorator_nodes.append(decorator_node)
-        current_node = current_node.child_by_field_name('definition')
-    
-    # getting the actual function node
-    if not current_node or current_node.type not in ['function_definition', 'async_function_definition']:
+        module_name_node = node.child_by_field_name('module_name')
+        if module_name_node:
+            module_name = source_code.identifier(module_name_node)
+            for child in node.children_by_field_name('name'):
+                if child.type == 'aliased_import':
+                    name_node = child.child_by_field_name('name')
+                    alias_node = child.child_by_field_name('alias')
+                    if not name_node or not alias_node:
+                        continue
+                    imported_name = source_code.identifier(name_node)
+                    local_name = source_code.identifier(alias_node)
+                    collected_info.imports.append(Import(module_name, alias=local_name, name=imported_name))
+                else:
+                    imported_name = local_name = source_code.identifier(child)
+                    collected_info.imports.append(Import(module_name, name=imported_name))
+                # local name -> module it was imported from
+                collected_info.imported_functions[local_name] = module_name
+
+def read_decorator(decorator_node, source_code):
+    # finding the identifier node (skipping the @ symbol)
+    for child in decorator_node.children:
+        if child.type in ('identifier', 'attribute'):
+            return Decorator(source_code.identifier(child))
+        elif child.type == 'call':
+            func_node = child.child_by_field_name('function')
+            if func_node:
+                decorator_info = Decorator(source_code.identifier(func_node))
+                args_node = child.child_by_field_name('arguments')
+                if args_node:
+                    for arg in args_node.named_children:
+                        decorator_info.arguments.append(source_code.text(arg))
+                return decorator_info
+    return None
+
+# A decorated_definition is visited before its decorators, which come before the
+# definition itself. Decorators are collected as they are visited and attached
+# to the function_definition that follows, so every node is read once.
+def enter_decorated(node, source_code, collected_info):
+    collected_info.pending_decorators = []
+
+def enter_decorator(node, source_code, collected_info):
+    if collected_info.pending_decorators is not None:
+        decorator_info = read_decorator(node, source_code)
+        if decorator_info is not None:
+            collected_info.pending_decorators.append(decorator_info)
+
+def finish_decorated_function(node, source_code, collected_info):
+    decorators = collected_info.pending_decorators
+    if decorators is None:
         return
-    
-    
-    name_node = current_node.child_by_field_name('name')
+    collected_info.pending_decorators = None
+
+    name_node = node.child_by_field_name('name')
     if not name_node:
         return
-        
-    function_info = {
-        'name': get_node_text(name_node, source_code),
-        'decorators': [],
-        'is_async': current_node.type == 'async_function_definition',
-        'parameters': extract_function_parameters(current_node, source_code)
-    }
-    
-    # processing each decorator
-    for decorator_node in decorator_nodes:
-        # finding the identifier node (skipping the @ symbol)
-        for child in decorator_node.children:
-            if child.type == 'identifier':
-                function_info['decorators'].append({
-                    'name': get_node_text(child, source_code),
-                    'arguments': []
-                })
-                break
-            elif child.type == 'call':
-                func_node = child.child_by_field_name('function')
-                if func_node:
-                    decorator_name = get_node_text(func_node, source_code)
-                    decorator_info = {
-                        'name': decorator_name,
-                        'arguments': []
-                    }
-                    
-                 
-                    args_node = child.child_by_field_name('arguments')
-                    if args_node:
-                        for arg in args_node.named_children:
-                            arg_text = get_node_text(arg, source_code)
-                            decorator_info['arguments'].append(arg_text)
-                            
-                    function_info['decorators'].append(decorator_info)
-                    break
-    
 
-    collected_info['decorated_functions'].append(function_info)
+    function_info = DecoratedFunction(
+        source_code.identifier(name_node),
+        node.type == 'async_function_definition',
+        extract_function_parameters(node, source_code)
+    )
+    function_info.decorators = decorators
+
+    collected_info.decorated_functions.append(function_info)
     
  
-    if function_info['name'] not in collected_info['functions']:
-        collected_info['functions'].append(function_info['name'])
+    collected_info.functions.add(function_info.name)
+
+def drop_decorators(node, source_code, collected_info):
+    # decorated classes are not reported
+    collected_info.pending_decorators = None
 
 def analyze_api_calls(node, source_code, collected_info):
     if node.type == 'call':
         func_node = node.child_by_field_name('function')
-        if func_node:
-            func_name = get_node_text(func_node, source_code)
+        # checked on the raw bytes, so only calls that look like requests are decoded here
+        if func_node and source_code.endswith(func_node, HTTP_CALL_SUFFIXES):
+            func_name = source_code.identifier(func_node)
             
            
-            if any(func_name.endswith(method) for method in ['.post', '.get', '.put', '.delete']):
-                call_info = {
-                    'client_library': func_name.split('.')[0],
-                    'method': func_name.split('.')[-1],
-                    'arguments': {}
-                }
+            client_library, _, method = func_name.rpartition('.')
+            if client_library and method in HTTP_METHODS:
+                call_info = ApiCall(sys.intern(func_name.split('.')[0]), sys.intern(method))
                 
                 args_node = node.child_by_field_name('arguments')
                 if args_node:
@@ -148,184 +184,326 @@ def analyze_api_calls(node, source_code, collected_info):
                             key_node = arg.child_by_field_name('name')
                             value_node = arg.child_by_field_name('value')
                             if key_node and value_node:
-                                key = get_node_text(key_node, source_code)
-                                value = get_node_text(value_node, source_code)
-                                call_info['arguments'][key] = value
-                        elif arg.type == 'string':
-                            url = get_node_text(arg, source_code)
-                            if 'url' not in call_info['arguments'] and ('ask_url' in url or 'ask_file' in url):
-                                call_info['arguments']['url'] = url
-                                call_info['endpoint'] = url.split('/')[-1]
+                                key = source_code.identifier(key_node)
+                                value = source_code.text(value_node)
+                                call_info.arguments[key] = value
+                                if key == 'url' and value_node.type == 'string':
+                                    call_info.endpoint = url_path(value)
+                        elif arg.type == 'string' and 'url' not in call_info.arguments:
+                            url = source_code.text(arg)
+                            endpoint = url_path(url)
+                            if endpoint is not None:
+                                call_info.arguments['url'] = url
+                                call_info.endpoint = endpoint
                 
-                collected_info['api_calls'].append(call_info)
+                collected_info.api_calls.append(call_info)
+
+# Node types whose subtrees only hold names and punctuation. Once the node itself
+# has been handled nothing below it matters, so they can be skipped whenever the
+# per-type node counts are not being collected.
+PRUNABLE_SUBTREES = frozenset([
+    'import_statement',
+    'import_from_statement',
+    'future_import_statement',
+    'aliased_import',
+    'relative_import',
+    'dotted_name',
+])
+
+def _innermost_scope(scopes, start_byte):
+    # scopes are closed by position rather than by a leave callback, so this works for both walkers
+    while scopes and scopes[-1].end_byte <= start_byte:
+        scopes.pop()
+    return scopes[-1] if scopes else None
+
+def enter_scope(node, source_code, collected_info):
+    """The Scope of a named function or class definition, opened by whichever extractor reaches it first."""
+    scopes = collected_info.scopes
+    outer = _innermost_scope(scopes, node.start_byte)
+    if outer is not None and outer.start_byte == node.start_byte:
+        return outer
+    name = source_code.identifier(node.child_by_field_name('name'))
+    is_class = node.type == 'class_definition'
+    if outer is None:
+        scope = Scope(node.start_byte, node.end_byte, name, is_class)
+    else:
+        scope = Scope(node.start_byte, node.end_byte, sys.intern(f"{outer.name}.{name}"), is_class)
+        if is_class:
+            # decisions in a class body count towards the function around it
+            scope.metrics = outer.metrics
+    scopes.append(scope)
+    return scope
+
+def enter_class_scope(node, source_code, collected_info):
+    if node.child_by_field_name('name'):
+        enter_scope(node, source_code, collected_info)
+
+def current_function(node, collected_info):
+    """Qualified name of the function node is in, or None at module level and directly in a class body."""
+    scope = _innermost_scope(collected_info.scopes, node.start_byte)
+    return scope.name if scope is not None and not scope.is_class else None
+
+def enter_function(node, source_code, collected_info):
+    func_name_node = node.child_by_field_name('name')
+    if func_name_node:
+        func_name = source_code.identifier(func_name_node)
+        collected_info.functions.add(func_name)
+        
+        # checking for async functions
+        if node.type == 'async_function_definition' or source_code.startswith(node, b'async'):
+            collected_info.async_functions.add(func_name)
+        
+        current_class = collected_info.current_class
+        if current_class:
+            collected_info.relationships.append(
+                Relationship(current_class, func_name, node.type == 'async_function_definition')
+            )
+            
+            if current_class not in collected_info.class_hierarchy:
+                collected_info.class_hierarchy[current_class] = ClassInfo()
+            collected_info.class_hierarchy[current_class].methods.append(func_name)
+
+        # calls are recorded per qualified name, so same-named methods of different classes stay apart
+        collected_info.function_dependencies[enter_scope(node, source_code, collected_info).name] = OrderedSet()
+
+def enter_class(node, source_code, collected_info):
+    class_name_node = node.child_by_field_name('name')
+    if class_name_node:
+        class_name = source_code.identifier(class_name_node)
+        collected_info.classes.append(class_name)
+        collected_info.current_class = class_name
+        
+        bases_node = node.child_by_field_name('bases')
+        if bases_node:
+            if class_name not in collected_info.class_hierarchy:
+                collected_info.class_hierarchy[class_name] = ClassInfo()
+            for base in bases_node.named_children:
+                base_name = source_code.identifier(base)
+                collected_info.class_hierarchy[class_name].parent_classes.append(base_name)
+
+def enter_call(node, source_code, collected_info):
+    func_node = node.child_by_field_name('function')
+    if func_node:
+        func_name = source_code.identifier(func_node)
+        collected_info.function_calls.append(func_name)
+        
+        function = current_function(node, collected_info)
+        if function:
+            collected_info.function_dependencies[function].add(func_name)
+
+def enter_try(node, source_code, collected_info):
+    function = current_function(node, collected_info)
+    if function:
+        collected_info.error_handling.add(function)
+
+# Node types that add a path through a function, as counted for cyclomatic complexity
+DECISION_TYPES = (
+    'if_statement', 'elif_clause', 'for_statement', 'while_statement', 'except_clause',
+    'except_group_clause', 'case_clause', 'conditional_expression', 'boolean_operator',
+    'for_in_clause', 'if_clause',
+)
+
+def enter_function_metrics(node, source_code, collected_info):
+    if node.child_by_field_name('name'):
+        scope = enter_scope(node, source_code, collected_info)
+        scope.metrics = FunctionMetrics(node.end_point[0] - node.start_point[0] + 1)
+        # keyed by qualified name, so methods of different classes don't replace each other
+        collected_info.function_metrics[scope.name] = scope.metrics
+
+def enter_decision(node, source_code, collected_info):
+    scope = _innermost_scope(collected_info.scopes, node.start_byte)
+    if scope is not None and scope.metrics is not None:
+        scope.metrics.complexity += 1
+
+# The visitor registry: every extractor walk() can run, as the node types it
+# subscribes to and the handler(node, source_code, collected_info) for each,
+# where source_code is the SourceView of the file being walked.
+# All selected extractors share one traversal, and handlers for the same node
+# type run in the order the extractors are listed here.
+EXTRACTORS = {
+    'functions': {
+        'function_definition': enter_function,
+        'async_function_definition': enter_function,
+        'class_definition': enter_class_scope,
+    },
+    'decorators': {
+        'decorated_definition': enter_decorated,
+        'decorator': enter_decorator,
+        'function_definition': finish_decorated_function,
+        'async_function_definition': finish_decorated_function,
+        'class_definition': drop_decorators,
+    },
+    'classes': {'class_definition': enter_class},
+    'api_calls': {'call': analyze_api_calls},
+    'calls': {'call': enter_call},
+    'error_handling': {'try_statement': enter_try},
+    'imports': {'import_statement': handle_imports, 'import_from_statement': handle_imports},
+    'metrics': {
+        'function_definition': enter_function_metrics,
+        'async_function_definition': enter_function_metrics,
+        'class_definition': enter_class_scope,
+        **{node_type: enter_decision for node_type in DECISION_TYPES},
+    },
+}
+ALL_EXTRACTORS = frozenset(EXTRACTORS)
+
+@lru_cache(maxsize=None)
+def dispatch_table(extractors=ALL_EXTRACTORS):
+    """node type -> handlers to run on it, for a set of extractor names."""
+    unknown = set(extractors) - ALL_EXTRACTORS
+    if unknown:
+        raise ValueError(f"Unknown extractors {sorted(unknown)}, expected some of {list(EXTRACTORS)}")
+    table = {}
+    for name, handlers in EXTRACTORS.items():
+        if name in extractors:
+            for node_type, handler in handlers.items():
+                table.setdefault(node_type, []).append(handler)
+    return {node_type: tuple(handlers) for node_type, handlers in table.items()}
+
+def leave_node(node_type, collected_info):
+    if node_type == 'class_definition':
+        collected_info.current_class = None
 
-def walk(node, source_code, parent_type=None, collected_info=None):
+def walk(node, source_code, collected_info=None, count_node_types=True,
+         extractors=ALL_EXTRACTORS):
+    """Walk the tree below node in document order, collecting code structure.
+
+    Uses a TreeCursor instead of recursion, so deeply nested sources cannot hit
+    the interpreter recursion limit. Only the handlers of the given extractors
+    run; node types nothing reacts to are just counted.
+    """
     if collected_info is None:
-        collected_info = {
-            'functions': [],
-            'classes': [],
-            'function_calls': [],
-            'imports': [],
-            'node_types': {},
-            'relationships': [],
-            'current_class': None,
-            'imported_functions': {},
-            'imported_modules': {},
-            'api_calls': [],
-            'endpoints': {},
-            'decorated_functions': [],
-            'async_functions': set(),
-            'parameter_relationships': {},
-            'function_dependencies': {},
-            'class_hierarchy': {},
-            'variable_usage': {},
-            'current_function': None,
-            'error_handling': set()
-        }
+        collected_info = SymbolTable()
+
+    node_types = collected_info.node_types
+    handlers = dispatch_table(frozenset(extractors))
+    if not handlers:
+        if count_node_types:
+            tally_node_types(node, node_types)
+        return collected_info
+
+    prune = frozenset() if count_node_types else PRUNABLE_SUBTREES
+    with SourceView(source_code) as source:
+        return _walk_cursor(node.walk(), source, collected_info, handlers, prune, count_node_types)
+
+def _walk_cursor(cursor, source_code, collected_info, handlers, prune, count_node_types):
+    node_types = collected_info.node_types
+    # types of the nodes the cursor has descended into, for the leave callbacks
+    open_types = []
+
+    while True:
+        current = cursor.node
+        node_type = current.type
+        if count_node_types:
+            node_types[node_type] = node_types.get(node_type, 0) + 1
+        node_handlers = handlers.get(node_type)
+        if node_handlers:
+            for handler in node_handlers:
+                handler(current, source_code, collected_info)
+
+        if node_type not in prune and cursor.goto_first_child():
+            open_types.append(node_type)
+            continue
+
+        leave_node(node_type, collected_info)
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return collected_info
+            leave_node(open_types.pop(), collected_info)
+
+def tally_node_types(node, node_types):
+    """Count every node below node by type, without running any extractors."""
+    cursor = node.walk()
+    while True:
+        node_type = cursor.node.type
+        node_types[node_type] = node_types.get(node_type, 0) + 1
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return node_types
+
+def query_walk(node, source_code, collected_info=None, count_node_types=True,
+               extractors=ALL_EXTRACTORS):
+    """Collect the same information as walk() from the captures of structure_query().
+
+    Only the captured nodes reach Python. Scope exits are replayed from the
+    captures' byte ranges so current_class behaves as in walk().
+    """
+    if collected_info is None:
+        collected_info = SymbolTable()
 
-    node_type = node.type
-    collected_info['node_types'][node_type] = collected_info['node_types'].get(node_type, 0) + 1
-
-    # handling regular function definitions
-    if node_type in ['function_definition', 'async_function_definition']:
-        func_name_node = node.child_by_field_name('name')
-        if func_name_node:
-            collected_info['current_function'] = get_node_text(func_name_node, source_code)
-            func_name = collected_info['current_function']
-            if func_name not in collected_info['functions']:
-                collected_info['functions'].append(func_name)
-            
-            # checking for async functions
-            if node_type == 'async_function_definition' or any(child.type == 'async' for child in node.children):
-                collected_info['async_functions'].add(func_name)
-            
-            if collected_info['current_class']:
-                collected_info['relationships'].append({
-                    'class': collected_info['current_class'],
-                    'function': func_name,
-                    'is_async': node_type == 'async_function_definition'
-                })
-                
-                if collected_info['current_class'] not in collected_info['class_hierarchy']:
-                    collected_info['class_hierarchy'][collected_info['current_class']] = {
-                        'methods': [],
-                        'parent_classes': []
-                    }
-                collected_info['class_hierarchy'][collected_info['current_class']]['methods'].append(func_name)
-
-            collected_info['function_dependencies'][func_name] = set()
-
-    # Handling decorated functions
-    elif node_type == 'decorated_definition':
-        definition_node = node.child_by_field_name('definition')
-        if definition_node:
-            is_async = definition_node.type == 'async_function_definition' or any(child.type == 'async' for child in definition_node.children)
-            func_name_node = definition_node.child_by_field_name('name')
-            if func_name_node:
-                func_name = get_node_text(func_name_node, source_code)
-                if is_async:
-                    collected_info['async_functions'].add(func_name)
-                collected_info['current_function'] = func_name
-                if func_name not in collected_info['functions']:
-                    collected_info['functions'].append(func_name)
-                collected_info['function_dependencies'][func_name] = set()
-        handle_decorated_function(node, source_code, collected_info)
-
-    # Handling class definitions
-    elif node_type == 'class_definition':
-        class_name_node = node.child_by_field_name('name')
-        if class_name_node:
-            class_name = get_node_text(class_name_node, source_code)
-            collected_info['classes'].append(class_name)
-            collected_info['current_class'] = class_name
-            
-            bases_node = node.child_by_field_name('bases')
-            if bases_node:
-                if class_name not in collected_info['class_hierarchy']:
-                    collected_info['class_hierarchy'][class_name] = {
-                        'methods': [],
-                        'parent_classes': []
-                    }
-                for base in bases_node.named_children:
-                    base_name = get_node_text(base, source_code)
-                    collected_info['class_hierarchy'][class_name]['parent_classes'].append(base_name)
+    if count_node_types:
+        tally_node_types(node, collected_info.node_types)
 
-    # Handling function calls and API calls
-    elif node_type == 'call':
-        analyze_api_calls(node, source_code, collected_info)
-        func_node = node.child_by_field_name('function')
-        if func_node:
-            func_name = get_node_text(func_node, source_code)
-            collected_info['function_calls'].append(func_name)
-            
-            if collected_info['current_function']:
-                collected_info['function_dependencies'][collected_info['current_function']].add(func_name)
+    handlers = dispatch_table(frozenset(extractors))
+    if not handlers:
+        return collected_info
 
-    # handle error handling (try statements)
-    elif node_type == 'try_statement':
-        if collected_info['current_function']:
-            collected_info['error_handling'].add(collected_info['current_function'])
+    # only the node types the chosen extractors react to are captured
+    query = structure_query(frozenset(handlers))
+    captured = [nodes[0] for _, captures in query.matches(node) for nodes in captures.values()]
+    # pre-order: outer nodes before the inner nodes that start at the same byte
+    captured.sort(key=lambda captured_node: (captured_node.start_byte, -captured_node.end_byte))
 
-    # Handling imports
-    elif node_type in ['import_statement', 'import_from_statement']:
-        handle_imports(node, source_code, collected_info)
+    open_scopes = []
+    with SourceView(source_code) as source:
+        for current in captured:
+            start_byte = current.start_byte
+            while open_scopes and open_scopes[-1].end_byte <= start_byte:
+                leave_node(open_scopes.pop().type, collected_info)
 
-    # Processing all children
-    for child in node.children:
-        walk(child, source_code, node_type, collected_info)
+            node_type = current.type
+            for handler in handlers.get(node_type, ()):
+                handler(current, source, collected_info)
+            if node_type in SCOPE_TYPES:
+                open_scopes.append(current)
 
-    if node_type == 'class_definition':
-        collected_info['current_class'] = None
-    elif node_type in ['function_definition', 'async_function_definition', 'decorated_definition']:
-        collected_info['current_function'] = None
+    while open_scopes:
+        leave_node(open_scopes.pop().type, collected_info)
 
     return collected_info
 
+ANALYSIS_BACKENDS = {
+    'walker': walk,
+    'query': query_walk,
+}
+
 def analyze_cross_references(app_info, api_info):
     """Analyze cross-references between app.py and api.py"""
     cross_references = {
-        'direct_function_calls': set(),
-        'imported_functions': set(),
+        'direct_function_calls': OrderedSet(),
+        'imported_functions': OrderedSet(),
         'endpoint_usage': {},
-        'shared_dependencies': set()
+        'shared_dependencies': OrderedSet(),
+        # the api.py route each of app.py's api_calls resolves to, or None
+        'call_routes': []
     }
 
-    api_functions = set(api_info['functions'])
-    api_imports = {imp.get('module') or imp.get('name') for imp in api_info['imports']}
-    app_imports = {imp.get('module') or imp.get('name') for imp in app_info['imports']}
-
-    cross_references['shared_dependencies'] = api_imports.intersection(app_imports)
+    api_functions = api_info.functions
+    api_imports = OrderedSet(imp.module or imp.name for imp in api_info.imports)
+    app_imports = OrderedSet(imp.module or imp.name for imp in app_info.imports)
+
+    # Finding shared dependencies
+    cross_references['shared_dependencies'].update(name for name in api_imports if name in app_imports)
+
+    # Resolving API calls against the routes api.py declares
+    routes = RouteIndex.from_symbol_table(api_info)
+    for api_call in app_info.api_calls:
+        route = routes.match(api_call.endpoint, api_call.method) if api_call.endpoint else None
+        cross_references['call_routes'].append(route)
+        if route is not None:
+            cross_references['endpoint_usage'][route.path] = {
+                'method': api_call.method,
+                'handler': route.handler,
+                'call_pattern': api_call.arguments
+            }
 
-    for api_call in app_info['api_calls']:
-        if 'endpoint' in api_call and api_call['endpoint']:
-            endpoint_name = api_call['endpoint']
-            
-            # Matching with decorated functions in api.py
-            for func in api_info['decorated_functions']:
-                if func['name'] == endpoint_name or endpoint_name in [arg.strip("'\"") for dec in func['decorators'] for arg in dec.get('arguments', [])]:
-                    cross_references['endpoint_usage'][endpoint_name] = {
-                        'method': api_call['method'],
-                        'handler': func['name'],
-                        'call_pattern': api_call['arguments']
-                    }
-        elif func_call in api_functions:
-            cross_references['imported_functions'].add(func_call)
-
-    for imp in app_info['imports']:
-        if imp.get('module') == 'api' or imp.get('name') in api_functions:
-            if 'name' in imp:
-                cross_references['imported_functions'].add(imp['name'])
-
-    for api_call in app_info['api_calls']:
-        url = api_call['arguments'].get('url', '').strip('"\' ')
-        if '/ask_' in url:
-            endpoint = '/' + url.split('/')[-1]
-            if endpoint in api_info['endpoints']:
-                cross_references['endpoint_usage'][endpoint] = {
-                    'method': api_call['method'],
-                    'handler': api_info['endpoints'][endpoint]['function'],
-                    'call_pattern': api_call['arguments']
-                }
+    # Analyzing imported functions
+    for imp in app_info.imports:
+        if imp.module == 'api' or imp.name in api_functions:
+            if imp.name is not None:
+                cross_references['imported_functions'].add(imp.name)
 
     return cross_references
 
@@ -334,8 +512,8 @@ def convert_analysis_to_json(analysis):
     if not analysis:
         return {"error": "No analysis results available"}
 
-    app_info = analysis['app_info']
-    api_info = analysis['api_info']
+    app_info = analysis['app_info'].to_dict()
+    api_info = analysis['api_info'].to_dict()
     cross_refs = analysis['cross_refs']
 
     return {
@@ -456,8 +634,8 @@ def analyze_files(app_path, api_path):
         with open(api_path, 'r', encoding='utf-8') as f:
             api_code = f.read()
 
-        app_tree = parser.parse(bytes(app_code, 'utf-8'))
-        api_tree = parser.parse(bytes(api_code, 'utf-8'))
+        app_tree = get_parser().parse(bytes(app_code, 'utf-8'))
+        api_tree = get_parser().parse(bytes(api_code, 'utf-8'))
 
         # Analyzing both files
         app_info = walk(app_tree.root_node, bytes(app_code, 'utf-8'))
@@ -487,166 +665,144 @@ if __name__ == "__main__":
         print("Analysis failed to produce results")
 
 
-
-
-
-
-
-
-def analyze_code(app_code: str, api_code: str) -> dict:
+# /analyze response sections and the extractors each one needs; 'node_types' stands for node counting
+SECTION_EXTRACTORS = {
+    'cross_reference_analysis': ('functions', 'decorators', 'api_calls', 'imports'),
+    'function_call_chains': ('functions', 'calls'),
+    'node_type_frequencies': ('node_types',),
+    'error_handling': ('functions', 'error_handling'),
+    'async_functions': ('functions',),
+    'decorated_functions': ('decorators',),
+    'function_parameters': ('decorators',),
+    'code_metrics': ('metrics',),
+}
+SECTIONS = tuple(SECTION_EXTRACTORS)
+
+def parse_sections(value):
+    """Parse a comma-separated sections parameter; None or empty means every section."""
+    if not value:
+        return None
+    sections = frozenset(section.strip() for section in value.split(',') if section.strip())
+    unknown = sections - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections {sorted(unknown)}, expected some of {list(SECTIONS)}")
+    return sections
+
+def extractors_for(sections=None):
+    """The extractors needed for sections and whether node types must be counted."""
+    if sections is None:
+        return ALL_EXTRACTORS, True
+    needed = {extractor for section in sections for extractor in SECTION_EXTRACTORS[section]}
+    count_node_types = 'node_types' in needed
+    needed.discard('node_types')
+    return frozenset(needed), count_node_types
+
+def analyze_code(app_code: str, api_code: str, backend=None, sections=None) -> dict:
+    return analyze_sources(app_code.encode('utf-8'), api_code.encode('utf-8'), backend, sections)
+
+def analyze_sources(app_source, api_source, backend=None, sections=None) -> dict:
+    """analyze_code() for UTF-8 source that is already bytes, a memoryview or an mmap.
+
+    The source is parsed in place; only the text of emitted nodes is ever decoded.
+    With sections, only those parts of the response are built, and only their extractors run.
+    Without an explicit backend, the walker is used when node types are counted (it visits
+    every node anyway) and the query backend otherwise.
+    """
     try:
-        app_tree = parser.parse(bytes(app_code, 'utf-8'))
-        api_tree = parser.parse(bytes(api_code, 'utf-8'))
+        extractors, count_node_types = extractors_for(sections)
+        if backend is None:
+            backend = 'walker' if count_node_types else 'query'
+        if backend not in ANALYSIS_BACKENDS:
+            raise ValueError(f"Unknown analysis backend '{backend}', expected one of {list(ANALYSIS_BACKENDS)}")
+        extract = ANALYSIS_BACKENDS[backend]
+
+        with timed('parse'):
+            app_tree = get_parser().parse(app_source)
+            api_tree = get_parser().parse(api_source)
         
         # getting the detailed analysis
-        app_info = walk(app_tree.root_node, bytes(app_code, 'utf-8'))
-        api_info = walk(api_tree.root_node, bytes(api_code, 'utf-8'))
+        with timed('walk'):
+            app_info = extract(app_tree.root_node, app_source, count_node_types=count_node_types, extractors=extractors)
+            api_info = extract(api_tree.root_node, api_source, count_node_types=count_node_types, extractors=extractors)
 
-        # Adding cross reference analysis
-        cross_refs = {
-            'direct_function_calls': set(),
-            'imported_functions': set(),
-            'endpoint_usage': {},
-            'shared_dependencies': set()
-        }
-
-        # Analyzing cross references
-        api_functions = set(api_info['functions'])
-        api_imports = {imp.get('module') or imp.get('name') for imp in api_info['imports']}
-        app_imports = {imp.get('module') or imp.get('name') for imp in app_info['imports']}
-
-        # Finding shared dependencies
-        cross_refs['shared_dependencies'] = api_imports.intersection(app_imports)
-
-        # Analyzing API endpoints and function usage
-        for api_call in app_info['api_calls']:
-            if 'endpoint' in api_call and api_call['endpoint']:
-                endpoint_name = api_call['endpoint']
-                
-                # Matching with decorated functions in api.py
-                for func in api_info['decorated_functions']:
-                    if func['name'] == endpoint_name or endpoint_name in [
-                        arg.strip("'\"") for dec in func['decorators'] 
-                        for arg in dec.get('arguments', [])
-                    ]:
-                        cross_refs['endpoint_usage'][endpoint_name] = {
-                            'method': api_call['method'],
-                            'handler': func['name'],
-                            'call_pattern': api_call['arguments']
-                        }
-
-        # Analyzing imported functions
-        for imp in app_info['imports']:
-            if imp.get('module') == 'api' or imp.get('name') in api_functions:
-                if 'name' in imp:
-                    cross_refs['imported_functions'].add(imp['name'])
-
-        # Converting sets to lists for JSON serialization
-        app_info['async_functions'] = list(app_info['async_functions'])
-        app_info['error_handling'] = list(app_info['error_handling'])
-        api_info['async_functions'] = list(api_info['async_functions'])
-        api_info['error_handling'] = list(api_info['error_handling'])
-
-        # Converting function dependencies sets to lists
-        for func_name, deps in app_info['function_dependencies'].items():
-            app_info['function_dependencies'][func_name] = list(deps)
-        for func_name, deps in api_info['function_dependencies'].items():
-            api_info['function_dependencies'][func_name] = list(deps)
-
-        # Creating the formatted output matching the first file
-        return {
-            "cross_reference_analysis": {
-                "function_usage": {
-                    "direct_function_calls": list(cross_refs['direct_function_calls']),
-                    "imported_functions": list(cross_refs['imported_functions'])
-                },
-                "api_integration": {
-                    "api_calls": [
-                        {
-                            "endpoint": call.get('endpoint', 'Unknown'),
-                            "http_method": call['method'],
-                            "client_library": call['client_library'],
-                            "arguments": call['arguments']
-                        }
-                        for call in app_info.get('api_calls', [])
-                    ]
-                },
-                "shared_dependencies": list(cross_refs['shared_dependencies'])
-            },
-            "function_call_chains": {
-                "app_py": app_info['function_dependencies'],
-                "api_py": api_info['function_dependencies']
-            },
-            "node_type_frequencies": {
-                "app_py": app_info['node_types'],
-                "api_py": api_info['node_types']
-            },
-            "error_handling": {
-                "app_py": app_info['error_handling'],
-                "api_py": api_info['error_handling']
-            },
-            "async_functions": {
-                "app_py": app_info['async_functions'],
-                "api_py": api_info['async_functions']
+        return build_analysis(app_info, api_info, sections)
+    except Exception as e:
+        return {'error': str(e)}
+
+def _decorated_functions(info: SymbolTable) -> list:
+    return [{"name": func.name, "decorators": func.decorators} for func in info.decorated_functions]
+
+def _function_parameters(info: SymbolTable) -> list:
+    return [{"function": func.name, "parameters": func.parameters} for func in info.decorated_functions]
+
+def build_analysis(app_info: SymbolTable, api_info: SymbolTable, sections=None) -> dict:
+    """Cross-reference two symbol tables and shape them into the /analyze response.
+
+    sections limits the response to those keys; None means all of them. The
+    OrderedSets, dicts and records of the symbol tables go into the response as
+    they are, with no list or dict copies; serialize it with render_analysis(),
+    or with symbol_table.json_default as the encoder's default hook.
+    """
+    if sections is None:
+        sections = SECTIONS
+    analysis = {}
+
+    if 'cross_reference_analysis' in sections:
+        with timed('cross_refs'):
+            cross_refs = analyze_cross_references(app_info, api_info)
+        analysis["cross_reference_analysis"] = {
+            "function_usage": {
+                "direct_function_calls": cross_refs['direct_function_calls'],
+                "imported_functions": cross_refs['imported_functions']
             },
-            "decorated_functions": {
-                "app_py": [
-                    {
-                        "name": func['name'],
-                        "decorators": [
-                            {
-                                "name": decorator['name'],
-                                "arguments": decorator.get('arguments', [])
-                            }
-                            for decorator in func['decorators']
-                        ]
-                    }
-                    for func in app_info.get('decorated_functions', [])
-                ],
-                "api_py": [
+            "api_integration": {
+                "api_calls": [
                     {
-                        "name": func['name'],
-                        "decorators": [
-                            {
-                                "name": decorator['name'],
-                                "arguments": decorator.get('arguments', [])
-                            }
-                            for decorator in func['decorators']
-                        ]
+                        "endpoint": call.endpoint if call.endpoint is not None else 'Unknown',
+                        "http_method": call.method,
+                        "client_library": call.client_library,
+                        "arguments": call.arguments,
+                        "handler": route.handler if route is not None else None
                     }
-                    for func in api_info.get('decorated_functions', [])
+                    for call, route in zip(app_info.api_calls, cross_refs['call_routes'])
                 ]
             },
-            "function_parameters": {
-                "app_py": [
-                    {
-                        "function": func['name'],
-                        "parameters": [
-                            {
-                                "name": param['name'],
-                                "type": param.get('type'),
-                                "default": param.get('default')
-                            }
-                            for param in func['parameters']
-                        ]
-                    }
-                    for func in app_info.get('decorated_functions', [])
-                ],
-                "api_py": [
-                    {
-                        "function": func['name'],
-                        "parameters": [
-                            {
-                                "name": param['name'],
-                                "type": param.get('type'),
-                                "default": param.get('default')
-                            }
-                            for param in func['parameters']
-                        ]
-                    }
-                    for func in api_info.get('decorated_functions', [])
-                ]
-            }
+            "endpoint_usage": cross_refs['endpoint_usage'],
+            "shared_dependencies": cross_refs['shared_dependencies']
         }
-    except Exception as e:
-        return {'error': str(e)}
\ No newline at end of file
+    if 'function_call_chains' in sections:
+        analysis["function_call_chains"] = {
+            "app_py": app_info.function_dependencies,
+            "api_py": api_info.function_dependencies
+        }
+    if 'node_type_frequencies' in sections:
+        analysis["node_type_frequencies"] = {
+            "app_py": app_info.node_types,
+            "api_py": api_info.node_types
+        }
+    if 'error_handling' in sections:
+        analysis["error_handling"] = {
+            "app_py": app_info.error_handling,
+            "api_py": api_info.error_handling
+        }
+    if 'async_functions' in sections:
+        analysis["async_functions"] = {
+            "app_py": app_info.async_functions,
+            "api_py": api_info.async_functions
+        }
+    if 'decorated_functions' in sections:
+        analysis["decorated_functions"] = {
+            "app_py": _decorated_functions(app_info),
+            "api_py": _decorated_functions(api_info)
+        }
+    if 'function_parameters' in sections:
+        analysis["function_parameters"] = {
+            "app_py": _function_parameters(app_info),
+            "api_py": _function_parameters(api_info)
+        }
+    if 'code_metrics' in sections:
+        analysis["code_metrics"] = {
+            "app_py": app_info.function_metrics,
+            "api_py": api_info.function_metrics
+        }
+    return analysis
@@ -4,13 +4,19 @@ import json
 import os
 from datetime import datetime
 from functools import lru_cache
-from typing import Dict, Any, Optional, List
-from openai import OpenAI
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 import asyncio
+import time
 from dotenv import load_dotenv
 import logging
 from pathlib import Path
 
+from app.services.llm_cache import llm_cache, llm_cache_key
+from app.services.llm_client import api_key_configured, get_llm_client
+from app.services.local_answers import answer_locally, can_answer_locally
+from app.services.prompt_context import CONTEXT_FORMATS, fit_to_budget, prune_context
+from app.services.stage_timing import timed
+
 #
 logging.basicConfig(
     level=logging.INFO,
@@ -21,9 +27,6 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Initializing OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
 GPT_CONFIG = {
     "model": "gpt-4",
     "seed": 0,
@@ -37,21 +40,21 @@ STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 PROMPT_TEMPLATES = {
     "functions_api": """Analyze the following code information and list ONLY the functions defined in api.py.
 
-Here is the code analysis data in JSON format:
+Here is the code analysis data {context_format}:
 {context}
 
 Please provide a clear and numbered list of all functions found in api.py.""",
 
     "classes_api": """Analyze the following code information and identify all classes defined in api.py:
 
-Here is the code analysis data in JSON format:
+Here is the code analysis data {context_format}:
 {context}
 
 Please list all classes found in api.py. If there's only one class, specify that.""",
 
     "imports_app": """Analyze the following code information and count the number of imports in app.py:
 
-Here is the code analysis data in JSON format:
+Here is the code analysis data {context_format}:
 {context}
 
 Please provide the total number of imports and list them with their aliases if any.""",
@@ -63,7 +66,7 @@ Please provide the total number of imports and list them with their aliases if a
 3. Note that functions making API calls are related but not present in both files
 4. Examine the relationships through HTTP endpoints
 
-Here is the code analysis data in JSON format:
+Here is the code analysis data {context_format}:
 {context}
 
 Please provide a clear answer that:
@@ -74,12 +77,44 @@ Please provide a clear answer that:
 
     "default": """Analyze the following code information and answer this question: {question}
 
-Here is the code analysis data in JSON format:
+Here is the code analysis data {context_format}:
 {context}
 
 Please provide a clear and concise answer based only on the information provided."""
 }
 
+# Parts of the analysis each template needs, as dotted paths into the /analyze
+# response; None sends all of it. Functions show up, qualified (Client.get), as
+# the keys of code_metrics and function_call_chains, classes only as
+# class_definition node counts.
+TEMPLATE_SECTIONS = {
+    "functions_api": (
+        "code_metrics.api_py",
+        "function_call_chains.api_py",
+        "async_functions.api_py",
+        "decorated_functions.api_py",
+    ),
+    "classes_api": (
+        "code_metrics.api_py",
+        "function_call_chains.api_py",
+        "node_type_frequencies.api_py",
+    ),
+    "imports_app": (
+        "cross_reference_analysis.function_usage",
+        "cross_reference_analysis.shared_dependencies",
+        "node_type_frequencies.app_py",
+    ),
+    "related_functions": (
+        "cross_reference_analysis",
+        "function_call_chains",
+    ),
+    "default": None,
+}
+
+# How the templates' context is encoded, one of prompt_context.CONTEXT_FORMATS.
+# The outline writes the keys of repeated records once instead of per record.
+CONTEXT_FORMAT = "outline"
+
 class ResponseStorage:
     def __init__(self):
         self.base_dir = STORAGE_DIR
@@ -145,54 +180,133 @@ class ResponseStorage:
 storage = ResponseStorage()
 
 @lru_cache(maxsize=128)
-def get_prompt_template(question: str) -> str:
-    """Get the appropriate prompt template based on the question."""
+def get_template_name(question: str) -> str:
+    """Get the name of the prompt template for the question."""
     question_mapping = {
         "What functions does api.py have?": "functions_api",
         "What are different classes present in api.py?": "classes_api",
         "How many imports are present in app.py?": "imports_app",
         "How many functions are related in both app.py and api.py?": "related_functions"
     }
-    return PROMPT_TEMPLATES.get(question_mapping.get(question, "default"))
+    return question_mapping.get(question, "default")
 
-def prepare_analysis_prompt(analysis_data: Dict[str, Any], question: str) -> str:
-    """Prepare the prompt for GPT based on analysis data and question."""
+def get_prompt_template(question: str) -> str:
+    """Get the appropriate prompt template based on the question."""
+    return PROMPT_TEMPLATES[get_template_name(question)]
+
+def prepare_context(analysis_data: Dict[str, Any], name: str) -> str:
+    """The analysis as template name sees it: its sections, in the context format, within the token budget."""
+    encode, _ = CONTEXT_FORMATS[CONTEXT_FORMAT]
+    return fit_to_budget(prune_context(analysis_data, TEMPLATE_SECTIONS[name]), encode)
+
+def prepare_analysis_prompt(analysis_data: Dict[str, Any], question: str,
+                            contexts: Optional[Dict[str, str]] = None) -> str:
+    """Prepare the prompt for GPT based on analysis data and question.
+
+    Only the sections the question's template needs are sent, in the context
+    format and cut down to the context token budget if they are still too
+    large. contexts, keyed by template name, lets questions about the same
+    analysis share an encoded context.
+    """
     try:
-        context = json.dumps(analysis_data, indent=2)
-        template = get_prompt_template(question)
-        return template.format(context=context, question=question)
+        name = get_template_name(question)
+        if contexts is None:
+            context = prepare_context(analysis_data, name)
+        else:
+            context = contexts.get(name)
+            if context is None:
+                context = contexts[name] = prepare_context(analysis_data, name)
+        _, description = CONTEXT_FORMATS[CONTEXT_FORMAT]
+        return PROMPT_TEMPLATES[name].format(context=context, context_format=description, question=question)
     except Exception as e:
         logger.error(f"Error preparing prompt: {str(e)}")
         raise
 
-async def analyze_with_gpt(analysis_data: Dict[str, Any], question: str) -> Dict[str, Any]:
-    """Process analysis data with GPT and save the response."""
-    if not client.api_key:
-        logger.error("OpenAI API key not found")
-        return {"error": "OpenAI API key not found in environment variables."}
-
+async def _complete(key: str, prompt: str) -> str:
+    start = time.perf_counter()
+    response = await get_llm_client().chat_completion(
+        model=GPT_CONFIG["model"],
+        messages=[{"role": "user", "content": prompt}],
+        temperature=GPT_CONFIG["temperature"],
+        seed=GPT_CONFIG["seed"]
+    )
+    answer = response.choices[0].message.content
+    logger.info("Received response from GPT")
+    await asyncio.to_thread(llm_cache.put, key, GPT_CONFIG["model"], answer, time.perf_counter() - start)
+    return answer
+
+def _local_response(question: str, answer: str) -> Dict[str, Any]:
+    """Save and return an answer taken from the analysis data instead of GPT."""
+    logger.info(f"Answered question from the analysis data: {question}")
+    response_data = {
+        "question": question,
+        "response": answer,
+        "timestamp": datetime.now().isoformat(),
+        "cached": False,
+        "local": True,
+    }
+    with timed('storage'):
+        response_data["file_path"] = storage.save_response(response_data)
+    return response_data
+
+async def analyze_with_gpt(analysis_data: Dict[str, Any], question: str, use_cache: bool = True,
+                           contexts: Optional[Dict[str, str]] = None,
+                           calls: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Process analysis data with GPT and save the response.
+
+    Questions the analysis answers by itself, like the functions or imports of
+    a file, are answered from it without GPT (see local_answers). The request
+    is deterministic, so an answer to the same prompt is served from the LLM
+    response cache; use_cache=False asks GPT again and refreshes the cached
+    answer. A prompt already being answered for another caller is not sent
+    again; this call waits for that answer. calls, when given, counts how the
+    answer was obtained: 'local_answers', 'cache_hits', 'upstream_calls' or 'joined'.
+    """
     try:
-        prompt = prepare_analysis_prompt(analysis_data, question)
+        with timed('local'):
+            local_answer = answer_locally(analysis_data, question)
+        if local_answer is not None:
+            if calls is not None:
+                calls["local_answers"] = calls.get("local_answers", 0) + 1
+            return _local_response(question, local_answer)
+
+        if not api_key_configured():
+            logger.error("OpenAI API key not found")
+            return {"error": "OpenAI API key not found in environment variables."}
+
+        with timed('prompt'):
+            prompt = prepare_analysis_prompt(analysis_data, question, contexts)
         logger.info(f"Analyzing question: {question}")
-        
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model=GPT_CONFIG["model"],
-            messages=[{"role": "user", "content": prompt}],
-            temperature=GPT_CONFIG["temperature"],
-            seed=GPT_CONFIG["seed"]
-        )
-        
-        answer = response.choices[0].message.content
-        logger.info("Received response from GPT")
-        
+
+        key = llm_cache_key(GPT_CONFIG["model"], GPT_CONFIG["seed"], GPT_CONFIG["temperature"], prompt)
+        cached = None
+        if use_cache:
+            with timed('llm_cache'):
+                cached = await asyncio.to_thread(llm_cache.get, key)
+        else:
+            llm_cache.record_bypass()
+
+        if cached is not None:
+            answer = cached["answer"]
+            outcome = "cache_hits"
+            logger.info("Served response from the LLM cache")
+        else:
+            with timed('llm'):
+                answer, joined = await get_llm_client().coalesced(key, lambda: _complete(key, prompt))
+            outcome = "joined" if joined else "upstream_calls"
+        if calls is not None:
+            calls[outcome] = calls.get(outcome, 0) + 1
+
         response_data = {
             "question": question,
             "response": answer,
             "timestamp": datetime.now().isoformat(),
+            "cached": cached is not None,
+            "local": False,
         }
         
-        file_path = storage.save_response(response_data)
+        with timed('storage'):
+            file_path = storage.save_response(response_data)
         response_data["file_path"] = file_path
         
         return response_data
@@ -204,20 +318,100 @@ async def analyze_with_gpt(analysis_data: Dict[str, Any], question: str) -> Dict
             "timestamp": datetime.now().isoformat()
         }
 
-async def batch_analyze(analysis_data: Dict[str, Any], questions: List[str]) -> List[Dict[str, Any]]:
-    """Process multiple questions in parallel."""
-    tasks = [analyze_with_gpt(analysis_data, question) for question in questions]
-    return await asyncio.gather(*tasks)
+async def stream_with_gpt(analysis_data: Dict[str, Any], question: str,
+                          use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """Answer like analyze_with_gpt, yielding ("delta", text) as GPT generates the answer.
 
-def prepare_analysis_prompt(analysis_data: Dict[str, Any], question: str) -> str:
-    """Prepare the prompt for GPT based on analysis data and question."""
+    Ends with ("done", response_data) once the full answer has been cached and
+    saved, or ("error", message). A cached or local answer comes as a single delta.
+    """
     try:
-        context = json.dumps(analysis_data, indent=2)
-        template = get_prompt_template(question)
-        return template.format(context=context, question=question)
+        with timed('local'):
+            local_answer = answer_locally(analysis_data, question)
+        if local_answer is not None:
+            response_data = _local_response(question, local_answer)
+            yield "delta", local_answer
+            yield "done", response_data
+            return
+
+        if not api_key_configured():
+            logger.error("OpenAI API key not found")
+            yield "error", "OpenAI API key not found in environment variables."
+            return
+
+        with timed('prompt'):
+            prompt = prepare_analysis_prompt(analysis_data, question)
+        logger.info(f"Streaming answer to question: {question}")
+
+        key = llm_cache_key(GPT_CONFIG["model"], GPT_CONFIG["seed"], GPT_CONFIG["temperature"], prompt)
+        cached = None
+        if use_cache:
+            with timed('llm_cache'):
+                cached = await asyncio.to_thread(llm_cache.get, key)
+        else:
+            llm_cache.record_bypass()
+
+        if cached is not None:
+            answer = cached["answer"]
+            yield "delta", answer
+        else:
+            parts = []
+            start = time.perf_counter()
+            with timed('llm'):
+                async for delta in get_llm_client().stream_chat_completion(
+                    model=GPT_CONFIG["model"],
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=GPT_CONFIG["temperature"],
+                    seed=GPT_CONFIG["seed"]
+                ):
+                    parts.append(delta)
+                    yield "delta", delta
+            answer = "".join(parts)
+            await asyncio.to_thread(llm_cache.put, key, GPT_CONFIG["model"], answer, time.perf_counter() - start)
+
+        response_data = {
+            "question": question,
+            "response": answer,
+            "timestamp": datetime.now().isoformat(),
+            "cached": cached is not None,
+            "local": False,
+        }
+        with timed('storage'):
+            response_data["file_path"] = storage.save_response(response_data)
+        yield "done", response_data
     except Exception as e:
-        logger.error(f"Error preparing prompt: {str(e)}")
-        raise
+        logger.error(f"Error in streamed GPT analysis: {str(e)}")
+        yield "error", str(e)
+
+async def batch_analyze(analysis_data: Dict[str, Any], questions: List[str], use_cache: bool = True,
+                        calls: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """Process multiple questions in parallel, as many at a time as the shared LLM client allows.
+
+    Each distinct question is asked once, and questions sharing a template
+    share one encoded context; questions answered from the analysis data
+    need none. A question that can't be answered gets an
+    error entry of its own; the rest of the batch is still answered. calls
+    receives the batch's counts: questions, distinct questions, how the answers
+    were obtained (see analyze_with_gpt) and errors.
+    """
+    if calls is None:
+        calls = {}
+    distinct = list(dict.fromkeys(questions))
+    calls.update({"questions": len(questions), "distinct_questions": len(distinct),
+                  "local_answers": 0, "cache_hits": 0, "upstream_calls": 0, "joined": 0})
+    contexts = {}
+    with timed('prompt'):
+        # encoding every template's context up front keeps it off the per-question path
+        asked = [question for question in distinct if not can_answer_locally(analysis_data, question)]
+        for name in dict.fromkeys(get_template_name(question) for question in asked):
+            contexts[name] = prepare_context(analysis_data, name)
+    tasks = [analyze_with_gpt(analysis_data, question, use_cache, contexts, calls) for question in distinct]
+    answers = dict(zip(distinct, await asyncio.gather(*tasks)))
+    calls["errors"] = sum("error" in answer for answer in answers.values())
+    logger.info(f"Batch of {calls['questions']} questions ({calls['distinct_questions']} distinct): "
+                f"{calls['local_answers']} answered locally, {calls['upstream_calls']} upstream calls, {calls['cache_hits']} cache hits, "
+                f"{calls['joined']} joined calls in flight, {calls['errors']} errors")
+    return [dict(answers[question]) for question in questions]
 
 if __name__ == "__main__":
     async def test_analyze():
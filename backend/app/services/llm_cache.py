@@ -0,0 +1,189 @@
+# app/services/llm_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuring cache settings
+LLM_CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", str(Path(__file__).resolve().parents[2] / "storage" / "llm_cache")))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+MEMORY_MAX_ENTRIES = 256
+
+
+def llm_cache_key(model: str, seed: Optional[int], temperature: float, prompt: str) -> str:
+    """Address of a completion: the request settings that make it deterministic plus the SHA-256 of the prompt."""
+    prompt_digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    settings = json.dumps([model, seed, temperature, prompt_digest], separators=(",", ":"))
+    return hashlib.sha256(settings.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Completions of deterministic (temperature 0, fixed seed) requests, kept on disk with an in-memory LRU in front.
+
+    Entries older than ttl_seconds are dropped when they are looked up, and the
+    least recently used ones are evicted once there are more than max_entries.
+    get() and put() block on the disk, so the request path calls them on a thread.
+    """
+
+    def __init__(self, cache_dir: Path = LLM_CACHE_DIR, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, memory_max_entries: int = MEMORY_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_max_entries = memory_max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'bypasses': 0, 'expirations': 0, 'evictions': 0}
+        # upstream seconds the hits would have cost, from the latency recorded with each entry
+        self.saved_seconds = 0.0
+
+        # key -> stored at (epoch seconds), least recently used first
+        self.index = OrderedDict()
+        if self.max_entries > 0:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path.stem))
+            except OSError:
+                continue
+        for mtime, key in sorted(entries):
+            self.index[key] = mtime
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_max_entries:
+            self.memory.popitem(last=False)
+
+    def _forget(self, key: str):
+        # called with the lock held; the file is removed by _unlink once it is released
+        self.index.pop(key, None)
+        self.memory.pop(key, None)
+
+    def _unlink(self, keys):
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry ({'answer', 'latency_seconds', 'stored_at', ...}) for key, or None."""
+        with self.lock:
+            indexed = key in self.index
+            entry = self.memory.get(key) if indexed else None
+        if indexed and entry is None:
+            entry = self._read(key)
+
+        dropped = []
+        with self.lock:
+            if indexed and entry is None:
+                # unreadable, unless a put() finished while the file was being read
+                entry = self.memory.get(key)
+                if entry is None:
+                    self._forget(key)
+                    dropped.append(key)
+            if entry is not None and time.time() - entry['stored_at'] > self.ttl_seconds:
+                self._forget(key)
+                dropped.append(key)
+                self.counters['expirations'] += 1
+                entry = None
+            if entry is None:
+                self.counters['misses'] += 1
+            else:
+                # an entry evicted while its file was being read still answers this lookup
+                if key in self.index:
+                    self._remember(key, entry)
+                    self.index.move_to_end(key)
+                self.counters['hits'] += 1
+                self.saved_seconds += entry['latency_seconds']
+        self._unlink(dropped)
+        return entry
+
+    def record_bypass(self):
+        with self.lock:
+            self.counters['bypasses'] += 1
+
+    def put(self, key: str, model: str, answer: str, latency_seconds: float):
+        if self.max_entries <= 0:
+            return
+        entry = {
+            'model': model,
+            'answer': answer,
+            'latency_seconds': latency_seconds,
+            'stored_at': time.time(),
+        }
+        tmp_path = None
+        try:
+            # a temporary file of its own, so concurrent writers of the same key never share one
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_dir, suffix='.tmp',
+                                             delete=False) as f:
+                tmp_path = f.name
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error(f"Error writing LLM cache entry: {str(e)}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        evicted = []
+        with self.lock:
+            self._remember(key, entry)
+            self.index.pop(key, None)
+            self.index[key] = entry['stored_at']
+            while len(self.index) > self.max_entries:
+                old_key = next(iter(self.index))
+                self._forget(old_key)
+                evicted.append(old_key)
+                self.counters['evictions'] += 1
+        self._unlink(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / lookups if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'entries': len(self.index),
+                'memory_entries': len(self.memory),
+            }
+
+    def clear(self):
+        with self.lock:
+            keys = list(self.index)
+            self.index.clear()
+            self.memory.clear()
+        self._unlink(keys)
+
+
+# Initializing cache
+llm_cache = LLMResponseCache()
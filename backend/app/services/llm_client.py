@@ -0,0 +1,112 @@
+# app/services/llm_client.py
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from app.services.llm_scheduler import LLMScheduler, request_tokens
+
+logger = logging.getLogger(__name__)
+
+# Configuring upstream LLM settings
+# completions allowed in flight at once across every request, the rest wait their turn;
+# the scheduler lowers it for a while when the API throttles
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# kept-alive HTTPS connections to the API, enough for every call in flight
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", str(LLM_MAX_CONCURRENCY)))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+# an httpx pool and the scheduler's waiters both belong to the event loop that first
+# uses them, so each loop (the server's, or one per asyncio.run in scripts) gets its own
+_clients = weakref.WeakKeyDictionary()
+
+
+class LLMClient:
+    """The AsyncOpenAI client of one event loop and the scheduler its calls go through."""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_connections: int = LLM_MAX_CONNECTIONS,
+                 scheduler: Optional[LLMScheduler] = None):
+        self.openai = AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            # retries are the scheduler's, so they count against the limits and adapt them
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+            ),
+        )
+        self.scheduler = scheduler or LLMScheduler(max_concurrency)
+        # key -> task of a call other callers with the same key can join
+        self.shared = {}
+
+    def _with_key(self, api_key: Optional[str]) -> AsyncOpenAI:
+        if api_key and api_key != self.openai.api_key:
+            # shares the connection pool, only the credentials differ
+            return self.openai.with_options(api_key=api_key)
+        return self.openai
+
+    async def chat_completion(self, api_key: Optional[str] = None, **request):
+        """Create a chat completion when the scheduler allows it, retrying throttled and failed attempts."""
+        client = self._with_key(api_key)
+        async with self.scheduler.slot(lambda: client.chat.completions.create(**request),
+                                       request_tokens(request)) as response:
+            return response
+
+    async def stream_chat_completion(self, api_key: Optional[str] = None, **request) -> AsyncIterator[str]:
+        """Yield the content of a chat completion as it is generated; counts as one call in flight until it ends.
+
+        Only starting the stream is retried; once content has been yielded an error ends it.
+        """
+        client = self._with_key(api_key)
+        async with self.scheduler.slot(lambda: client.chat.completions.create(stream=True, **request),
+                                       request_tokens(request)) as stream:
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+    async def coalesced(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await call(), or the call already in flight for key; returns its result and whether it was joined.
+
+        The call runs as its own task, so a caller that goes away (a closed
+        request, say) doesn't cancel it for the others waiting on it.
+        """
+        task = self.shared.get(key)
+        joined = task is not None
+        if not joined:
+            task = self.shared[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _: self.shared.pop(key, None))
+        return await asyncio.shield(task), joined
+
+    async def close(self):
+        await self.openai.close()
+
+
+def get_llm_client() -> LLMClient:
+    """The shared client of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = LLMClient()
+        logger.info(f"Created LLM client with up to {LLM_MAX_CONCURRENCY} concurrent calls")
+    return client
+
+
+def api_key_configured() -> bool:
+    return bool(os.getenv('OPENAI_API_KEY'))
+
+
+async def close_llm_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
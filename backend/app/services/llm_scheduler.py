@@ -0,0 +1,269 @@
+# app/services/llm_scheduler.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import openai
+
+from app.services.prompt_context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Configuring upstream rate limits; set them to the account's limits for the model, 0 turns one off
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "150000"))
+# seconds' worth of the limits the buckets let through at once; a whole minute
+# by default, so pacing only starts once calls compete for the limit
+LLM_RATE_BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", "60"))
+# completion tokens counted against the token limit for a request without max_tokens
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "500"))
+# attempts after the first for a throttled (429), overloaded (5xx) or dropped call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+
+# the statuses the OpenAI client itself would retry, besides 5xx
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class TokenBucket:
+    """Refills at rate_per_minute, holding at most burst_seconds' worth.
+
+    Callers reserve what they need and wait the returned delay; reservations
+    may run the bucket into debt, so waiters are served in the order they
+    reserved. A request larger than the bucket is charged the whole bucket,
+    so it goes through at once when the bucket is full. A rate of 0 never
+    makes anyone wait.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = LLM_RATE_BURST_SECONDS):
+        self.rate = rate_per_minute / 60
+        self.capacity = self.rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket; returns the seconds until it is covered."""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+
+class AdaptiveConcurrency:
+    """A limit on calls in flight that halves when the API throttles and creeps back up as calls succeed.
+
+    The limit grows by about one per limit's worth of successes and halves at
+    most once per round of calls: a throttled call that was sent before the last
+    decrease says nothing about the new limit. Only touched from the event loop
+    thread, so it needs no locking.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self._waiters = []
+
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns when the call started, for on_throttle."""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # it was woken already; pass the free slot on
+                    self._wake()
+                raise
+        self.in_flight += 1
+        return time.monotonic()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # woken waiters check the limit again, so waking one too many is harmless
+        for _ in range(int(self.limit) - self.in_flight):
+            if not self._waiters:
+                break
+            waiter = self._waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_throttle(self, started: float):
+        if started < self.last_decrease:
+            return
+        limit = int(self.limit)
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.last_decrease = time.monotonic()
+        if int(self.limit) < limit:
+            logger.warning(f"LLM API is throttling, lowered concurrency limit to {int(self.limit)}")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The wait an error response asks for in its retry-after-ms or Retry-After header, if any."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return max(0.0, float(headers['retry-after-ms']) / 1000)
+        if 'retry-after' in headers:
+            value = headers['retry-after']
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                # an HTTP date
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        # an exhausted quota is a 429 too, but waiting won't lift it
+        if getattr(error, 'code', None) == 'insufficient_quota':
+            return False
+        return error.status_code in RETRYABLE_STATUSES or error.status_code >= 500
+    return False
+
+
+def request_tokens(request: Dict[str, Any]) -> int:
+    """Tokens a chat completion request counts against the token limit: its messages and expected answer."""
+    prompt = sum(estimate_tokens(str(message.get('content') or '')) for message in request.get('messages', []))
+    return prompt + (request.get('max_tokens') or LLM_EXPECTED_COMPLETION_TOKENS)
+
+
+class LLMScheduler:
+    """Paces, limits and retries the upstream calls of one event loop.
+
+    A call waits for the request and token buckets, then for a slot under the
+    adaptive concurrency limit. Throttled, overloaded and dropped calls are
+    retried with jittered exponential backoff; a Retry-After from the API holds
+    back every call until it has passed, not only the one that got it.
+    """
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE, max_retries: int = LLM_MAX_RETRIES,
+                 burst_seconds: float = LLM_RATE_BURST_SECONDS):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        # monotonic time before which no call is sent, from the latest Retry-After
+        self.resume_at = 0.0
+        self.counts = {"calls": 0, "attempts": 0, "retries": 0, "throttled": 0,
+                       "server_errors": 0, "connection_errors": 0, "failed": 0}
+        self.paced_seconds = 0.0
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retrying after attempt failed with error."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # spread the retries so they don't all land the moment the wait ends
+            return retry_after + random.uniform(0, LLM_BACKOFF_BASE_SECONDS)
+        return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    async def _pace(self, tokens: int):
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay:
+            self.paced_seconds += delay
+            await asyncio.sleep(delay)
+
+    async def _hold_back(self):
+        while (delay := self.resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def _record_failure(self, error: Exception, started: float):
+        if isinstance(error, openai.APIConnectionError):
+            self.counts["connection_errors"] += 1
+        elif error.status_code == 429:
+            self.counts["throttled"] += 1
+            self.concurrency.on_throttle(started)
+            retry_after = retry_after_seconds(error)
+            if retry_after:
+                self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+        else:
+            self.counts["server_errors"] += 1
+
+    @asynccontextmanager
+    async def slot(self, send: Callable[[], Awaitable[Any]], tokens: int) -> AsyncIterator[Any]:
+        """Yield the result of send() once a call of tokens is allowed, retrying it as needed.
+
+        The call keeps its concurrency slot until the block ends, so a streamed
+        response counts as in flight while it is read.
+        """
+        self.counts["calls"] += 1
+        await self._pace(tokens)
+        attempt = 0
+        while True:
+            await self._hold_back()
+            started = await self.concurrency.acquire()
+            try:
+                self.counts["attempts"] += 1
+                result = await send()
+            except Exception as e:
+                self.concurrency.release()
+                if not is_retryable(e):
+                    self.counts["failed"] += 1
+                    raise
+                self._record_failure(e, started)
+                if attempt >= self.max_retries:
+                    self.counts["failed"] += 1
+                    logger.error(f"LLM call failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = self.backoff(attempt, e)
+                logger.info(f"LLM call failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+                attempt += 1
+                self.counts["retries"] += 1
+                await asyncio.sleep(delay)
+                # a retry is another request against the rate limits
+                await self._pace(tokens)
+                continue
+            except BaseException:
+                self.concurrency.release()
+                raise
+            self.concurrency.on_success()
+            break
+        try:
+            yield result
+        finally:
+            self.concurrency.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "paced_seconds": round(self.paced_seconds, 3),
+            "held_back_seconds": round(max(0.0, self.resume_at - time.monotonic()), 3),
+        }
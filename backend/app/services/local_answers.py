@@ -0,0 +1,200 @@
+# app/services/local_answers.py
+
+import os
+import posixpath
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configuring local answer settings
+# answer questions about what a file contains from the analysis itself, without GPT
+LOCAL_ANSWERS_ENABLED = os.getenv("GPT_LOCAL_ANSWERS", "1") != "0"
+
+# statements the analyzer counts in node_type_frequencies for an import
+IMPORT_NODE_TYPES = ('import_statement', 'import_from_statement', 'future_import_statement')
+
+# what a question asks about, as written -> the kind of answer
+_KINDS = {
+    "functions": "functions",
+    "methods": "functions",
+    "async functions": "async_functions",
+    "async methods": "async_functions",
+    "coroutines": "async_functions",
+    "classes": "classes",
+    "imports": "imports",
+    "import statements": "imports",
+}
+
+_KIND = "(?P<kind>" + "|".join(sorted(_KINDS, key=len, reverse=True)) + ")"
+_FILE = r"(?:the )?(?:file |module )?(?P<file>[\w./-]+\.py)"
+_WHAT = r"(?:what|which)(?: are| were)?(?: all)?(?: the)?(?: different)?"
+_IN = r"(?: are| is)?(?: present| defined| declared| there)? in"
+_HAVE = r"(?:have|define|declare|contain)"
+
+# (mode, pattern) matched against the whole of a normalized question
+_PATTERNS = [
+    ("list", re.compile(rf"{_WHAT} {_KIND}{_IN} {_FILE}")),
+    ("list", re.compile(rf"{_WHAT} {_KIND} (?:does|do) {_FILE} {_HAVE}")),
+    ("list", re.compile(rf"(?:list|show|name)(?: all)?(?: of)?(?: the)? {_KIND}(?: present| defined| declared)? in {_FILE}")),
+    ("count", re.compile(rf"how many {_KIND}{_IN} {_FILE}")),
+    ("count", re.compile(rf"how many {_KIND} (?:does|do) {_FILE} {_HAVE}")),
+]
+
+_counts = {"questions": 0, "answered_locally": 0}
+_answered_by_kind = {}
+
+
+def _normalize(question: str) -> str:
+    question = " ".join(question.lower().replace("`", "").replace('"', "").replace("'", "").split())
+    return question.rstrip("?.! ")
+
+
+@lru_cache(maxsize=1024)
+def parse_question(question: str) -> Optional[Tuple[str, str, str]]:
+    """(mode, kind, file key) of a question the analysis answers by itself, or None.
+
+    mode is "list" or "count"; the file key is how the analysis names the file,
+    e.g. "api_py" for "What functions does api.py have?".
+    """
+    normalized = _normalize(question)
+    for mode, pattern in _PATTERNS:
+        match = pattern.fullmatch(normalized)
+        if match:
+            file_name = posixpath.basename(match.group('file'))
+            return mode, _KINDS[match.group('kind')], file_name[:-len('.py')] + '_py'
+    return None
+
+
+def _file_name(key: str) -> str:
+    return key[:-len('_py')] + '.py'
+
+
+def _plural(count: int, word: str, plural: Optional[str] = None) -> str:
+    return f"{count} {word if count == 1 else plural or word + 's'}"
+
+
+def _section(analysis_data: Dict[str, Any], name: str, key: str) -> Optional[Any]:
+    section = analysis_data.get(name)
+    return section.get(key) if isinstance(section, dict) else None
+
+
+def _named_list(file_name: str, names: List[str], word: str, mode: str,
+                notes: Optional[Dict[str, str]] = None) -> str:
+    if not names:
+        return f"{file_name} has no {word}s."
+    if mode == "count":
+        return f"{file_name} has {_plural(len(names), word)}: {', '.join(names)}."
+    notes = notes or {}
+    lines = [f"{i}. {name}{notes.get(name, '')}" for i, name in enumerate(names, 1)]
+    return f"{file_name} has {_plural(len(names), word)}:\n" + "\n".join(lines)
+
+
+def _functions(analysis_data: Dict[str, Any], key: str, mode: str) -> Optional[str]:
+    # every function and method has metrics and a call chain, by qualified name (Client.get)
+    functions = _section(analysis_data, 'code_metrics', key)
+    if functions is None:
+        functions = _section(analysis_data, 'function_call_chains', key)
+    if functions is None:
+        return None
+    async_functions = set(_section(analysis_data, 'async_functions', key) or ())
+    return _named_list(_file_name(key), list(functions), "function", mode,
+                       {name: " (async)" for name in functions if name.rsplit('.', 1)[-1] in async_functions})
+
+
+def _async_functions(analysis_data: Dict[str, Any], key: str, mode: str) -> Optional[str]:
+    functions = _section(analysis_data, 'async_functions', key)
+    if functions is None:
+        return None
+    return _named_list(_file_name(key), list(functions), "async function", mode)
+
+
+def _classes(analysis_data: Dict[str, Any], key: str, mode: str) -> Optional[str]:
+    # the analysis counts class definitions but doesn't record their names
+    node_types = _section(analysis_data, 'node_type_frequencies', key)
+    if node_types is None or mode == "list":
+        return None
+    count = node_types.get('class_definition', 0)
+    if not count:
+        return f"{_file_name(key)} has no classes."
+    return f"{_file_name(key)} defines {_plural(count, 'class', 'classes')}."
+
+
+def _imports(analysis_data: Dict[str, Any], key: str, mode: str) -> Optional[str]:
+    # nor what the import statements import
+    node_types = _section(analysis_data, 'node_type_frequencies', key)
+    if node_types is None or mode == "list":
+        return None
+    count = sum(node_types.get(node_type, 0) for node_type in IMPORT_NODE_TYPES)
+    if not count:
+        return f"{_file_name(key)} has no imports."
+    answer = f"{_file_name(key)} has {_plural(count, 'import statement')}"
+    aliased = node_types.get('aliased_import', 0)
+    if aliased:
+        answer += f", importing {_plural(aliased, 'name')} under an alias"
+    return answer + "."
+
+
+_ANSWERS: Dict[str, Callable[[Dict[str, Any], str, str], Optional[str]]] = {
+    "functions": _functions,
+    "async_functions": _async_functions,
+    "classes": _classes,
+    "imports": _imports,
+}
+
+
+def analysis_files(analysis_data: Dict[str, Any]) -> List[str]:
+    """Keys of the files the analysis covers, e.g. ["app_py", "api_py"]."""
+    files = {}
+    for section in analysis_data.values():
+        if isinstance(section, dict):
+            files.update(dict.fromkeys(key for key in section if key.endswith('_py')))
+    return list(files)
+
+
+def _answer(analysis_data: Dict[str, Any], question: str) -> Optional[Tuple[str, str]]:
+    parsed = parse_question(question) if LOCAL_ANSWERS_ENABLED else None
+    if parsed is None:
+        return None
+    mode, kind, key = parsed
+
+    answer = _ANSWERS[kind](analysis_data, key, mode)
+    if answer is None:
+        files = analysis_files(analysis_data)
+        if not files or key in files:
+            return None
+        answer = (f"The analysis has no file named {_file_name(key)}; "
+                  f"it covers {' and '.join(_file_name(name) for name in files)}.")
+    return kind, answer
+
+
+def can_answer_locally(analysis_data: Dict[str, Any], question: str) -> bool:
+    """Whether answer_locally() answers question rather than leaving it to GPT, without counting it."""
+    return _answer(analysis_data, question) is not None
+
+
+def answer_locally(analysis_data: Dict[str, Any], question: str) -> Optional[str]:
+    """Answer question from the analysis data alone, or None if it needs GPT.
+
+    Questions listing or counting the functions or async functions of a file,
+    or counting its classes or imports, are answered from the sections holding
+    them; anything else, or analysis data without those sections, is left to GPT.
+    """
+    _counts["questions"] += 1
+    answered = _answer(analysis_data, question)
+    if answered is None:
+        return None
+    kind, answer = answered
+
+    _counts["answered_locally"] += 1
+    _answered_by_kind[kind] = _answered_by_kind.get(kind, 0) + 1
+    return answer
+
+
+def local_answer_stats() -> Dict[str, Any]:
+    """How many questions were asked and the fraction answered without GPT."""
+    questions = _counts["questions"]
+    return {
+        **_counts,
+        "local_fraction": round(_counts["answered_locally"] / questions, 4) if questions else 0.0,
+        "by_kind": dict(_answered_by_kind),
+    }
@@ -1,14 +1,23 @@
+import asyncio
 import openai
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
 import logging
-import json
 import os
+import time
 from dotenv import load_dotenv
 
+from app.services.llm_cache import llm_cache, llm_cache_key
+from app.services.llm_client import get_llm_client
+from app.services.prompt_context import CONTEXT_FORMATS, fit_to_budget
+from app.services.stage_timing import timed
+
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# how the analysis is encoded for diagram types that get all of it, one of prompt_context.CONTEXT_FORMATS
+GENERIC_CONTEXT_FORMAT = "outline"
+
 def prepare_mermaid_prompt(analysis_data: Dict[str, Any], diagram_type: str = "flowchart") -> str:
     """Prepare prompt for GPT-4 to generate Mermaid diagram."""
     try:
@@ -64,10 +73,11 @@ Generate ONLY the Mermaid diagram code without any explanations."""
 
         else:
             # Generic diagram type
+            encode, description = CONTEXT_FORMATS[GENERIC_CONTEXT_FORMAT]
             prompt = f"""Based on this code analysis, create a Mermaid {diagram_type} diagram showing the structure and relationships in the code.
 
-Analysis data summary:
-{json.dumps(analysis_data, indent=2)}
+Analysis data summary, {description}:
+{fit_to_budget(analysis_data, encode)}
 
 Requirements:
 1. Show main components and their relationships
@@ -98,8 +108,9 @@ def validate_analysis_data(analysis_data: Dict[str, Any]) -> bool:
         logger.exception("Error in validate_analysis_data")
         return False
 
-def generate_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagram_type: str = "flowchart") -> Dict[str, Any]:
-    """Generate Mermaid diagram using GPT-4."""
+async def generate_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagram_type: str = "flowchart",
+                             use_cache: bool = True) -> Dict[str, Any]:
+    """Generate Mermaid diagram using GPT-4, serving a diagram for the same prompt from the LLM response cache."""
     try:
         if not api_key:
             logger.error("No API key provided")
@@ -109,31 +120,44 @@ def generate_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagra
             logger.error("Invalid analysis data structure")
             return {"error": "Invalid analysis data structure", "type": diagram_type}
 
-        # Configuring OpenAI client
-        logger.debug("Setting up OpenAI client")
-        client = openai.OpenAI(api_key=api_key)
-
         # Preparing the prompt
         try:
-            prompt = prepare_mermaid_prompt(analysis_data, diagram_type)
+            with timed('prompt'):
+                prompt = prepare_mermaid_prompt(analysis_data, diagram_type)
             logger.debug(f"Prompt length: {len(prompt)}")
         except Exception as e:
             logger.exception("Error preparing prompt")
             return {"error": f"Failed to prepare prompt: {str(e)}", "type": diagram_type}
 
+        key = llm_cache_key("gpt-4", None, 0, prompt)
+        cached = None
+        if use_cache:
+            with timed('llm_cache'):
+                cached = await asyncio.to_thread(llm_cache.get, key)
+        else:
+            llm_cache.record_bypass()
+
         # Making the API call
         logger.debug("Making OpenAI API call")
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
-                temperature=0
-            )
-            
-            mermaid_code = response.choices[0].message.content.strip()
+            if cached is not None:
+                content = cached["answer"]
+            else:
+                start = time.perf_counter()
+                with timed('llm'):
+                    response = await get_llm_client().chat_completion(
+                        api_key=api_key,
+                        model="gpt-4",
+                        messages=[{
+                            "role": "user",
+                            "content": prompt
+                        }],
+                        temperature=0
+                    )
+                content = response.choices[0].message.content
+                await asyncio.to_thread(llm_cache.put, key, "gpt-4", content, time.perf_counter() - start)
+
+            mermaid_code = content.strip()
             logger.debug(f"Generated Mermaid code length: {len(mermaid_code)}")
 
             # Basic validation of generated code
@@ -143,7 +167,8 @@ def generate_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagra
             return {
                 "type": diagram_type,
                 "mermaid_code": mermaid_code,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                "cached": cached is not None
             }
 
         except openai.APIError as e:
@@ -162,9 +187,66 @@ def generate_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagra
             "timestamp": datetime.now().isoformat()
         }
 
+async def stream_mermaid_diagram(analysis_data: Dict[str, Any], api_key: str, diagram_type: str = "flowchart",
+                                 use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """Generate like generate_mermaid_diagram, yielding ("delta", text) as GPT writes the diagram.
+
+    Ends with ("done", result) carrying the whole, stripped diagram, or ("error", message).
+    """
+    if not api_key:
+        logger.error("No API key provided")
+        yield "error", "OpenAI API key is required"
+        return
+    if not validate_analysis_data(analysis_data):
+        logger.error("Invalid analysis data structure")
+        yield "error", "Invalid analysis data structure"
+        return
+
+    try:
+        with timed('prompt'):
+            prompt = prepare_mermaid_prompt(analysis_data, diagram_type)
+
+        key = llm_cache_key("gpt-4", None, 0, prompt)
+        cached = None
+        if use_cache:
+            with timed('llm_cache'):
+                cached = await asyncio.to_thread(llm_cache.get, key)
+        else:
+            llm_cache.record_bypass()
+
+        if cached is not None:
+            content = cached["answer"]
+            yield "delta", content
+        else:
+            parts = []
+            start = time.perf_counter()
+            with timed('llm'):
+                async for delta in get_llm_client().stream_chat_completion(
+                    api_key=api_key,
+                    model="gpt-4",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0
+                ):
+                    parts.append(delta)
+                    yield "delta", delta
+            content = "".join(parts)
+            await asyncio.to_thread(llm_cache.put, key, "gpt-4", content, time.perf_counter() - start)
+
+        yield "done", {
+            "type": diagram_type,
+            "mermaid_code": content.strip(),
+            "timestamp": datetime.now().isoformat(),
+            "cached": cached is not None
+        }
+    except Exception as e:
+        logger.exception("Error in stream_mermaid_diagram")
+        yield "error", f"Failed to generate diagram: {str(e)}"
+
 
 if __name__ == "__main__":
 
+    import asyncio
+
     load_dotenv()
     
     # getting API key from environment
@@ -183,7 +265,7 @@ if __name__ == "__main__":
     }
     
     # Generating diagram
-    result = generate_mermaid_diagram(example_data, api_key)
+    result = asyncio.run(generate_mermaid_diagram(example_data, api_key))
     
 
     if "error" in result:
@@ -0,0 +1,294 @@
+# app/services/project_analyzer.py
+
+import asyncio
+import io
+import os
+import posixpath
+import tarfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, Any, List, Optional, Tuple, Union
+
+from app.services import analysis_workers
+from app.services.code_analyzer import get_parser, walk
+from app.services.symbol_table import SymbolTable
+from app.services.upload_spool import UploadTooLargeError, spool_upload
+
+# Configuring project limits
+MAX_PROJECT_FILES = 5000
+MAX_PROJECT_BYTES = 200 * 1024 * 1024
+# largest single upload (archive or file) read from a request
+MAX_PROJECT_UPLOAD_BYTES = int(os.getenv("MAX_PROJECT_UPLOAD_BYTES", str(MAX_PROJECT_BYTES)))
+# below this many files the pool round trip costs more than it saves
+INLINE_FILE_LIMIT = 8
+CHUNKS_PER_WORKER = 4
+
+
+def module_name(path: str) -> str:
+    """Dotted module name of a project-relative path, e.g. 'pkg/sub/__init__.py' -> 'pkg.sub'."""
+    parts = path[:-len('.py')].split('/') if path.endswith('.py') else path.split('/')
+    if parts[-1] == '__init__' and len(parts) > 1:
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def absolute_module(importer_path: str, imported: str) -> Optional[str]:
+    """Absolute dotted name of an import in importer_path, e.g. '.b' in 'pkg/a.py' -> 'pkg.b'.
+
+    Returns None for relative imports that climb above the project root.
+    """
+    if not imported.startswith('.'):
+        return imported
+    package = module_name(importer_path).split('.')
+    if not importer_path.endswith('__init__.py'):
+        package = package[:-1]
+    level = len(imported) - len(imported.lstrip('.'))
+    if level - 1 > len(package):
+        return None
+    base = package[:len(package) - (level - 1)]
+    remainder = imported[level:]
+    return '.'.join(base + ([remainder] if remainder else []))
+
+
+def resolve_module(importer_path: str, imported: str, modules: Dict[str, str]) -> Optional[str]:
+    """Project module an import statement in importer_path refers to, or None for external modules."""
+    if imported.startswith('.'):
+        candidate = absolute_module(importer_path, imported)
+        return candidate if candidate in modules else None
+
+    if imported in modules:
+        return imported
+    # script-style projects import siblings by bare name, e.g. app.py doing "import api"
+    package = module_name(importer_path).split('.')
+    if not importer_path.endswith('__init__.py'):
+        package = package[:-1]
+    sibling = '.'.join(package + [imported])
+    return sibling if sibling in modules else None
+
+
+def summarize_collected_info(collected_info: SymbolTable) -> Dict[str, Any]:
+    """Per-file part of the project model: walk() output without traversal state or node counts."""
+    return {
+        'functions': collected_info.functions.to_list(),
+        'classes': collected_info.classes,
+        'imports': [imp.to_dict() for imp in collected_info.imports],
+        'imported_functions': collected_info.imported_functions,
+        'imported_modules': collected_info.imported_modules,
+        'async_functions': collected_info.async_functions.to_list(),
+        'error_handling': collected_info.error_handling.to_list(),
+        'class_hierarchy': {name: info.to_dict() for name, info in collected_info.class_hierarchy.items()},
+        'function_dependencies': {
+            function: dependencies.to_list()
+            for function, dependencies in collected_info.function_dependencies.items()
+        },
+        'decorated_functions': [func.to_dict() for func in collected_info.decorated_functions],
+        'api_calls': [call.to_dict() for call in collected_info.api_calls],
+        'function_metrics': {name: metrics.to_dict() for name, metrics in collected_info.function_metrics.items()},
+    }
+
+
+def analyze_module(path: str, source: bytes) -> Dict[str, Any]:
+    """Parse and walk one module, returning its summary, node counts and whether it had syntax errors."""
+    tree = get_parser().parse(source)
+    collected_info = walk(tree.root_node, source)
+    return {
+        'path': path,
+        'info': summarize_collected_info(collected_info),
+        'node_types': collected_info.node_types,
+        'has_error': tree.root_node.has_error,
+        'lines': source.count(b'\n') + 1,
+    }
+
+
+def _analyze_chunk(items: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    return [analyze_module(path, source) for path, source in items]
+
+
+def _normalize_path(name: str) -> Optional[str]:
+    path = posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+    if path.startswith('..') or not path.endswith('.py'):
+        return None
+    return path
+
+
+class SourceCollector:
+    """Python sources gathered from a project's uploads, held to the project limits as they are read.
+
+    Each member's size is checked before it is decompressed, so an archive
+    that would go over the limits is rejected without reading it all.
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.total_bytes = 0
+
+    def add(self, path: str, size: int, read: Callable[[], bytes]):
+        if path not in self.sources and len(self.sources) >= MAX_PROJECT_FILES:
+            raise UploadTooLargeError(f"Project has more than {MAX_PROJECT_FILES} Python files")
+        total_bytes = self.total_bytes - len(self.sources.get(path, b'')) + size
+        if total_bytes > MAX_PROJECT_BYTES:
+            raise UploadTooLargeError(
+                f"Project has more than the {MAX_PROJECT_BYTES} byte limit of Python source"
+            )
+        source = read()
+        self.total_bytes += len(source) - len(self.sources.get(path, b''))
+        self.sources[path] = source
+
+
+def extract_sources(filename: str, data: Union[bytes, BinaryIO],
+                    collector: Optional[SourceCollector] = None) -> Dict[str, bytes]:
+    """Python sources in an upload: the members of a zip or tar archive, or the file itself.
+
+    data is the upload's content or a seekable binary file holding it. Sources
+    go into collector, if given, alongside those of earlier uploads; its
+    sources are returned.
+    """
+    collector = collector or SourceCollector()
+    fileobj = io.BytesIO(data) if isinstance(data, bytes) else data
+
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for member in archive.infolist():
+                path = _normalize_path(member.filename)
+                if path and not member.is_dir():
+                    # reading stops at file_size even if the compressed data claims more
+                    collector.add(path, member.file_size, lambda: archive.read(member))
+        return collector.sources
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r:*')
+    except tarfile.TarError:
+        path = _normalize_path(filename or '')
+        if path is None:
+            raise ValueError(f"{filename} is neither a Python file nor a zip/tar archive")
+        size = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(0)
+        collector.add(path, size, fileobj.read)
+        return collector.sources
+
+    with archive:
+        for member in archive:
+            path = _normalize_path(member.name)
+            if path and member.isfile():
+                collector.add(path, member.size, lambda: archive.extractfile(member).read())
+    return collector.sources
+
+
+def _extract_spooled(uploads: List[Tuple[str, str]]) -> Dict[str, bytes]:
+    collector = SourceCollector()
+    for filename, path in uploads:
+        with open(path, 'rb') as f:
+            extract_sources(filename, f, collector)
+    return collector.sources
+
+
+async def read_project_uploads(files) -> Dict[str, bytes]:
+    """Python sources of a request's UploadFiles (zip/tar archives and/or .py files).
+
+    Each upload is spooled to disk, refusing any over MAX_PROJECT_UPLOAD_BYTES,
+    and extracted on an analysis thread within the project limits; raises
+    UploadTooLargeError past a limit.
+    """
+    spooled = []
+    try:
+        for upload in files:
+            spooled.append((upload.filename, await spool_upload(upload, MAX_PROJECT_UPLOAD_BYTES, utf8=False)))
+        return await analysis_workers.run_in_thread(
+            _extract_spooled, [(filename, upload.path) for filename, upload in spooled]
+        )
+    finally:
+        for _, upload in spooled:
+            upload.remove()
+
+
+def check_project_limits(sources: Dict[str, bytes]):
+    if not sources:
+        raise ValueError("No Python files found in the upload")
+    if len(sources) > MAX_PROJECT_FILES:
+        raise ValueError(f"Project has {len(sources)} Python files, the limit is {MAX_PROJECT_FILES}")
+    total_bytes = sum(len(source) for source in sources.values())
+    if total_bytes > MAX_PROJECT_BYTES:
+        raise ValueError(f"Project has {total_bytes} bytes of Python source, the limit is {MAX_PROJECT_BYTES}")
+
+
+def _chunks(sources: Dict[str, bytes], workers: int) -> List[List[Tuple[str, bytes]]]:
+    # largest files first, dealt round-robin so chunks end up with similar amounts of work
+    items = sorted(sources.items(), key=lambda item: len(item[1]), reverse=True)
+    count = max(1, min(len(items), workers * CHUNKS_PER_WORKER))
+    return [items[i::count] for i in range(count)]
+
+
+def merge_project(modules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-module results into one project model."""
+    modules = sorted(modules, key=lambda module: module['path'])
+    names = {module_name(module['path']): module['path'] for module in modules}
+
+    files = {}
+    node_types = {}
+    internal_imports = {}
+    totals = {'files': len(modules), 'lines': 0, 'functions': 0, 'classes': 0, 'imports': 0}
+    parse_errors = []
+    for module in modules:
+        info = module['info']
+        files[module['path']] = info
+        for node_type, count in module['node_types'].items():
+            node_types[node_type] = node_types.get(node_type, 0) + count
+
+        totals['lines'] += module['lines']
+        totals['functions'] += len(info['functions'])
+        totals['classes'] += len(info['classes'])
+        totals['imports'] += len(info['imports'])
+        if module['has_error']:
+            parse_errors.append(module['path'])
+
+        # imports that resolve to another module of the same project
+        imported = []
+        for imp in info['imports']:
+            target = resolve_module(module['path'], imp.get('module', ''), names)
+            if target and target not in imported:
+                imported.append(target)
+        if imported:
+            internal_imports[module_name(module['path'])] = imported
+
+    return {
+        'summary': {**totals, 'parse_errors': parse_errors},
+        'modules': names,
+        'internal_imports': internal_imports,
+        'node_type_frequencies': node_types,
+        'files': files,
+    }
+
+
+def analyze_project(sources: Dict[str, bytes]) -> Dict[str, Any]:
+    """Analyze every module of a project in the worker pool and merge the results."""
+    check_project_limits(sources)
+    if len(sources) <= INLINE_FILE_LIMIT:
+        return merge_project(_analyze_chunk(list(sources.items())))
+
+    pool = analysis_workers.start_pool()
+    modules = []
+    for chunk_result in pool.map(_analyze_chunk, _chunks(sources, analysis_workers.pool_workers())):
+        modules.extend(chunk_result)
+    return merge_project(modules)
+
+
+async def analyze_project_async(sources: Dict[str, bytes]) -> Dict[str, Any]:
+    """analyze_project() for request handlers: waits for the pool without blocking the event loop.
+
+    The whole project counts as one job against the analysis queue limit.
+    """
+    check_project_limits(sources)
+    if len(sources) <= INLINE_FILE_LIMIT:
+        return await analysis_workers.run_in_thread(analyze_project, sources)
+
+    with analysis_workers.limiter.admit():
+        loop = asyncio.get_running_loop()
+        pool = analysis_workers.start_pool()
+        chunk_results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _analyze_chunk, chunk)
+            for chunk in _chunks(sources, analysis_workers.pool_workers())
+        ])
+        modules = [module for chunk_result in chunk_results for module in chunk_result]
+        return await loop.run_in_executor(None, merge_project, modules)
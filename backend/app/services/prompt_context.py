@@ -0,0 +1,202 @@
+# app/services/prompt_context.py
+
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Optional
+
+# Configuring prompt settings
+# tokens of analysis data a prompt may carry, leaving GPT-4's 8k window room for the template and answer
+CONTEXT_TOKEN_BUDGET = int(os.getenv("GPT_CONTEXT_TOKEN_BUDGET", "6000"))
+
+# the pre-tokenizer split of OpenAI's cl100k encoding: contractions, words, numbers
+# of up to three digits, punctuation runs and whitespace, each with its leading space
+_PRETOKEN = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the cl100k token count of text without a tokenizer.
+
+    Every pre-token counts as one token and long ones (identifiers, mostly) as
+    one more per eight characters, so the estimate errs on the high side.
+    """
+    return sum(1 + len(piece) // 8 for piece in _PRETOKEN.findall(text))
+
+
+def prune_context(analysis_data: Dict[str, Any], paths: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Keep only the parts of analysis_data named by dotted paths such as 'code_metrics.api_py'.
+
+    None keeps everything. Paths missing from the data are skipped, and when
+    none of them is present the data is returned whole, so analyses of another
+    shape still reach the model.
+    """
+    if paths is None:
+        return analysis_data
+    pruned = {}
+    for path in paths:
+        keys = path.split('.')
+        value = analysis_data
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = pruned
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return pruned if pruned else analysis_data
+
+
+class Omitted(str):
+    """Marks where fit_to_budget() cut a list or dict short; encodes like any other string."""
+
+
+def _cap_items(value: Any, cap: int) -> Any:
+    """A copy of value with every list and dict cut to its first cap items plus a note of what was left out."""
+    if isinstance(value, dict):
+        items = list(value.items())
+        capped = {key: _cap_items(item, cap) for key, item in items[:cap]}
+        if len(items) > cap:
+            capped["..."] = Omitted(f"{len(items) - cap} more")
+        return capped
+    if isinstance(value, list):
+        capped = [_cap_items(item, cap) for item in value[:cap]]
+        if len(value) > cap:
+            capped.append(Omitted(f"... {len(value) - cap} more"))
+        return capped
+    return value
+
+
+def _longest_container(value: Any) -> int:
+    if isinstance(value, dict):
+        return max([len(value)] + [_longest_container(item) for item in value.values()])
+    if isinstance(value, list):
+        return max([len(value)] + [_longest_container(item) for item in value])
+    return 0
+
+
+def fit_to_budget(context: Any, encode, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Encode context, cutting every list and dict to the same number of items if that is what it takes to fit budget.
+
+    The cap is the largest one whose encoding fits, found by binary search, so
+    the same data and budget always give the same text.
+    """
+    text = encode(context)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    low, high = 0, _longest_container(context)
+    best = encode(_cap_items(context, 0))
+    while low < high:
+        cap = (low + high + 1) // 2
+        candidate = encode(_cap_items(context, cap))
+        if estimate_tokens(candidate) <= budget:
+            low, best = cap, candidate
+        else:
+            high = cap - 1
+    return best
+
+
+def json_context(context: Any) -> str:
+    return json.dumps(context, indent=2)
+
+
+def _split_omitted(value):
+    """value without fit_to_budget()'s trailing marker, and the marker (or None)."""
+    if isinstance(value, dict) and isinstance(value.get("..."), Omitted):
+        return {key: item for key, item in value.items() if key != "..."}, f"... {value['...']}"
+    if isinstance(value, list) and value and isinstance(value[-1], Omitted):
+        return value[:-1], value[-1]
+    return value, None
+
+
+def _inline(value: Any) -> str:
+    """value on one line, as a table cell or list item."""
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        columns = _columns(value)
+        if columns is not None:
+            # records inside a cell, e.g. a function's parameters: the keys once, then "; "-separated rows
+            rows = "; ".join(" | ".join(_inline(row[column]) for column in columns) for row in value)
+            return f"[({' | '.join(columns)}) {rows}]"
+        return "[" + ", ".join(_inline(item) for item in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {_inline(item)}" for key, item in value.items()) + "}"
+    return str(value)
+
+
+def _columns(rows) -> Optional[tuple]:
+    """The shared keys of rows when they are all dicts with the same keys, else None."""
+    if not rows or not all(isinstance(row, dict) and row for row in rows):
+        return None
+    columns = tuple(rows[0])
+    if any(tuple(row) != columns for row in rows):
+        return None
+    return columns
+
+
+def _outline(value: Any, label: str, indent: str, lines: list):
+    value, omitted = _split_omitted(value)
+    if isinstance(value, dict) and value:
+        columns = _columns(list(value.values()))
+        if columns is not None:
+            # a dict of uniform records, e.g. function -> metrics: one row per key
+            lines.append(f"{indent}{label} (name | {' | '.join(columns)})")
+            for key, row in value.items():
+                lines.append(f"{indent}  {key} | {' | '.join(_inline(row[column]) for column in columns)}")
+        elif not any(isinstance(item, (dict, list)) for item in value.values()):
+            # plain values, e.g. node type counts: one line
+            lines.append(f"{indent}{label} {', '.join(f'{key}={_inline(item)}' for key, item in value.items())}")
+        else:
+            lines.append(f"{indent}{label}")
+            for key, item in value.items():
+                _outline(item, f"{key}:", indent + "  ", lines)
+    elif isinstance(value, list) and value:
+        columns = _columns(value)
+        if columns is not None:
+            lines.append(f"{indent}{label} ({' | '.join(columns)})")
+            for row in value:
+                lines.append(f"{indent}  {' | '.join(_inline(row[column]) for column in columns)}")
+        else:
+            lines.append(f"{indent}{label} {', '.join(_inline(item) for item in value)}")
+    elif isinstance(value, (dict, list)):
+        lines.append(f"{indent}{label} (none)")
+    else:
+        lines.append(f"{indent}{label} {_inline(value)}")
+    if omitted is not None:
+        lines.append(f"{indent}  {omitted}")
+
+
+def outline_context(context: Any) -> str:
+    """Encode context as an indented outline instead of JSON.
+
+    Keys are written once: a list of records with the same keys, or a dict of
+    them, becomes a header listing the columns followed by one row per record,
+    and a list of plain values, or a dict of them (as key=value), goes on one
+    comma-separated line. Null is "-".
+    """
+    lines = []
+    if isinstance(context, dict):
+        context, omitted = _split_omitted(context)
+        for key, value in context.items():
+            _outline(value, f"{key}:", "", lines)
+        if omitted is not None:
+            lines.append(omitted)
+    else:
+        _outline(context, "data:", "", lines)
+    return "\n".join(lines)
+
+
+# format name -> (encoder, how the prompt introduces the encoded data)
+CONTEXT_FORMATS = {
+    "json": (json_context, "in JSON format"),
+    "outline": (
+        outline_context,
+        "as an indented outline (a header lists a table's columns in parentheses, "
+        "followed by one row per line, with '-' for no value)",
+    ),
+}
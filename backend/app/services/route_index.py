@@ -0,0 +1,177 @@
+# app/services/route_index.py
+
+import re
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.services.symbol_table import SymbolTable
+
+# client/decorator method names and the HTTP method they stand for
+HTTP_METHODS = ('get', 'post', 'put', 'delete', 'patch', 'head', 'options')
+# decorators that take the methods as an argument, e.g. Flask's @app.route('/x', methods=['POST'])
+MULTI_METHOD_DECORATORS = ('route', 'api_route')
+
+_STRING_PREFIX = re.compile(r"^[rRbBuUfF]{0,2}")
+_QUOTED = re.compile(r"""["']([A-Za-z]+)["']""")
+_PLACEHOLDER = re.compile(r"^\{[^{}]*\}")
+
+
+def string_literal_value(text: str) -> Optional[Tuple[str, bool]]:
+    """Value of a Python string literal's source text and whether it is an f-string, or None."""
+    prefix = _STRING_PREFIX.match(text).group(0)
+    body = text[len(prefix):]
+    for quote in ('"""', "'''", '"', "'"):
+        if len(body) >= 2 * len(quote) and body.startswith(quote) and body.endswith(quote):
+            return body[len(quote):-len(quote)], 'f' in prefix.lower()
+    return None
+
+
+def _normalize_segment(segment: str) -> str:
+    # Flask writes parameters as <name> or <converter:name>
+    if segment.startswith('<') and segment.endswith('>'):
+        return '{' + segment[1:-1].split(':')[-1] + '}'
+    return segment
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    return tuple(_normalize_segment(segment) for segment in path.strip('/').split('/') if segment)
+
+
+def url_path(url_text: str) -> Optional[str]:
+    """Path a URL string literal points at, e.g. '"http://localhost:8000/items/1?q=2"' -> '/items/1'.
+
+    f-strings keep their placeholders, and a leading placeholder is taken to be
+    the base URL: f"{API_URL}/items/{item_id}" -> '/items/{item_id}'.
+    Literals that do not look like a URL or an absolute path give None.
+    """
+    literal = string_literal_value(url_text)
+    if literal is None:
+        return None
+    value, is_fstring = literal
+
+    if is_fstring and value.startswith('{'):
+        value = _PLACEHOLDER.sub('', value, count=1)
+        if not value.startswith('/'):
+            return None
+    elif '://' in value:
+        value = urlsplit(value).path or '/'
+    elif not value.startswith('/'):
+        return None
+
+    value = value.split('?', 1)[0].split('#', 1)[0]
+    return '/' + '/'.join(split_path(value))
+
+
+def is_placeholder(segment: str) -> bool:
+    return segment.startswith('{') and segment.endswith('}')
+
+
+class Route:
+    __slots__ = ('path', 'methods', 'handler', 'segments')
+
+    def __init__(self, path: str, methods: Tuple[str, ...], handler: str):
+        self.segments = split_path(path)
+        self.path = '/' + '/'.join(self.segments)
+        self.methods = methods
+        self.handler = handler
+
+    def __repr__(self) -> str:
+        return f"Route({self.path!r}, {self.methods!r}, {self.handler!r})"
+
+
+class _RouteNode:
+    __slots__ = ('static', 'param', 'catch_all', 'routes')
+
+    def __init__(self):
+        self.static = {}
+        self.param = None
+        # routes whose last segment is a {name:path} parameter and swallows the rest of the path
+        self.catch_all = []
+        self.routes = []
+
+
+def routes_from_decorators(info: SymbolTable) -> List[Route]:
+    """Routes declared by @app.get('/path')-style decorators on the functions of a module."""
+    routes = []
+    for func in info.decorated_functions:
+        for decorator in func.decorators:
+            attribute = decorator.name.rsplit('.', 1)[-1]
+            if attribute not in HTTP_METHODS and attribute not in MULTI_METHOD_DECORATORS:
+                continue
+            if '.' not in decorator.name or not decorator.arguments:
+                continue
+
+            path = None
+            methods = (attribute.upper(),) if attribute in HTTP_METHODS else ('GET',)
+            for argument in decorator.arguments:
+                literal = string_literal_value(argument)
+                if literal is not None and path is None:
+                    path = literal[0]
+                elif argument.startswith('path=') and path is None:
+                    literal = string_literal_value(argument[len('path='):].strip())
+                    path = literal[0] if literal else None
+                elif argument.startswith('methods=') and attribute in MULTI_METHOD_DECORATORS:
+                    methods = tuple(method.upper() for method in _QUOTED.findall(argument)) or methods
+            if path is not None:
+                routes.append(Route(path, methods, func.name))
+    return routes
+
+
+class RouteIndex:
+    """Segment trie of path templates, so a call's URL is resolved in time proportional to its length.
+
+    Static segments take priority over {param} segments, and placeholders in the
+    looked-up path (from f-strings) match any single segment.
+    """
+
+    def __init__(self, routes: Iterable[Route] = ()):
+        self._root = _RouteNode()
+        self.routes = []
+        for route in routes:
+            self.add(route)
+
+    @classmethod
+    def from_symbol_table(cls, info: SymbolTable) -> 'RouteIndex':
+        return cls(routes_from_decorators(info))
+
+    def add(self, route: Route):
+        self.routes.append(route)
+        node = self._root
+        for position, segment in enumerate(route.segments):
+            if is_placeholder(segment):
+                if segment.endswith(':path}') and position == len(route.segments) - 1:
+                    node.catch_all.append(route)
+                    return
+                if node.param is None:
+                    node.param = _RouteNode()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _RouteNode())
+        node.routes.append(route)
+
+    def _candidates(self, node: _RouteNode, segments: Tuple[str, ...], position: int):
+        # yields matching routes, most specific first
+        if position == len(segments):
+            yield from node.routes
+            yield from node.catch_all
+            return
+
+        segment = segments[position]
+        if is_placeholder(segment):
+            for child in node.static.values():
+                yield from self._candidates(child, segments, position + 1)
+        else:
+            child = node.static.get(segment)
+            if child is not None:
+                yield from self._candidates(child, segments, position + 1)
+        if node.param is not None:
+            yield from self._candidates(node.param, segments, position + 1)
+        yield from node.catch_all
+
+    def match(self, path: str, method: str) -> Optional[Route]:
+        """The route serving an HTTP method on a path, or None."""
+        method = method.upper()
+        for route in self._candidates(self._root, split_path(path), 0):
+            if method in route.methods:
+                return route
+        return None
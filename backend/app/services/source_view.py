@@ -0,0 +1,53 @@
+# app/services/source_view.py
+
+import sys
+
+
+class SourceView:
+    """Node text access for one parsed source, shared by every extractor of a walk.
+
+    The source (bytes, mmap or memoryview) is wrapped in a memoryview, so slicing
+    it never copies the buffer. Text is only decoded when a handler asks for it,
+    byte checks compare in place, and identifiers are interned. Extractors that
+    subscribe to the same node run back to back, so the last identifier decoded
+    is remembered and a node read by several of them is decoded once. Use it as
+    a context manager so the view of an mmap is released before the mapping is
+    closed.
+    """
+
+    __slots__ = ('data', '_last_start', '_last_end', '_last_identifier')
+
+    def __init__(self, source):
+        self.data = memoryview(source)
+        self._last_start = self._last_end = -1
+        self._last_identifier = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.data.release()
+
+    def text(self, node) -> str:
+        return str(self.data[node.start_byte:node.end_byte], 'utf-8')
+
+    def identifier(self, node) -> str:
+        start, end = node.start_byte, node.end_byte
+        if start != self._last_start or end != self._last_end:
+            self._last_identifier = sys.intern(str(self.data[start:end], 'utf-8'))
+            self._last_start, self._last_end = start, end
+        return self._last_identifier
+
+    def startswith(self, node, prefix: bytes) -> bool:
+        start = node.start_byte
+        return node.end_byte - start >= len(prefix) and self.data[start:start + len(prefix)] == prefix
+
+    def endswith(self, node, suffixes) -> bool:
+        """Whether the node's text ends with any of the byte strings in suffixes."""
+        end = node.end_byte
+        length = end - node.start_byte
+        data = self.data
+        for suffix in suffixes:
+            if len(suffix) <= length and data[end - len(suffix):end] == suffix:
+                return True
+        return False
@@ -0,0 +1,35 @@
+# app/services/sse.py
+
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Event; data goes out as JSON on a single line."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+async def _encode(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[bytes]:
+    async for event, data in events:
+        if event == "delta":
+            yield sse_event("delta", {"text": data})
+        elif event == "error":
+            yield sse_event("error", {"detail": data})
+        else:
+            yield sse_event(event, data)
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Stream (event, data) pairs from a service as text/event-stream.
+
+    "delta" text is sent as {"text": ...} and "error" messages as {"detail": ...},
+    like HTTPException bodies; anything else is sent as it is.
+    """
+    return StreamingResponse(
+        _encode(events),
+        media_type="text/event-stream",
+        # no caching or proxy buffering, so every event reaches the browser as it is sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,156 @@
+# app/services/stage_timing.py
+
+import contextvars
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets, from cache hits to LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (stage, seconds) recorded while handling the current request; None outside one
+_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar('stages', default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as one stage of the current request. Does nothing outside a request."""
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # list.append is atomic, so stages timed on worker threads need no lock
+        stages.append((stage, time.perf_counter() - start))
+
+
+@contextmanager
+def collect_stages():
+    """Collect the stages timed inside the block into a fresh list, e.g. in a pool worker process."""
+    stages = []
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+def record_stages(stages: Iterable[Tuple[str, float]]):
+    """Add stages timed elsewhere (such as in a worker process) to the current request."""
+    current = _stages.get()
+    if current is not None:
+        current.extend(stages)
+
+
+def stage_totals(stages: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+    """Seconds per stage, in order of first appearance; a stage timed more than once is summed."""
+    totals = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+
+def server_timing_header(totals: Dict[str, float], total_seconds: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label value tuple.
+
+    Only updated from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self.series = {}
+
+    def observe(self, label_values: Tuple[str, ...], seconds: float):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self.series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_duration = Histogram(
+    'codeinsight_request_duration_seconds', "Time to handle a request, by route, method and status.",
+    ('route', 'method', 'status'),
+)
+stage_duration = Histogram(
+    'codeinsight_stage_duration_seconds', "Time spent in each stage of a request, by route.",
+    ('route', 'stage'),
+)
+
+
+def render_metrics() -> str:
+    lines = request_duration.render() + stage_duration.render()
+    return "\n".join(lines) + "\n"
+
+
+class StageTimingMiddleware:
+    """Times every HTTP request and the stages timed while handling it.
+
+    The stages are sent back in a Server-Timing header and, together with the
+    request duration, observed into the histograms served on /metrics. Stages
+    that finish after the response headers go out (streamed bodies) only reach
+    the histograms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stages = []
+        token = _stages.set(stages)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                header = server_timing_header(stage_totals(stages), time.perf_counter() - start)
+                message['headers'] = list(message.get('headers', [])) + [(b'server-timing', header.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stages.reset(token)
+            elapsed = time.perf_counter() - start
+            # the route template, so /index/{project} is one series however many projects there are
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            request_duration.observe((route, scope['method'], str(status)), elapsed)
+            for stage, seconds in stage_totals(stages).items():
+                stage_duration.observe((route, stage), seconds)
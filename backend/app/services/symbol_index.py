@@ -0,0 +1,374 @@
+# app/services/symbol_index.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.code_analyzer import ANALYZER_VERSION
+from app.services.project_analyzer import absolute_module
+
+logger = logging.getLogger(__name__)
+
+# Configuring index settings
+# resolved against the backend directory rather than wherever the server was started
+INDEX_PATH = Path(os.getenv("SYMBOL_INDEX_PATH", str(Path(__file__).resolve().parents[2] / "storage" / "symbol_index.db")))
+DEFAULT_LIMIT = 50
+# Bump whenever SCHEMA changes; an index with another version is dropped and rebuilt from later uploads
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    analyzer_version TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    UNIQUE (project, path)
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    parent TEXT,
+    is_async INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_by_file ON symbols (file_id);
+CREATE TABLE IF NOT EXISTS parameters (
+    symbol_id INTEGER NOT NULL REFERENCES symbols(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    default_value TEXT
+);
+CREATE INDEX IF NOT EXISTS parameters_by_symbol ON parameters (symbol_id);
+CREATE TABLE IF NOT EXISTS decorators (
+    symbol_id INTEGER NOT NULL REFERENCES symbols(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    arguments TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS decorators_by_symbol ON decorators (symbol_id);
+CREATE TABLE IF NOT EXISTS imports (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    module TEXT NOT NULL,
+    name TEXT,
+    alias TEXT,
+    -- module with relative imports made absolute, e.g. '.b' in pkg/a.py -> 'pkg.b'
+    resolved_module TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_by_module ON imports (resolved_module);
+CREATE INDEX IF NOT EXISTS imports_by_file ON imports (file_id);
+CREATE TABLE IF NOT EXISTS calls (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    caller TEXT NOT NULL,
+    callee TEXT NOT NULL,
+    -- the called name without what it is called on, e.g. 'helper' for 'utils.helper'
+    callee_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_by_callee_name ON calls (callee_name);
+CREATE INDEX IF NOT EXISTS calls_by_file ON calls (file_id);
+-- rowid is symbols.id; underscores separate tokens, so 'user' finds get_user_by_id
+CREATE VIRTUAL TABLE IF NOT EXISTS symbol_names USING fts5(name);
+"""
+
+TABLES = ('symbol_names', 'calls', 'imports', 'decorators', 'parameters', 'symbols', 'files')
+
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+
+
+def source_digest(source: bytes) -> str:
+    return hashlib.sha256(source).hexdigest()
+
+
+def fts_query(text: str) -> Optional[str]:
+    """FTS5 query matching names that contain every word of text as a token prefix."""
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class SymbolIndex:
+    """SQLite index of analyzed files, queried without re-parsing anything.
+
+    Files are stored per (project, path). Re-indexing a file replaces all of
+    its rows, and whole batches are written in one transaction.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        # sqlite allows one writer at a time; serializing here avoids busy timeouts
+        self._write_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write_lock:
+            connection = self._connection()
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # the index only holds what uploads produced, so an outdated one is rebuilt rather than migrated
+                with connection:
+                    for table in TABLES:
+                        connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # Writing
+
+    def _delete_file(self, connection: sqlite3.Connection, file_id: int):
+        connection.execute(
+            "DELETE FROM symbol_names WHERE rowid IN (SELECT id FROM symbols WHERE file_id = ?)", (file_id,)
+        )
+        # symbols, parameters, decorators, imports and calls go with it
+        connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _insert_file(self, connection: sqlite3.Connection, project: str, path: str, digest: str,
+                     info: Dict[str, Any]):
+        file_id = connection.execute(
+            "INSERT INTO files (project, path, digest, analyzer_version, indexed_at) VALUES (?, ?, ?, ?, ?)",
+            (project, path, digest, ANALYZER_VERSION, time.time()),
+        ).lastrowid
+
+        async_functions = set(info['async_functions'])
+        # one row per function by qualified name (e.g. A.run), so same-named methods of different classes
+        # stay apart; the parent is the class the function is defined in directly, if any
+        functions = info['function_dependencies']
+        symbols = []
+        for qualified_name in functions:
+            outer, _, name = qualified_name.rpartition('.')
+            parent = outer.rpartition('.')[2] if outer and outer not in functions else None
+            symbols.append(('function', name, parent, name in async_functions))
+        symbols.extend(('class', name, None, False) for name in info['classes'])
+
+        symbol_ids = {}
+        names = []
+        for kind, name, parent, is_async in symbols:
+            symbol_id = connection.execute(
+                "INSERT INTO symbols (file_id, kind, name, parent, is_async) VALUES (?, ?, ?, ?, ?)",
+                (file_id, kind, name, parent, int(is_async)),
+            ).lastrowid
+            symbol_ids.setdefault((kind, name), symbol_id)
+            names.append((symbol_id, name))
+        connection.executemany("INSERT INTO symbol_names (rowid, name) VALUES (?, ?)", names)
+
+        parameters = []
+        decorators = []
+        for func in info['decorated_functions']:
+            symbol_id = symbol_ids.get(('function', func['name']))
+            if symbol_id is None:
+                continue
+            parameters.extend(
+                (symbol_id, position, param['name'], param.get('type'), param.get('default'))
+                for position, param in enumerate(func['parameters'])
+            )
+            decorators.extend(
+                (symbol_id, position, decorator['name'], json.dumps(decorator['arguments']))
+                for position, decorator in enumerate(func['decorators'])
+            )
+        connection.executemany("INSERT INTO parameters VALUES (?, ?, ?, ?, ?)", parameters)
+        connection.executemany("INSERT INTO decorators VALUES (?, ?, ?, ?)", decorators)
+        connection.executemany(
+            "INSERT INTO imports VALUES (?, ?, ?, ?, ?)",
+            [
+                (file_id, imp['module'], imp.get('name'), imp.get('alias'),
+                 absolute_module(path, imp['module']) or imp['module'])
+                for imp in info['imports']
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO calls VALUES (?, ?, ?, ?)",
+            [
+                (file_id, caller, callee, callee.rpartition('.')[2])
+                for caller, callees in info['function_dependencies'].items()
+                for callee in callees
+            ],
+        )
+
+    def replace_files(self, project: str, files: Iterable[Tuple[str, str, Dict[str, Any]]],
+                      paths: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+        """Index (path, digest, info) entries in one transaction, replacing earlier versions of the same paths.
+
+        info is a per-file summary as produced by summarize_collected_info().
+        paths, when given, are all the paths the project has now; files indexed
+        under any other path are removed in the same transaction. Returns the
+        number of files indexed and removed.
+        """
+        count = removed = 0
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                if paths is not None:
+                    keep = set(paths)
+                    stale = [row['id'] for row in connection.execute(
+                        "SELECT id, path FROM files WHERE project = ?", (project,)
+                    ).fetchall() if row['path'] not in keep]
+                    for file_id in stale:
+                        self._delete_file(connection, file_id)
+                    removed = len(stale)
+                for path, digest, info in files:
+                    row = connection.execute(
+                        "SELECT id FROM files WHERE project = ? AND path = ?", (project, path)
+                    ).fetchone()
+                    if row is not None:
+                        self._delete_file(connection, row['id'])
+                    self._insert_file(connection, project, path, digest, info)
+                    count += 1
+        logger.info(f"Indexed {count} files for project {project}, removed {removed}")
+        return count, removed
+
+    def remove_project(self, project: str) -> int:
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                file_ids = [row['id'] for row in connection.execute(
+                    "SELECT id FROM files WHERE project = ?", (project,)
+                )]
+                for file_id in file_ids:
+                    self._delete_file(connection, file_id)
+        return len(file_ids)
+
+    # Reading
+
+    def digests(self, project: str) -> Dict[str, str]:
+        """path -> digest of every file indexed for project with the current analyzer version."""
+        rows = self._connection().execute(
+            "SELECT path, digest FROM files WHERE project = ? AND analyzer_version = ?",
+            (project, ANALYZER_VERSION),
+        )
+        return {row['path']: row['digest'] for row in rows}
+
+    def _describe_functions(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        connection = self._connection()
+        results = []
+        for row in rows:
+            parameters = connection.execute(
+                "SELECT name, type, default_value FROM parameters WHERE symbol_id = ? ORDER BY position",
+                (row['id'],),
+            ).fetchall()
+            decorators = connection.execute(
+                "SELECT name, arguments FROM decorators WHERE symbol_id = ? ORDER BY position", (row['id'],)
+            ).fetchall()
+            results.append({
+                'name': row['name'],
+                'path': row['path'],
+                'class': row['parent'],
+                'is_async': bool(row['is_async']),
+                'parameters': [
+                    {'name': p['name'], 'type': p['type'], 'default': p['default_value']} for p in parameters
+                ],
+                'decorators': [{'name': d['name'], 'arguments': json.loads(d['arguments'])} for d in decorators],
+            })
+        return results
+
+    def _search(self, project: str, kind: str, query: Optional[str], limit: int) -> List[sqlite3.Row]:
+        connection = self._connection()
+        match = fts_query(query) if query else None
+        if query and match is None:
+            return []
+        if match is None:
+            return connection.execute(
+                "SELECT symbols.*, files.path FROM symbols JOIN files ON files.id = symbols.file_id "
+                "WHERE files.project = ? AND symbols.kind = ? ORDER BY symbols.name, files.path LIMIT ?",
+                (project, kind, limit),
+            ).fetchall()
+        # exact name matches come straight from the name index, full-text matches fill up the rest
+        exact = connection.execute(
+            "SELECT symbols.*, files.path FROM symbols JOIN files ON files.id = symbols.file_id "
+            "WHERE symbols.name = ? AND files.project = ? AND symbols.kind = ? ORDER BY files.path LIMIT ?",
+            (query, project, kind, limit),
+        ).fetchall()
+        if len(exact) == limit:
+            return exact
+        return exact + connection.execute(
+            "SELECT symbols.*, files.path FROM symbol_names "
+            "JOIN symbols ON symbols.id = symbol_names.rowid JOIN files ON files.id = symbols.file_id "
+            "WHERE symbol_names MATCH ? AND files.project = ? AND symbols.kind = ? AND symbols.name != ? "
+            "ORDER BY rank LIMIT ?",
+            (match, project, kind, query, limit - len(exact)),
+        ).fetchall()
+
+    def find_functions(self, project: str, query: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Functions whose name matches query (full-text, by word prefix), exact matches first."""
+        return self._describe_functions(self._search(project, 'function', query, limit))
+
+    def list_classes(self, project: str, query: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        connection = self._connection()
+        results = []
+        for row in self._search(project, 'class', query, limit):
+            methods = connection.execute(
+                "SELECT name FROM symbols WHERE file_id = ? AND kind = 'function' AND parent = ? ORDER BY id",
+                (row['file_id'], row['name']),
+            ).fetchall()
+            results.append({'name': row['name'], 'path': row['path'], 'methods': [m['name'] for m in methods]})
+        return results
+
+    def importers(self, project: str, module: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Files importing module, a submodule of it, or (for "pkg.name") the name from its package."""
+        package, _, name = module.rpartition('.')
+        rows = self._connection().execute(
+            "SELECT files.path, imports.module, imports.name, imports.alias FROM imports "
+            "JOIN files ON files.id = imports.file_id "
+            "WHERE files.project = ? AND (imports.resolved_module = ? "
+            # submodules, as a range the module index can serve: '/' sorts right after '.'
+            "OR (imports.resolved_module >= ? AND imports.resolved_module < ?) "
+            "OR (imports.resolved_module = ? AND imports.name = ?)) "
+            "ORDER BY files.path LIMIT ?",
+            (project, module, module + '.', module + '/', package, name, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def callers(self, project: str, function: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Call sites whose callee is function, by name as written (e.g. 'helper' or 'utils.helper')."""
+        # the indexed callee_name narrows the rows down; the pattern only checks a dotted function's prefix
+        rows = self._connection().execute(
+            "SELECT files.path, calls.caller, calls.callee FROM calls JOIN files ON files.id = calls.file_id "
+            "WHERE calls.callee_name = ? AND files.project = ? "
+            "AND (calls.callee = ? OR calls.callee LIKE ? ESCAPE '\\') "
+            "ORDER BY files.path, calls.caller LIMIT ?",
+            (function.rpartition('.')[2], project, function,
+             '%.' + function.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'), limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self, project: str) -> Dict[str, int]:
+        connection = self._connection()
+        counts = connection.execute(
+            "SELECT COUNT(DISTINCT files.id) AS files, "
+            "COUNT(CASE WHEN symbols.kind = 'function' THEN 1 END) AS functions, "
+            "COUNT(CASE WHEN symbols.kind = 'class' THEN 1 END) AS classes "
+            "FROM files LEFT JOIN symbols ON symbols.file_id = files.id WHERE files.project = ?",
+            (project,),
+        ).fetchone()
+        return dict(counts)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SymbolIndex:
+    """The process-wide index, opened on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex()
+        return _index
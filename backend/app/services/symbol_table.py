@@ -0,0 +1,254 @@
+# app/services/symbol_table.py
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class OrderedSet:
+    """Insertion-ordered set with O(1) membership, backed by the keys of a dict."""
+
+    __slots__ = ('_items',)
+
+    def __init__(self, items: Iterable = ()):
+        self._items = dict.fromkeys(items)
+
+    def add(self, item):
+        self._items[item] = None
+
+    def update(self, items: Iterable):
+        self._items.update(dict.fromkeys(items))
+
+    def __contains__(self, item) -> bool:
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OrderedSet):
+            return list(self._items) == list(other._items)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"OrderedSet({list(self._items)!r})"
+
+    def to_list(self) -> List:
+        return list(self._items)
+
+
+# Records that appear in /analyze responses as they are are slotted dataclasses:
+# orjson serializes those natively, field by field in declaration order, so the
+# response is built without copying each record into a dict first.
+
+@dataclass(slots=True)
+class Parameter:
+    name: str
+    type: Optional[str] = None
+    default: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        param_info = {'name': self.name}
+        if self.type is not None:
+            param_info['type'] = self.type
+        if self.default is not None:
+            param_info['default'] = self.default
+        return param_info
+
+
+@dataclass(slots=True)
+class Decorator:
+    name: str
+    arguments: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'arguments': self.arguments}
+
+
+class DecoratedFunction:
+    __slots__ = ('name', 'decorators', 'is_async', 'parameters')
+
+    def __init__(self, name: str, is_async: bool, parameters: List[Parameter]):
+        self.name = name
+        self.decorators = []
+        self.is_async = is_async
+        self.parameters = parameters
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'decorators': [decorator.to_dict() for decorator in self.decorators],
+            'is_async': self.is_async,
+            'parameters': [param.to_dict() for param in self.parameters],
+        }
+
+
+class Import:
+    __slots__ = ('module', 'alias', 'name')
+
+    def __init__(self, module: str, alias: Optional[str] = None, name: Optional[str] = None):
+        self.module = module
+        self.alias = alias
+        self.name = name
+
+    def to_dict(self) -> Dict[str, Any]:
+        import_info = {'module': self.module}
+        if self.alias is not None:
+            import_info['alias'] = self.alias
+        if self.name is not None:
+            import_info['name'] = self.name
+        return import_info
+
+
+class ApiCall:
+    __slots__ = ('client_library', 'method', 'arguments', 'endpoint')
+
+    def __init__(self, client_library: str, method: str):
+        self.client_library = client_library
+        self.method = method
+        self.arguments = {}
+        self.endpoint = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        call_info = {'client_library': self.client_library, 'method': self.method, 'arguments': self.arguments}
+        if self.endpoint is not None:
+            call_info['endpoint'] = self.endpoint
+        return call_info
+
+
+class Relationship:
+    __slots__ = ('class_name', 'function', 'is_async')
+
+    def __init__(self, class_name: str, function: str, is_async: bool):
+        self.class_name = class_name
+        self.function = function
+        self.is_async = is_async
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'class': self.class_name, 'function': self.function, 'is_async': self.is_async}
+
+
+class ClassInfo:
+    __slots__ = ('methods', 'parent_classes')
+
+    def __init__(self):
+        self.methods = []
+        self.parent_classes = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'methods': self.methods, 'parent_classes': self.parent_classes}
+
+
+@dataclass(slots=True)
+class FunctionMetrics:
+    lines: int
+    # cyclomatic complexity: one path plus one per decision point
+    complexity: int = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'lines': self.lines, 'complexity': self.complexity}
+
+
+class Scope:
+    """A function or class definition around the nodes being visited."""
+    __slots__ = ('start_byte', 'end_byte', 'name', 'is_class', 'metrics')
+
+    def __init__(self, start_byte: int, end_byte: int, name: str, is_class: bool,
+                 metrics: Optional[FunctionMetrics] = None):
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        # the names of the enclosing definitions and this one, joined by dots, e.g. 'Client.get'
+        self.name = name
+        self.is_class = is_class
+        # metrics of the function that decisions in this scope count towards
+        self.metrics = metrics
+
+
+class SymbolTable:
+    """Everything walk() collects about one module.
+
+    Replaces the old collected_info dict of lists and sets: records are slotted,
+    names are interned by the extractors, and the set-like fields are
+    OrderedSets, so membership checks are O(1) and their serialized order is
+    the order of first appearance.
+    """
+
+    __slots__ = (
+        'functions', 'classes', 'function_calls', 'imports', 'node_types', 'relationships',
+        'current_class', 'imported_functions', 'imported_modules', 'api_calls', 'endpoints',
+        'decorated_functions', 'async_functions', 'parameter_relationships', 'function_dependencies',
+        'class_hierarchy', 'variable_usage', 'error_handling', 'function_metrics',
+        'pending_decorators', 'scopes',
+    )
+
+    def __init__(self):
+        self.functions = OrderedSet()
+        self.classes = []
+        self.function_calls = []
+        self.imports = []
+        self.node_types = {}
+        self.relationships = []
+        self.current_class = None
+        self.imported_functions = {}
+        self.imported_modules = {}
+        self.api_calls = []
+        self.endpoints = {}
+        self.decorated_functions = []
+        self.async_functions = OrderedSet()
+        self.parameter_relationships = {}
+        # qualified function name -> OrderedSet of called names
+        self.function_dependencies = {}
+        # class name -> ClassInfo
+        self.class_hierarchy = {}
+        self.variable_usage = {}
+        self.error_handling = OrderedSet()
+        # qualified function name -> FunctionMetrics
+        self.function_metrics = {}
+        # decorators read since the last decorated_definition, until its definition is reached
+        self.pending_decorators = None
+        # Scope of each definition enclosing the current node, innermost last
+        self.scopes = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The collected_info dict shape walk() used to return, with sets as lists."""
+        return {
+            'functions': self.functions.to_list(),
+            'classes': self.classes,
+            'function_calls': self.function_calls,
+            'imports': [imp.to_dict() for imp in self.imports],
+            'node_types': self.node_types,
+            'relationships': [relationship.to_dict() for relationship in self.relationships],
+            'current_class': self.current_class,
+            'imported_functions': self.imported_functions,
+            'imported_modules': self.imported_modules,
+            'api_calls': [call.to_dict() for call in self.api_calls],
+            'endpoints': self.endpoints,
+            'decorated_functions': [func.to_dict() for func in self.decorated_functions],
+            'async_functions': self.async_functions.to_list(),
+            'parameter_relationships': self.parameter_relationships,
+            'function_dependencies': {
+                function: dependencies.to_list()
+                for function, dependencies in self.function_dependencies.items()
+            },
+            'class_hierarchy': {name: info.to_dict() for name, info in self.class_hierarchy.items()},
+            'variable_usage': self.variable_usage,
+            'error_handling': self.error_handling.to_list(),
+            'function_metrics': {name: metrics.to_dict() for name, metrics in self.function_metrics.items()},
+        }
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SymbolTable):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+
+def json_default(obj):
+    """Encoder hook for the types build_analysis() leaves in a response, for orjson and json alike."""
+    if isinstance(obj, OrderedSet):
+        return obj.to_list()
+    if isinstance(obj, (Parameter, Decorator, FunctionMetrics)):
+        # only reached with the json module; orjson handles dataclasses itself
+        return {record_field.name: getattr(obj, record_field.name) for record_field in fields(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,83 @@
+# app/services/upload_spool.py
+
+import codecs
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Configuring upload limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class SpooledUpload:
+    """An upload written to a named temp file, so any process can map it instead of copying it."""
+
+    def __init__(self, path: str, size: int, digest: bytes):
+        self.path = path
+        self.size = size
+        self.digest = digest
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def map_source(path: str):
+    """Memory-map a spooled file read-only; tree-sitter parses the mapping without a copy."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files cannot be mapped
+            yield b''
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+async def spool_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES, utf8: bool = True) -> SpooledUpload:
+    """Stream an UploadFile to a temp file in chunks, checking its size and UTF-8 validity on the way.
+
+    The SHA-256 of the content is computed in the same pass, for the result cache.
+    utf8=False skips the UTF-8 check, for binary uploads such as archives.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix='.py' if utf8 else '')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"{upload.filename} is larger than the {max_bytes} byte upload limit")
+                if utf8:
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError as e:
+                        raise ValueError(f"{upload.filename} is not valid UTF-8: {str(e)}")
+                digest.update(chunk)
+                f.write(chunk)
+        if utf8:
+            try:
+                decoder.decode(b'', final=True)
+            except UnicodeDecodeError as e:
+                raise ValueError(f"{upload.filename} is not valid UTF-8: {str(e)}")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path, size, digest.digest())
@@ -0,0 +1,101 @@
+# benchmarks/bench_context_format.py
+#
+# Prompt tokens and latency of each GPT question with its context encoded as
+# pretty-printed JSON and as the compact outline. Latency is end to end through
+# analyze_with_gpt against the local stub API (llm_stub.py), which models the
+# model's prompt reading time with --prefill-ms-per-1k. Run from the backend
+# directory:
+#   python benchmarks/bench_context_format.py --size 50
+#   python benchmarks/bench_context_format.py --app path/to/app.py --api path/to/api.py
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prompt_context import QUESTIONS
+from bench_suite import SHAPES
+from llm_stub import start_stub
+
+FORMATS = ('json', 'outline')
+
+
+async def answer_all(gpt_analyzer, analysis_data, repeat):
+    """Mean seconds per question, asked one at a time so calls don't overlap."""
+    timings = {}
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = await gpt_analyzer.analyze_with_gpt(analysis_data, question, use_cache=False)
+            assert 'error' not in result, result
+        timings[question] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark JSON against outline prompt contexts.")
+    arg_parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=['routes', 'decorators'])
+    arg_parser.add_argument('--size', type=int, default=50)
+    arg_parser.add_argument('--app', help="app.py of a real pair to analyze instead of generated modules")
+    arg_parser.add_argument('--api', help="api.py of the real pair")
+    arg_parser.add_argument('--latency', type=float, default=0.3, help="seconds per stubbed completion")
+    arg_parser.add_argument('--prefill-ms-per-1k', type=float, default=100.0,
+                            help="stubbed milliseconds per thousand prompt tokens")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency, ['--prefill-ms-per-1k', str(args.prefill_ms_per_1k)])
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from app.services import gpt_analyzer
+        from app.services.analysis_cache import render_analysis
+        from app.services.code_analyzer import analyze_code
+        from app.services.llm_cache import LLMResponseCache
+        from app.services.prompt_context import estimate_tokens
+
+        if args.app and args.api:
+            with open(args.app, encoding='utf-8') as f, open(args.api, encoding='utf-8') as g:
+                inputs = [(f"{args.app} + {args.api}", f.read(), g.read())]
+        else:
+            inputs = [(f"{shape} ({args.size})", *SHAPES[shape](args.size)) for shape in args.shapes]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / 'cache', max_entries=0)
+            chosen = gpt_analyzer.CONTEXT_FORMAT
+
+            for label, app_code, api_code in inputs:
+                analysis_data = json.loads(render_analysis(analyze_code(app_code, api_code)))
+                tokens, latency = {}, {}
+                for context_format in FORMATS:
+                    gpt_analyzer.CONTEXT_FORMAT = context_format
+                    tokens[context_format] = {
+                        question: estimate_tokens(gpt_analyzer.prepare_analysis_prompt(analysis_data, question))
+                        for question in QUESTIONS
+                    }
+                    latency[context_format] = asyncio.run(answer_all(gpt_analyzer, analysis_data, args.repeat))
+                gpt_analyzer.CONTEXT_FORMAT = chosen
+
+                print(f"\n{label}")
+                print(f"{'question':<58} {'json':>7} {'outline':>8} {'saved':>6} {'json':>9} {'outline':>9}")
+                for question in QUESTIONS:
+                    json_tokens, outline_tokens = tokens['json'][question], tokens['outline'][question]
+                    print(f"{question[:58]:<58} {json_tokens:>7,} {outline_tokens:>8,} "
+                          f"{1 - outline_tokens / json_tokens:>6.0%} {latency['json'][question] * 1000:>7.0f}ms "
+                          f"{latency['outline'][question] * 1000:>7.0f}ms")
+                total_json, total_outline = sum(tokens['json'].values()), sum(tokens['outline'].values())
+                print(f"{'all questions':<58} {total_json:>7,} {total_outline:>8,} "
+                      f"{1 - total_outline / total_json:>6.0%}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_incremental.py
+#
+# Compares a full analyze_code() run with an AnalysisSession re-analysis after
+# a one-line edit, for growing module sizes. Run from the backend directory:
+#
+#   python benchmarks/bench_incremental.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_session import AnalysisSession
+from app.services.code_analyzer import analyze_code
+from bench_walk import flat_module
+
+API_CODE = '''
+from fastapi import FastAPI
+
+app = FastAPI()
+
+@app.post("/ask_url")
+async def ask_url(url: str, question: str):
+    return {"url": url}
+'''
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for functions in (200, 1000, 3000):
+        app_code = flat_module(functions)
+        edited = app_code.replace(f"def func_{functions // 2}(", f"def func_{functions // 2}_renamed(")
+
+        full = best_of(3, lambda: analyze_code(edited, API_CODE))
+
+        def reanalyze():
+            session = AnalysisSession()
+            session.analyze(app_code, API_CODE)
+            start = time.perf_counter()
+            session.analyze(edited, API_CODE)
+            return time.perf_counter() - start
+
+        incremental = min(reanalyze() for _ in range(3))
+        print(f"{len(app_code.splitlines()):>7} lines  full {full * 1000:8.1f} ms  "
+              f"incremental {incremental * 1000:8.1f} ms  ({full / incremental:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_llm_batch.py
+#
+# Upstream calls and time spent building prompts for a batch of GPT questions
+# with repeats, answered one question at a time as batch_analyze used to, and
+# through batch_analyze with shared contexts, deduplication and joined
+# in-flight calls. Also fires concurrent identical single questions, like
+# several /gpt/ requests for the same prompt. Completions come from the local
+# stub API (llm_stub.py). Run from the backend directory:
+#   python benchmarks/bench_llm_batch.py --questions 40 --distinct 10
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prompt_context import QUESTIONS
+from bench_suite import SHAPES
+from llm_stub import start_stub
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark batched GPT questions with repeats.")
+    arg_parser.add_argument('--questions', type=int, default=40)
+    arg_parser.add_argument('--distinct', type=int, default=10)
+    arg_parser.add_argument('--concurrent', type=int, default=20, help="identical single questions fired at once")
+    arg_parser.add_argument('--size', type=int, default=50)
+    arg_parser.add_argument('--latency', type=float, default=0.3, help="seconds per stubbed completion")
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency)
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from app.services import gpt_analyzer
+        from app.services.analysis_cache import render_analysis
+        from app.services.code_analyzer import analyze_code
+        from app.services.llm_cache import LLMResponseCache
+
+        analysis_data = json.loads(render_analysis(analyze_code(*SHAPES['routes'](args.size))))
+        pool = QUESTIONS + [f"What does handler_{i} return?" for i in range(args.distinct)]
+        questions = [pool[i % args.distinct] for i in range(args.questions)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            # no cache, so every call that isn't deduplicated or joined goes upstream
+            gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / 'cache', max_entries=0)
+
+            start = time.perf_counter()
+            for question in questions:
+                gpt_analyzer.prepare_analysis_prompt(analysis_data, question)
+            per_question_prompts = time.perf_counter() - start
+            start = time.perf_counter()
+            contexts = {}
+            for question in questions:
+                gpt_analyzer.prepare_analysis_prompt(analysis_data, question, contexts)
+            shared_prompts = time.perf_counter() - start
+
+            async def one_by_one():
+                # the old batch_analyze: every question, with its own context, at once
+                calls = {}
+                await asyncio.gather(*[gpt_analyzer.analyze_with_gpt(analysis_data, question, False, calls=calls)
+                                       for question in questions])
+                return calls
+
+            async def batched():
+                calls = {}
+                await gpt_analyzer.batch_analyze(analysis_data, questions, use_cache=False, calls=calls)
+                return calls
+
+            async def concurrent_singles():
+                calls = {}
+                await asyncio.gather(*[gpt_analyzer.analyze_with_gpt(analysis_data, pool[0], False, calls=calls)
+                                       for _ in range(args.concurrent)])
+                return calls
+
+            print(f"batch of {len(questions)} questions, {args.distinct} distinct, "
+                  f"{args.latency * 1000:.0f} ms per completion\n")
+            print(f"building prompts: {per_question_prompts * 1000:.1f} ms one context per question, "
+                  f"{shared_prompts * 1000:.1f} ms shared per template\n")
+            print(f"{'path':<34} {'wall':>8} {'upstream calls':>15} {'joined':>7}")
+
+            # before, every row's upstream calls were its number of questions
+            for label, run in [('per question, no dedup', one_by_one), ('batch_analyze', batched),
+                               (f'{args.concurrent} identical single questions', concurrent_singles)]:
+                start = time.perf_counter()
+                calls = asyncio.run(run())
+                print(f"{label:<34} {time.perf_counter() - start:>7.2f}s "
+                      f"{calls.get('upstream_calls', 0):>15} {calls.get('joined', 0):>7}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_llm_cache.py
+#
+# Latency of analyze_with_gpt() when the same questions come back, with the LLM
+# response cache on and off. Completions come from the local stub API
+# (llm_stub.py) after --latency seconds, so no API key or network is needed.
+# Run from the backend directory:
+#   python benchmarks/bench_llm_cache.py --questions 20 --rounds 5
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import gpt_analyzer
+from app.services.analysis_cache import render_analysis
+from app.services.code_analyzer import analyze_code
+from app.services.llm_cache import LLMResponseCache
+from bench_cross_references import api_module, app_module
+from llm_stub import start_stub
+
+
+async def run_rounds(analysis_data, questions, rounds, use_cache):
+    timings = []
+    for _ in range(rounds):
+        for question in questions:
+            start = time.perf_counter()
+            result = await gpt_analyzer.analyze_with_gpt(analysis_data, question, use_cache)
+            timings.append(time.perf_counter() - start)
+            assert 'error' not in result, result
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the LLM response cache on repeated questions.")
+    arg_parser.add_argument('--questions', type=int, default=20)
+    arg_parser.add_argument('--rounds', type=int, default=5)
+    arg_parser.add_argument('--latency', type=float, default=0.5, help="seconds per stubbed completion")
+    args = arg_parser.parse_args()
+
+    # the analysis as the frontend posts it back, i.e. parsed from the /analyze response
+    analysis_data = json.loads(render_analysis(analyze_code(app_module(50, 100), api_module(50))))
+    questions = [f"What does endpoint number {i} return?" for i in range(args.questions)]
+
+    stub = start_stub(args.latency)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+
+            print(f"{'cache':<8} {'requests':>9} {'upstream calls':>15} {'mean':>10} {'total':>10}")
+            for label, use_cache in [('off', False), ('on', True)]:
+                gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / f'cache_{label}')
+                timings = asyncio.run(run_rounds(analysis_data, questions, args.rounds, use_cache))
+                stats = gpt_analyzer.llm_cache.stats()
+                print(f"{label:<8} {len(timings):>9} {stats['misses'] + stats['bypasses']:>15} "
+                      f"{sum(timings) / len(timings) * 1000:>8.1f}ms {sum(timings):>9.2f}s")
+
+            print(f"\nhit rate {stats['hit_rate']:.1%}, upstream time saved {stats['saved_seconds']:.2f}s")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
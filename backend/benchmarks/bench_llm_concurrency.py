@@ -0,0 +1,100 @@
+# benchmarks/bench_llm_concurrency.py
+#
+# A batch of GPT questions against the local stub API (llm_stub.py), answered
+# the way analyze_with_gpt used to (the synchronous client on asyncio.to_thread,
+# every question at once) and through the shared AsyncOpenAI client with its
+# concurrency limit. Reports wall time, per-question latency and the peak
+# number of threads in this process. Run from the backend directory:
+#   python benchmarks/bench_llm_concurrency.py --questions 200 --latency 0.5
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_stub import start_stub
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+async def sample_threads(peak, stop):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.005)
+
+
+async def timed_call(call):
+    start = time.perf_counter()
+    await call
+    return time.perf_counter() - start
+
+
+async def run_batch(make_calls):
+    peak, stop = [threading.active_count()], asyncio.Event()
+    sampler = asyncio.create_task(sample_threads(peak, stop))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[timed_call(call) for call in make_calls()])
+    wall = time.perf_counter() - start
+    stop.set()
+    await sampler
+    return wall, sorted(latencies), peak[0]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark batched GPT calls against a local stub API.")
+    arg_parser.add_argument('--questions', type=int, default=200)
+    arg_parser.add_argument('--latency', type=float, default=0.5, help="seconds per stubbed completion")
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency)
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from openai import OpenAI
+        from app.services import gpt_analyzer
+        from app.services.llm_cache import LLMResponseCache
+        from app.services.llm_client import LLM_MAX_CONCURRENCY
+
+        analysis_data = {"functions": {"app_py": [f"handler_{i}" for i in range(50)]}}
+        questions = [f"What does handler_{i} do?" for i in range(args.questions)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / 'cache', max_entries=0)
+
+            sync_client = OpenAI()
+
+            def threaded_calls():
+                for question in questions:
+                    prompt = gpt_analyzer.prepare_analysis_prompt(analysis_data, question)
+                    yield asyncio.to_thread(
+                        sync_client.chat.completions.create,
+                        model="gpt-4", messages=[{"role": "user", "content": prompt}], temperature=0, seed=0,
+                    )
+
+            def async_calls():
+                for question in questions:
+                    yield gpt_analyzer.analyze_with_gpt(analysis_data, question, use_cache=False)
+
+            print(f"{args.questions} questions, {args.latency * 1000:.0f} ms per completion\n")
+            print(f"{'client':<32} {'wall':>8} {'p50':>9} {'p99':>9} {'peak threads':>13}")
+            for label, make_calls in [('sync client on to_thread', threaded_calls),
+                                      (f'AsyncOpenAI, {LLM_MAX_CONCURRENCY} in flight', async_calls)]:
+                wall, latencies, threads = asyncio.run(run_batch(make_calls))
+                print(f"{label:<32} {wall:>7.2f}s {percentile(latencies, 0.5) * 1000:>7.0f}ms "
+                      f"{percentile(latencies, 0.99) * 1000:>7.0f}ms {threads:>13}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
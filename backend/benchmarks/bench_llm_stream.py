@@ -0,0 +1,112 @@
+# benchmarks/bench_llm_stream.py
+#
+# Time to first byte and to the end of the response for POST /gpt/ and
+# /mermaid/ against their /stream variants. Requests are sent straight to the
+# ASGI app, so the times are the app's own; completions come from the local
+# stub API (llm_stub.py), which streams --words words, the first after
+# --latency seconds and the rest --token-interval apart. Run from the backend
+# directory:
+#   python benchmarks/bench_llm_stream.py --latency 0.5 --words 200 --token-interval 0.02
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_stub import start_stub
+
+
+async def call_app(app, path, payload):
+    """POST payload to path; returns (status, seconds to the first body byte, seconds to the end, body)."""
+    pending = [{'type': 'http.request', 'body': json.dumps(payload).encode('utf-8'), 'more_body': False}]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode('latin-1'), 'query_string': b'',
+        'root_path': '', 'headers': [(b'content-type', b'application/json'), (b'host', b'bench')],
+        'client': ('127.0.0.1', 1), 'server': ('bench', 80),
+    }
+    status, first_byte, body = None, None, []
+    start = time.perf_counter()
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # the client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status, first_byte
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body' and message.get('body'):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            body.append(message['body'])
+
+    await app(scope, receive, send)
+    return status, first_byte, time.perf_counter() - start, b''.join(body)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark streamed against buffered GPT endpoints.")
+    arg_parser.add_argument('--latency', type=float, default=0.5, help="seconds to the first stubbed token")
+    arg_parser.add_argument('--words', type=int, default=200, help="words in the stubbed answer")
+    arg_parser.add_argument('--token-interval', type=float, default=0.02, help="seconds between stubbed words")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency, ['--words', str(args.words), '--token-interval', str(args.token_interval)])
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from main import app
+        from app.services import gpt_analyzer, mermaid_generator
+        from app.services.llm_cache import LLMResponseCache
+
+        analysis_data = {
+            "app_analysis": {"functions": ["main", "fetch"], "classes": []},
+            "api_analysis": {"functions": ["read_item"], "classes": []},
+        }
+        requests = [
+            ('/gpt/', {"analysis_data": analysis_data, "question": "What does fetch do?", "bypass_cache": True}),
+            ('/gpt/stream', {"analysis_data": analysis_data, "question": "What does fetch do?", "bypass_cache": True}),
+            ('/mermaid/', {"analysis_data": analysis_data, "bypass_cache": True}),
+            ('/mermaid/stream', {"analysis_data": analysis_data, "bypass_cache": True}),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            gpt_analyzer.llm_cache = mermaid_generator.llm_cache = LLMResponseCache(Path(tmp) / 'cache')
+
+            async def run():
+                results = {}
+                for path, payload in requests:
+                    timings = []
+                    for _ in range(args.repeat):
+                        status, first_byte, total, body = await call_app(app, path, payload)
+                        assert status == 200, (path, status, body[:200])
+                        timings.append((first_byte, total))
+                    results[path] = timings
+                return results
+
+            results = asyncio.run(run())
+
+        print(f"{args.words} words, first after {args.latency * 1000:.0f} ms, then one every "
+              f"{args.token_interval * 1000:.0f} ms\n")
+        print(f"{'endpoint':<18} {'first byte':>11} {'complete':>10}")
+        for path, timings in results.items():
+            print(f"{path:<18} {statistics.median(t[0] for t in timings) * 1000:>9.0f}ms "
+                  f"{statistics.median(t[1] for t in timings) * 1000:>8.0f}ms")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/bench_llm_throttle.py
+#
+# Goodput of bursts of GPT batches against an API that throttles. The local
+# stub API (llm_stub.py) accepts --limit completions per --window seconds and
+# --max-concurrent at once, answers the rest 429 with Retry-After, and fails
+# --error-rate of them with 503. Each burst is one batch_analyze of --questions
+# distinct questions, sent through a fixed limit of --concurrency calls with
+# the OpenAI client's own two retries (as before the scheduler), and through
+# the LLM call scheduler. Run from the backend directory:
+#   python benchmarks/bench_llm_throttle.py --questions 60 --bursts 3 --limit 30 --window 5
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import SHAPES
+from llm_stub import start_stub
+
+
+def stub_stats():
+    base_url = os.environ['OPENAI_BASE_URL'].rsplit('/v1', 1)[0]
+    with urllib.request.urlopen(f"{base_url}/stats") as response:
+        return json.load(response)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark GPT batches against a throttling API.")
+    arg_parser.add_argument('--questions', type=int, default=60, help="distinct questions per burst")
+    arg_parser.add_argument('--bursts', type=int, default=3)
+    arg_parser.add_argument('--gap', type=float, default=1.0, help="seconds between bursts")
+    arg_parser.add_argument('--concurrency', type=int, default=16, help="calls in flight at most")
+    arg_parser.add_argument('--limit', type=int, default=30, help="stubbed completions allowed per window")
+    arg_parser.add_argument('--window', type=float, default=5.0, help="seconds the stubbed limit applies to")
+    arg_parser.add_argument('--max-concurrent', type=int, default=8, help="stubbed completions served at once")
+    arg_parser.add_argument('--error-rate', type=float, default=0.05, help="fraction of stubbed 503s")
+    arg_parser.add_argument('--latency', type=float, default=0.3, help="seconds per stubbed completion")
+    arg_parser.add_argument('--size', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency, [
+        '--limit', str(args.limit), '--window', str(args.window),
+        '--max-concurrent', str(args.max_concurrent), '--error-rate', str(args.error_rate),
+    ])
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from app.services import gpt_analyzer, llm_client
+        from app.services.analysis_cache import render_analysis
+        from app.services.code_analyzer import analyze_code
+        from app.services.llm_cache import LLMResponseCache
+        from app.services.llm_scheduler import AdaptiveConcurrency, LLMScheduler
+
+        # failed calls are counted in the table rather than logged one by one
+        logging.disable(logging.ERROR)
+        analysis_data = json.loads(render_analysis(analyze_code(*SHAPES['routes'](args.size))))
+        # the stub's limit, as the scheduler would be configured for the account,
+        # with bursts no larger than the stub's window allows
+        requests_per_minute = args.limit * 60 / args.window
+
+        def fixed():
+            client = llm_client.LLMClient(args.concurrency, scheduler=LLMScheduler(
+                args.concurrency, requests_per_minute=0, tokens_per_minute=0, max_retries=0))
+            client.scheduler.concurrency = AdaptiveConcurrency(args.concurrency, min_limit=args.concurrency)
+            client.openai = client.openai.with_options(max_retries=2)
+            return client
+
+        def scheduled():
+            return llm_client.LLMClient(args.concurrency, scheduler=LLMScheduler(
+                args.concurrency, requests_per_minute=requests_per_minute, tokens_per_minute=0,
+                burst_seconds=args.window))
+
+        async def run(make_client):
+            client = llm_client._clients[asyncio.get_running_loop()] = make_client()
+            answered, failed, burst_seconds = 0, 0, []
+            try:
+                for burst in range(args.bursts):
+                    if burst:
+                        await asyncio.sleep(args.gap)
+                    questions = [f"What does handler_{i} return? (burst {burst})" for i in range(args.questions)]
+                    start = time.perf_counter()
+                    results = await gpt_analyzer.batch_analyze(analysis_data, questions, use_cache=False)
+                    burst_seconds.append(time.perf_counter() - start)
+                    failed += sum('error' in result for result in results)
+                    answered += sum('error' not in result for result in results)
+            finally:
+                await llm_client.close_llm_client()
+            return answered, failed, burst_seconds, client.scheduler.stats()
+
+        print(f"{args.bursts} bursts of {args.questions} questions; stub allows {args.limit} per "
+              f"{args.window:g}s and {args.max_concurrent} at once, fails {args.error_rate:.0%}, "
+              f"{args.latency * 1000:.0f} ms per completion\n")
+        print(f"{'path':<34} {'answered':>9} {'failed':>7} {'busy':>7} {'goodput':>9} "
+              f"{'sent':>5} {'429s':>5} {'503s':>5} {'limit':>6}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / 'cache', max_entries=0)
+
+            for label, make_client in [(f'fixed {args.concurrency}, client retries', fixed),
+                                       ('scheduler', scheduled)]:
+                before = stub_stats()
+                answered, failed, burst_seconds, stats = asyncio.run(run(make_client))
+                after = stub_stats()
+                sent = after['requests'] - before['requests']
+                # goodput counts only answered questions, over the time the bursts took
+                busy = sum(burst_seconds)
+                print(f"{label:<34} {answered:>9} {failed:>7} {busy:>6.1f}s {answered / busy:>7.1f}/s "
+                      f"{sent:>5} {after['throttled'] - before['throttled']:>5} "
+                      f"{after['errors'] - before['errors']:>5} {stats['concurrency_limit']:>6}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_local_answers.py
+#
+# How many of a mix of GPT questions are answered from the analysis data
+# without GPT, how long the local engine takes per question, and the end to
+# end latency of the mix through analyze_with_gpt with local answers off and
+# on. Completions come from the local stub API (llm_stub.py). Run from the
+# backend directory:
+#   python benchmarks/bench_local_answers.py --latency 2.0
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prompt_context import QUESTIONS
+from bench_suite import SHAPES
+from llm_stub import start_stub
+
+# variants of the predefined questions about either file, and free-form ones
+VARIANTS = [
+    "What functions does app.py have?",
+    "How many functions are defined in api.py?",
+    "Which async functions are defined in api.py?",
+    "How many classes does app.py have?",
+    "List all classes in app.py",
+    "How many imports does api.py have?",
+    "What does the main function in app.py do?",
+    "Which endpoints in api.py have no callers in app.py?",
+]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark answering questions from the analysis data.")
+    arg_parser.add_argument('--size', type=int, default=50)
+    arg_parser.add_argument('--latency', type=float, default=2.0, help="seconds per stubbed completion")
+    arg_parser.add_argument('--repeat', type=int, default=2000, help="engine calls per question to time")
+    args = arg_parser.parse_args()
+
+    stub = start_stub(args.latency)
+    try:
+        # imported after the stub has set OPENAI_BASE_URL
+        from app.services import gpt_analyzer, local_answers
+        from app.services.analysis_cache import render_analysis
+        from app.services.code_analyzer import analyze_code
+        from app.services.llm_cache import LLMResponseCache
+
+        analysis_data = json.loads(render_analysis(analyze_code(*SHAPES['routes'](args.size))))
+        questions = QUESTIONS + VARIANTS
+
+        with tempfile.TemporaryDirectory() as tmp:
+            gpt_analyzer.storage.base_dir = Path(tmp)
+            gpt_analyzer.llm_cache = LLMResponseCache(Path(tmp) / 'cache', max_entries=0)
+
+            async def ask_all():
+                """Seconds each question takes, asked one at a time."""
+                timings = {}
+                for question in questions:
+                    start = time.perf_counter()
+                    result = await gpt_analyzer.analyze_with_gpt(analysis_data, question, use_cache=False)
+                    assert 'error' not in result, result
+                    timings[question] = (time.perf_counter() - start, result['local'])
+                return timings
+
+            local_answers.LOCAL_ANSWERS_ENABLED = False
+            before = asyncio.run(ask_all())
+            local_answers.LOCAL_ANSWERS_ENABLED = True
+            after = asyncio.run(ask_all())
+
+        print(f"{len(questions)} questions, {args.latency * 1000:.0f} ms per completion\n")
+        print(f"{'question':<58} {'engine':>9} {'before':>8} {'after':>8}  answered by")
+        for question in questions:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                local_answers.answer_locally(analysis_data, question)
+            engine_us = (time.perf_counter() - start) / args.repeat * 1e6
+            seconds, local = after[question]
+            print(f"{question[:58]:<58} {engine_us:>7.1f}us {before[question][0] * 1000:>6.0f}ms "
+                  f"{seconds * 1000:>6.0f}ms  {'analysis data' if local else 'GPT'}")
+
+        served = sum(local for _, local in after.values())
+        print(f"\nanswered locally: {served} of {len(questions)} ({served / len(questions):.0%}); "
+              f"median {statistics.median(t for t, _ in before.values()) * 1000:.0f} ms -> "
+              f"{statistics.median(t for t, _ in after.values()) * 1000:.0f} ms, "
+              f"total {sum(t for t, _ in before.values()):.1f} s -> {sum(t for t, _ in after.values()):.1f} s")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_mixed_load.py
+#
+# Measures latency of a light route (GET /gpt/responses/{date}) while large
+# /analyze/ uploads are in flight. Run from the backend directory:
+#
+#   python benchmarks/bench_mixed_load.py --uploads 16 --functions 3000
+#
+# --inline reproduces the old behaviour of analyzing on the event loop.
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import httpx
+
+from app.routers import analyzer
+from app.services import analysis_workers
+from bench_walk import flat_module
+from main import app
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description="Mixed-load latency benchmark.")
+    arg_parser.add_argument('--uploads', type=int, default=16)
+    arg_parser.add_argument('--functions', type=int, default=3000)
+    arg_parser.add_argument('--inline', action='store_true')
+    args = arg_parser.parse_args()
+
+    if args.inline:
+        analyzer.run_in_pool = run_inline
+    else:
+        analysis_workers.start_pool()
+
+    api_code = b"@app.post('/ask_url')\nasync def ask_url(url: str):\n    return url\n"
+    statuses = []
+    light_latencies = []
+    done = asyncio.Event()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def upload(i):
+            # unique content per upload so the result cache never answers
+            app_code = (f"# upload {i} {time.time_ns()}\n" + flat_module(args.functions)).encode("utf-8")
+            response = await client.post('/analyze/', files={
+                'app_file': ('app.py', app_code), 'api_file': ('api.py', api_code)})
+            statuses.append(response.status_code)
+
+        async def light():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get('/gpt/responses/2024-11-12')
+                light_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        light_task = asyncio.create_task(light())
+        start = time.perf_counter()
+        await asyncio.gather(*[upload(i) for i in range(args.uploads)])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await light_task
+
+    analysis_workers.shutdown_pool()
+    print(f"mode={'inline' if args.inline else 'pool'} uploads={args.uploads} "
+          f"ok={statuses.count(200)} rejected={statuses.count(429)} wall={elapsed:.2f}s")
+    print(f"light route: n={len(light_latencies)} p50={statistics.median(light_latencies) * 1000:.1f} ms "
+          f"p99={percentile(light_latencies, 0.99) * 1000:.1f} ms max={max(light_latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+# benchmarks/bench_node_text.py
+#
+# Allocations made while walk() reads node text: blocks and bytes still held by
+# the result, and the peak traced during the walk, measured with tracemalloc.
+# Sources are read both as bytes and memory-mapped, like uploads are.
+# Run from the backend directory:
+#   python benchmarks/bench_node_text.py --baseline-rev <rev>
+
+import argparse
+import mmap
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import code_analyzer
+from bench_symbol_table import load_revision
+from bench_walk import flat_module
+
+
+def call_heavy_module(functions):
+    """Functions made mostly of method calls, a few of them HTTP requests."""
+    lines = ["import requests", ""]
+    for i in range(functions):
+        lines.append(f"def handler_{i}(session, payload: dict, retries=3):")
+        lines.append(f"    session.headers.update({{'X-Request': '{i}'}})")
+        lines.append("    items = payload.get('items', [])")
+        lines.append("    names = [item.name.strip().lower() for item in items]")
+        lines.append(f"    response = requests.get(f'/api/items/{{payload[\"id\"]}}', timeout=retries)")
+        lines.append("    session.cache.set(response.url, names)")
+        lines.append("    return response.json()")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def measure(analyzer, source, repeat):
+    # older revisions may predate get_parser(); the tree is the same whichever module parses it
+    tree = code_analyzer.get_parser().parse(source)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyzer.walk(tree.root_node, source)
+        best = min(best, time.perf_counter() - start)
+
+    # the first traced walk of a freshly loaded analyzer also picks up one-off allocations, so trace a second one
+    for _ in range(2):
+        tracemalloc.start()
+        result = analyzer.walk(tree.root_node, source)
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+
+    statistics = snapshot.statistics('filename')
+    blocks = sum(stat.count for stat in statistics)
+    size = sum(stat.size for stat in statistics)
+    return best, blocks, size, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark node text allocations during walk().")
+    arg_parser.add_argument('--defs', type=int, default=5000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--baseline-rev', help="git revision whose code_analyzer to compare against")
+    args = arg_parser.parse_args()
+
+    analyzers = [('current', code_analyzer)]
+    if args.baseline_rev:
+        analyzers.insert(0, (args.baseline_rev, load_revision(args.baseline_rev)))
+
+    print(f"{'module':<14} {'source':<7} {'analyzer':<10} {'walk':>10} {'retained blocks':>16} "
+          f"{'retained':>10} {'peak':>10}")
+    for label, code in [('flat', flat_module(args.defs)), ('call heavy', call_heavy_module(args.defs))]:
+        data = code.encode('utf-8')
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for source_label, source in [('bytes', data), ('mmap', mapped)]:
+                    for name, analyzer in analyzers:
+                        best, blocks, size, peak = measure(analyzer, source, args.repeat)
+                        print(f"{label:<14} {source_label:<7} {name:<10} {best * 1000:>8.1f}ms {blocks:>16,} "
+                              f"{size / 1024 / 1024:>8.2f}MB {peak / 1024 / 1024:>8.2f}MB")
+            finally:
+                mapped.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_project.py
+#
+# Times analyze_project() on a synthetic repository with different worker
+# counts. Run from the backend directory:
+#
+#   python benchmarks/bench_project.py --files 2000 --workers 1 2 4 8
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import analysis_workers, project_analyzer
+from bench_walk import flat_module
+
+
+def synthetic_project(files):
+    sources = {}
+    for i in range(files):
+        package = f"pkg{i % 20}"
+        code = f"from {package}.mod{(i + 1) % files} import func_0\n" + flat_module(20 + i % 40)
+        sources[f"{package}/mod{i}.py"] = code.encode('utf-8')
+    return sources
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark project analysis throughput.")
+    arg_parser.add_argument('--files', type=int, default=2000)
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    args = arg_parser.parse_args()
+
+    sources = synthetic_project(args.files)
+    total_mb = sum(len(source) for source in sources.values()) / 1024 / 1024
+    print(f"{len(sources)} files, {total_mb:.1f} MB, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in args.workers:
+        analysis_workers.shutdown_pool()
+        analysis_workers.start_pool(workers)
+        start = time.perf_counter()
+        result = project_analyzer.analyze_project(sources)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>3} workers {elapsed:8.2f} s {len(sources) / elapsed:9.0f} files/sec "
+              f"speedup {baseline / elapsed:5.2f}x ({result['summary']['functions']} functions)")
+    analysis_workers.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
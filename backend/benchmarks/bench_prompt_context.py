@@ -0,0 +1,83 @@
+# benchmarks/bench_prompt_context.py
+#
+# Prompt size of each GPT question template: the whole analysis as it used to
+# be sent, against the sections the template needs cut to the token budget.
+# Tokens are estimated locally; cost is at GPT-4's prompt price. Analyses come
+# from generated modules, or from a real pair of files. Run from the backend
+# directory:
+#   python benchmarks/bench_prompt_context.py --size 200
+#   python benchmarks/bench_prompt_context.py --app path/to/app.py --api path/to/api.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_cache import render_analysis
+from app.services.code_analyzer import analyze_code
+from app.services.gpt_analyzer import PROMPT_TEMPLATES, get_template_name, prepare_analysis_prompt
+from app.services.prompt_context import estimate_tokens
+from bench_suite import SHAPES
+
+GPT4_DOLLARS_PER_1K_PROMPT_TOKENS = 0.03
+
+QUESTIONS = [
+    "What functions does api.py have?",
+    "What are different classes present in api.py?",
+    "How many imports are present in app.py?",
+    "How many functions are related in both app.py and api.py?",
+    "Which functions in app.py handle errors?",
+]
+
+
+def full_prompt(analysis_data, question):
+    """The prompt as it was built before pruning: the whole analysis, pretty-printed."""
+    template = PROMPT_TEMPLATES[get_template_name(question)]
+    return template.format(context=json.dumps(analysis_data, indent=2), context_format="in JSON format",
+                           question=question)
+
+
+def report(label, analysis_data, repeat):
+    print(f"\n{label}")
+    print(f"{'question':<58} {'full':>8} {'pruned':>8} {'saved':>7} {'$ full':>8} {'$ now':>8} {'build':>9}")
+    totals = [0, 0]
+    for question in QUESTIONS:
+        full = estimate_tokens(full_prompt(analysis_data, question))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            prompt = prepare_analysis_prompt(analysis_data, question)
+        build_ms = (time.perf_counter() - start) / repeat * 1000
+        pruned = estimate_tokens(prompt)
+        totals[0] += full
+        totals[1] += pruned
+        print(f"{question[:58]:<58} {full:>8,} {pruned:>8,} {1 - pruned / full:>7.0%} "
+              f"{full * GPT4_DOLLARS_PER_1K_PROMPT_TOKENS / 1000:>8.3f} "
+              f"{pruned * GPT4_DOLLARS_PER_1K_PROMPT_TOKENS / 1000:>8.3f} {build_ms:>7.2f}ms")
+    print(f"{'all questions':<58} {totals[0]:>8,} {totals[1]:>8,} {1 - totals[1] / totals[0]:>7.0%}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark prompt tokens per GPT question template.")
+    arg_parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=['routes', 'decorators'])
+    arg_parser.add_argument('--size', type=int, default=50)
+    arg_parser.add_argument('--app', help="app.py of a real pair to analyze instead of generated modules")
+    arg_parser.add_argument('--api', help="api.py of the real pair")
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    if args.app and args.api:
+        with open(args.app, encoding='utf-8') as f, open(args.api, encoding='utf-8') as g:
+            inputs = [(f"{args.app} + {args.api}", f.read(), g.read())]
+    else:
+        inputs = [(f"{shape} ({args.size})", *SHAPES[shape](args.size)) for shape in args.shapes]
+
+    for label, app_code, api_code in inputs:
+        # the analysis as the frontend posts it back, i.e. parsed from the /analyze response
+        report(label, json.loads(render_analysis(analyze_code(app_code, api_code))), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
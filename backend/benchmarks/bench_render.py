@@ -0,0 +1,75 @@
+# benchmarks/bench_render.py
+#
+# Time to turn two symbol tables into response bytes: build_analysis() followed
+# by serialization, for large generated payloads. Compares the current path
+# (no list copies, orjson when installed), the same result through the json
+# module, and optionally a git revision's build_analysis with json.dumps.
+# Run from the backend directory:
+#   python benchmarks/bench_render.py --baseline-rev <rev>
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import analysis_cache, code_analyzer
+from app.services.symbol_table import json_default
+from bench_suite import SHAPES
+from bench_symbol_table import load_revision
+
+
+def json_render(result):
+    return json.dumps(
+        result, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=json_default,
+    ).encode("utf-8")
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark building and serializing /analyze responses.")
+    arg_parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=['decorators', 'calls', 'routes'])
+    arg_parser.add_argument('--size', type=int, default=4000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--baseline-rev', help="git revision whose build_analysis to compare against")
+    args = arg_parser.parse_args()
+
+    # label -> (build_analysis, serializer)
+    paths = []
+    if args.baseline_rev:
+        paths.append((args.baseline_rev, load_revision(args.baseline_rev).build_analysis, json_render))
+    paths.append(('current json', code_analyzer.build_analysis, json_render))
+    encoder = 'orjson' if analysis_cache.orjson is not None else 'json'
+    paths.append((f'current {encoder}', code_analyzer.build_analysis, analysis_cache.render_analysis))
+
+    print(f"{'shape':<12} {'path':<16} {'build':>10} {'render':>10} {'total':>10} {'size':>9}")
+    for shape in args.shapes:
+        app_code, api_code = SHAPES[shape](args.size)
+        infos = []
+        for code in (app_code, api_code):
+            source = code.encode('utf-8')
+            infos.append(code_analyzer.walk(code_analyzer.get_parser().parse(source).root_node, source))
+
+        outputs = set()
+        for label, build_analysis, render in paths:
+            build_seconds, result = best_of(lambda: build_analysis(*infos), args.repeat)
+            render_seconds, content = best_of(lambda: render(result), args.repeat)
+            outputs.add(content)
+            print(f"{shape:<12} {label:<16} {build_seconds * 1000:>8.1f}ms {render_seconds * 1000:>8.1f}ms "
+                  f"{(build_seconds + render_seconds) * 1000:>8.1f}ms {len(content) / 1024 / 1024:>7.2f}MB")
+        if len(outputs) != 1:
+            print(f"{shape:<12} WARNING: the paths produced different bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_sections.py
+#
+# Analysis time and payload size of /analyze responses limited with ?sections=,
+# against the full response, on generated app/api modules.
+# Run from the backend directory:  python benchmarks/bench_sections.py
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_cache import render_analysis
+from app.services.code_analyzer import SECTIONS, build_analysis, extractors_for, get_parser, query_walk, walk
+from bench_walk import flat_module
+
+
+def measure(app_tree, api_tree, app_source, api_source, sections, repeat, skip_extractors=()):
+    """Best time to extract, build and render the response from already parsed trees, and its size."""
+    extractors, count_node_types = extractors_for(sections)
+    extractors = extractors - frozenset(skip_extractors)
+    # same backend choice as analyze_sources()
+    extract = walk if count_node_types else query_walk
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app_info = extract(app_tree.root_node, app_source, count_node_types=count_node_types, extractors=extractors)
+        api_info = extract(api_tree.root_node, api_source, count_node_types=count_node_types, extractors=extractors)
+        content = render_analysis(build_analysis(app_info, api_info, sections))
+        best = min(best, time.perf_counter() - start)
+    return best, len(content)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark /analyze with selected sections.")
+    arg_parser.add_argument('--defs', type=int, default=3000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    app_source = flat_module(args.defs).encode('utf-8')
+    api_source = flat_module(args.defs // 2).encode('utf-8')
+
+    # parsing costs the same whatever is requested, so it is timed once on its own
+    parse_time = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        app_tree = get_parser().parse(app_source)
+        api_tree = get_parser().parse(api_source)
+        parse_time = min(parse_time, time.perf_counter() - start)
+
+    full_time, full_size = measure(app_tree, api_tree, app_source, api_source, None, args.repeat)
+    print(f"parsing both files: {parse_time * 1000:.1f} ms (not included below)")
+    print(f"{'sections':<38} {'analysis':>10} {'':>6} {'payload':>10} {'':>6}")
+    print(f"{'(all)':<38} {full_time * 1000:>8.1f}ms {'1.00x':>6} {full_size:>10,} {'100%':>6}")
+    # what the metrics visitors add to the shared traversal
+    elapsed, size = measure(app_tree, api_tree, app_source, api_source, None, args.repeat, skip_extractors=['metrics'])
+    print(f"{'(all, metrics extractor off)':<38} {elapsed * 1000:>8.1f}ms {full_time / elapsed:>5.2f}x "
+          f"{size:>10,} {size / full_size:>6.1%}")
+    for sections in [(section,) for section in SECTIONS] + [('function_call_chains', 'error_handling')]:
+        elapsed, size = measure(app_tree, api_tree, app_source, api_source, frozenset(sections), args.repeat)
+        print(f"{','.join(sections):<38} {elapsed * 1000:>8.1f}ms {full_time / elapsed:>5.2f}x "
+              f"{size:>10,} {size / full_size:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# benchmarks/bench_suite.py
+#
+# Times each stage of the analyzer on generated app/api module pairs of growing
+# size and different shapes, and keeps the results as a baseline to compare
+# later runs against. Run from the backend directory:
+#
+#   python benchmarks/bench_suite.py --save benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+#
+# --compare exits with status 1 when a stage's p50 time or peak memory grew by
+# more than --threshold over the baseline. Peak memory is what tracemalloc sees,
+# i.e. Python allocations; tree-sitter's own C allocations are not included.
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_cache import render_analysis
+from app.services.code_analyzer import analyze_code, analyze_cross_references, get_parser, walk
+from bench_cross_references import api_module, app_module
+from bench_node_text import call_heavy_module
+from bench_walk import flat_module, nested_module
+
+STAGES = ('parse', 'walk', 'cross_references', 'analyze_code', 'serialize')
+
+
+def decorator_heavy_module(functions):
+    """Functions and methods stacked with plain, dotted and called decorators."""
+    lines = ["import functools", "from app import app, cache, retry", ""]
+    for i in range(functions):
+        if i % 5 == 0:
+            lines.append(f"class Service{i}:")
+            lines.append("    @property")
+            lines.append("    def name(self):")
+            lines.append(f"        return 'service_{i}'")
+            lines.append("")
+            lines.append("    @staticmethod")
+            lines.append(f"    @retry(times={i % 4}, delay=0.5)")
+            lines.append("    def fetch(key: str, default=None):")
+            lines.append("        return default")
+            lines.append("")
+        lines.append(f"@app.get('/items/{i}/{{item_id}}')")
+        lines.append(f"@cache.memoize(timeout={i})")
+        lines.append("@functools.wraps(handler)")
+        lines.append(f"async def item_{i}(item_id: int, q: str = '', *args, **kwargs):")
+        lines.append("    return {'id': item_id}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def nested_blocks_module(functions):
+    """Functions whose bodies nest blocks, closures and classes many levels deep."""
+    lines = []
+    for i in range(max(functions // 10, 1)):
+        lines.append(f"def outer_{i}(items):")
+        indent = "    "
+        for depth in range(20):
+            if depth % 4 == 0:
+                lines.append(f"{indent}def level_{depth}(value):")
+            elif depth % 4 == 1:
+                lines.append(f"{indent}for item_{depth} in items:")
+            elif depth % 4 == 2:
+                lines.append(f"{indent}if item_{depth - 1} and value or not items:")
+            else:
+                lines.append(f"{indent}try:")
+                lines.append(f"{indent}    process(item_{depth - 2}, value)")
+                lines.append(f"{indent}except ValueError:")
+            indent += "    "
+            lines.append(f"{indent}log(value, {depth})")
+        lines.append(f"{indent}return helper(value)")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# shape -> size -> (app.py, api.py) source
+SHAPES = {
+    'flat': lambda size: (flat_module(size), flat_module(size // 2)),
+    'nested': lambda size: (nested_blocks_module(size) + nested_module(size), nested_module(size // 2)),
+    'decorators': lambda size: (decorator_heavy_module(size), decorator_heavy_module(size // 2)),
+    'calls': lambda size: (call_heavy_module(size), call_heavy_module(size // 2)),
+    'routes': lambda size: (app_module(size, size * 2), api_module(size)),
+}
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank, so p99 of a few samples is their maximum
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def stage_functions(app_source, api_source):
+    """stage -> (function to time, bytes it processes), in pipeline order."""
+    parser = get_parser()
+    app_tree, api_tree = parser.parse(app_source), parser.parse(api_source)
+    app_info, api_info = walk(app_tree.root_node, app_source), walk(api_tree.root_node, api_source)
+    app_code, api_code = app_source.decode('utf-8'), api_source.decode('utf-8')
+    result = analyze_code(app_code, api_code)
+    input_bytes = len(app_source) + len(api_source)
+
+    return {
+        'parse': (lambda: (parser.parse(app_source), parser.parse(api_source)), input_bytes),
+        'walk': (lambda: (walk(app_tree.root_node, app_source), walk(api_tree.root_node, api_source)), input_bytes),
+        'cross_references': (lambda: analyze_cross_references(app_info, api_info), input_bytes),
+        'analyze_code': (lambda: analyze_code(app_code, api_code), input_bytes),
+        'serialize': (lambda: render_analysis(result), len(render_analysis(result))),
+    }
+
+
+def measure(func, processed_bytes, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50 = percentile(timings, 0.50)
+    return {
+        'p50_ms': p50 * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'throughput_mb_s': processed_bytes / p50 / 1e6 if p50 else float('inf'),
+        'peak_kb': peak / 1024,
+    }
+
+
+def run_suite(shapes, sizes, samples):
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            app_code, api_code = SHAPES[shape](size)
+            stages = stage_functions(app_code.encode('utf-8'), api_code.encode('utf-8'))
+            for stage in STAGES:
+                func, processed_bytes = stages[stage]
+                key = f"{shape}/{size}/{stage}"
+                results[key] = measure(func, processed_bytes, samples)
+                row = results[key]
+                print(f"{key:<32} p50 {row['p50_ms']:>9.2f} ms  p99 {row['p99_ms']:>9.2f} ms  "
+                      f"{row['throughput_mb_s']:>8.2f} MB/s  peak {row['peak_kb']:>10,.0f} KB")
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print how each stage moved against the baseline and return the regressed keys."""
+    regressions = []
+    print()
+    print(f"{'stage':<32} {'p50 base':>10} {'p50 now':>10} {'change':>8} {'peak change':>12}")
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32} {'(not in baseline)':>30}")
+            continue
+        time_change = row['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        peak_change = row['peak_kb'] / base['peak_kb'] - 1 if base['peak_kb'] else 0.0
+        # tiny stages are too noisy to judge by ratio alone
+        slower = time_change > threshold and row['p50_ms'] - base['p50_ms'] > min_delta_ms
+        bigger = peak_change > threshold and row['peak_kb'] - base['peak_kb'] > 64
+        flag = "  REGRESSION" if slower or bigger else ""
+        print(f"{key:<32} {base['p50_ms']:>8.2f}ms {row['p50_ms']:>8.2f}ms {time_change:>+8.1%} "
+              f"{peak_change:>+12.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark every analyzer stage and gate on regressions.")
+    arg_parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000, 4000])
+    arg_parser.add_argument('--samples', type=int, default=15)
+    arg_parser.add_argument('--save', metavar='PATH', help="write the results as a baseline")
+    arg_parser.add_argument('--compare', metavar='PATH', help="baseline to compare against")
+    arg_parser.add_argument('--threshold', type=float, default=0.20,
+                            help="allowed relative growth of p50 time and peak memory (default 0.20)")
+    arg_parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help="ignore slowdowns smaller than this many milliseconds")
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.shapes, args.sizes, args.samples)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'samples': args.samples,
+                'results': results,
+            }, f, indent=2)
+        print(f"\nbaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_symbol_index.py
+#
+# Indexes a generated project into a throwaway SQLite symbol index, then times
+# re-indexing single files and the lookup queries the /index endpoints run.
+# Run from the backend directory:  python benchmarks/bench_symbol_index.py
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import analysis_workers
+from app.services.project_analyzer import analyze_project
+from app.services.symbol_index import SymbolIndex, source_digest
+from bench_call_graph import generated_project
+
+
+def timed_ms(query, samples):
+    timings = []
+    for args in samples:
+        start = time.perf_counter()
+        query(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the SQLite symbol index.")
+    arg_parser.add_argument('--modules', type=int, default=200)
+    arg_parser.add_argument('--functions', type=int, default=50)
+    arg_parser.add_argument('--queries', type=int, default=500)
+    args = arg_parser.parse_args()
+
+    sources = generated_project(args.modules, args.functions, calls=5)
+    project = analyze_project(sources)
+    analysis_workers.shutdown_pool()
+    entries = [(path, source_digest(sources[path]), info) for path, info in project['files'].items()]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SymbolIndex(Path(directory) / 'index.db')
+
+        start = time.perf_counter()
+        index.replace_files('bench', entries)
+        bulk = time.perf_counter() - start
+        print(f"bulk insert: {len(entries)} files, {index.stats('bench')['functions']} functions "
+              f"in {bulk * 1000:.0f} ms")
+
+        rng = random.Random(0)
+        p50, p99 = timed_ms(lambda entry: index.replace_files('bench', [entry]),
+                            [(rng.choice(entries),) for _ in range(50)])
+        print(f"{'replace one file':<26} p50 {p50:>7.2f} ms   p99 {p99:>7.2f} ms")
+
+        modules = [f"pkg.mod_{rng.randrange(args.modules)}" for _ in range(args.queries)]
+        for label, query, samples in [
+            ("find function (exact)", index.find_functions,
+             [('bench', f"func_{rng.randrange(args.modules)}_{rng.randrange(args.functions)}", 10)
+              for _ in range(args.queries)]),
+            ("find function (prefix)", index.find_functions,
+             [('bench', f"func {rng.randrange(args.modules)}", 10) for _ in range(args.queries)]),
+            ("list classes", index.list_classes, [('bench', None, 50)] * args.queries),
+            ("who imports", index.importers, [('bench', module, 50) for module in modules]),
+            ("callers", index.callers,
+             [('bench', f"func_{rng.randrange(args.modules)}_{rng.randrange(args.functions)}", 50)
+              for _ in range(args.queries)]),
+            ("callers (qualified)", index.callers,
+             [('bench', f"mod_{m}.func_{m}_{rng.randrange(args.functions)}", 50)
+              for m in (rng.randrange(args.modules) for _ in range(args.queries))]),
+        ]:
+            p50, p99 = timed_ms(query, samples)
+            print(f"{label:<26} p50 {p50:>7.2f} ms   p99 {p99:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
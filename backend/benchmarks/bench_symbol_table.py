@@ -0,0 +1,75 @@
+# benchmarks/bench_symbol_table.py
+#
+# Compares walk() time and the memory held by its result on large modules,
+# optionally against the code_analyzer of an older git revision.
+# Run from the backend directory:
+#   python benchmarks/bench_symbol_table.py --baseline-rev <rev>
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services import code_analyzer
+from bench_walk import flat_module
+
+
+def load_revision(rev):
+    """Import app/services/code_analyzer.py as it was at a git revision."""
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:./app/services/code_analyzer.py'],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    module = types.ModuleType(f'code_analyzer_{rev}')
+    module.__file__ = f'{rev}:code_analyzer.py'
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+
+def measure(analyzer, source, repeat):
+    # older revisions may predate get_parser(); the tree is the same whichever module parses it
+    tree = code_analyzer.get_parser().parse(source)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyzer.walk(tree.root_node, source)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = analyzer.walk(tree.root_node, source)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, retained - before, peak - before
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark walk() time and result memory.")
+    arg_parser.add_argument('--defs', type=int, nargs='+', default=[2000, 10000, 30000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--baseline-rev', help="git revision whose code_analyzer to compare against")
+    args = arg_parser.parse_args()
+
+    analyzers = [('current', code_analyzer)]
+    if args.baseline_rev:
+        analyzers.insert(0, (args.baseline_rev, load_revision(args.baseline_rev)))
+
+    print(f"{'module':<18} {'analyzer':<10} {'walk':>10} {'retained':>12} {'peak':>12}")
+    for defs in args.defs:
+        source = flat_module(defs).encode('utf-8')
+        for name, analyzer in analyzers:
+            best, retained, peak = measure(analyzer, source, args.repeat)
+            print(f"{f'{defs} defs':<18} {name:<10} {best * 1000:>8.1f}ms "
+                  f"{retained / 1024 / 1024:>10.2f}MB {peak / 1024 / 1024:>10.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_upload_memory.py
+#
+# Peak RSS of analyzing a large upload through the old decode/encode path
+# versus the spooled, memory-mapped path. Each mode runs in its own process.
+# Run from the backend directory:
+#
+#   python benchmarks/bench_upload_memory.py --megabytes 10
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+API_CODE = b"@app.post('/ask_url')\nasync def ask_url(url: str):\n    return url\n"
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, app_path, api_path):
+    from app.services.analysis_cache import render_analysis
+    from app.services.analysis_workers import analyze_files_and_render
+    from app.services.code_analyzer import build_analysis, get_parser, walk
+
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'decode':
+        # what the router and analyze_code used to do: decode, then re-encode twice per file
+        with open(app_path, 'rb') as f:
+            app_code = f.read().decode('utf-8')
+        with open(api_path, 'rb') as f:
+            api_code = f.read().decode('utf-8')
+        app_tree = get_parser().parse(bytes(app_code, 'utf-8'))
+        api_tree = get_parser().parse(bytes(api_code, 'utf-8'))
+        app_info = walk(app_tree.root_node, bytes(app_code, 'utf-8'))
+        api_info = walk(api_tree.root_node, bytes(api_code, 'utf-8'))
+        content = render_analysis(build_analysis(app_info, api_info))
+    else:
+        content, _, _ = analyze_files_and_render(app_path, api_path)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:<7} peak RSS +{peak_rss_mb() - before:7.1f} MB  {elapsed:6.2f} s  response {len(content) / 1024 / 1024:.1f} MB")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Peak RSS benchmark for large uploads.")
+    arg_parser.add_argument('--megabytes', type=float, default=10)
+    arg_parser.add_argument('--mode', choices=['decode', 'mmap'])
+    arg_parser.add_argument('--app-path')
+    arg_parser.add_argument('--api-path')
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.app_path, args.api_path)
+        return
+
+    from bench_walk import flat_module
+    # a module of generated code, sized to about --megabytes
+    unit = flat_module(100).encode('utf-8')
+    repeats = max(1, int(args.megabytes * 1024 * 1024 / len(unit)))
+    with tempfile.TemporaryDirectory() as tmp:
+        app_path = os.path.join(tmp, 'app.py')
+        api_path = os.path.join(tmp, 'api.py')
+        with open(app_path, 'wb') as f:
+            for i in range(repeats):
+                f.write(unit.replace(b"func_", f"func{i}_".encode('utf-8')))
+        with open(api_path, 'wb') as f:
+            f.write(API_CODE)
+        print(f"app.py: {os.path.getsize(app_path) / 1024 / 1024:.1f} MB")
+
+        for mode in ('decode', 'mmap'):
+            subprocess.run([sys.executable, __file__, '--mode', mode, '--app-path', app_path,
+                            '--api-path', api_path], check=True, cwd=BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
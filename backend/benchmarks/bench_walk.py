@@ -0,0 +1,78 @@
+# benchmarks/bench_walk.py
+#
+# Measures traversal throughput of code_analyzer.walk in nodes/sec.
+# Run from the backend directory:  python benchmarks/bench_walk.py
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.code_analyzer import get_parser, walk
+
+
+def flat_module(functions):
+    """A module with many small top-level functions, classes and calls."""
+    lines = ["import os", "from typing import List", ""]
+    for i in range(functions):
+        if i % 10 == 0:
+            lines.append(f"class Model{i}(Base):")
+            lines.append(f"    def method_{i}(self, value: int = {i}):")
+            lines.append(f"        return helper_{i}(value) + os.getpid()")
+        lines.append(f"def func_{i}(a, b: str = 'x', *args, **kwargs):")
+        lines.append("    try:")
+        lines.append(f"        result = compute(a, b, {i})")
+        lines.append("    except ValueError:")
+        lines.append("        result = None")
+        lines.append("    return [item.strip() for item in str(result).split(',')]")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def nested_module(depth):
+    """A single expression nested deep enough to break a recursive walk."""
+    return "value = " + "f(" * depth + "0" + ")" * depth + "\n"
+
+
+def count_nodes(node):
+    cursor = node.walk()
+    count = 0
+    while True:
+        count += 1
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return count
+
+
+def bench(name, code, repeat):
+    source = code.encode('utf-8')
+    tree = get_parser().parse(source)
+    nodes = count_nodes(tree.root_node)
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        walk(tree.root_node, source)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{name:<24} {len(code.splitlines()):>8} lines {nodes:>9} nodes "
+          f"{best * 1000:>9.1f} ms {nodes / best:>12,.0f} nodes/sec")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for functions in (500, 2000, 5000):
+        bench(f"flat ({functions} defs)", flat_module(functions), args.repeat)
+    for depth in (500, 5000):
+        bench(f"nested (depth {depth})", nested_module(depth), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
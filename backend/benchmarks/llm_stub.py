@@ -0,0 +1,249 @@
+# benchmarks/llm_stub.py
+#
+# A local stand-in for the OpenAI chat completions API, for benchmarks that
+# must not pay for or depend on the real one. The first token of a completion
+# comes after --latency seconds, plus --prefill-ms-per-1k milliseconds per
+# thousand prompt tokens (counted as four characters each) to model the time a
+# model spends reading the prompt, and every further word of the fixed answer
+# after --token-interval seconds. Streamed requests ("stream": true) get the
+# words as server-sent chunks.
+#
+# It can also throttle like the real API: --limit completions per --window
+# seconds (a sliding window) and --max-concurrent completions in flight, with
+# the rest answered 429 and a Retry-After header, and --error-rate of them
+# failing with 503. GET /stats returns what it served. Run it directly:
+#
+#   python benchmarks/llm_stub.py --port 8089 --latency 0.5
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-stub uvicorn main:app
+#
+# or start it from a benchmark with start_stub(), which runs it in a separate
+# process and points OPENAI_BASE_URL at it.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+
+ANSWER = "The stub answer, with a few words so the response has some body to it."
+
+
+def answer_words(count):
+    if not count:
+        return ANSWER.split(' ')
+    return [f"word{i}" for i in range(count)]
+
+
+def completion(request, answer=ANSWER):
+    prompt = request['messages'][-1]['content']
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'gpt-4'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': answer},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': len(answer) // 4,
+            'total_tokens': (len(prompt) + len(answer)) // 4,
+        },
+    }
+
+
+def chunk(request, content, finish_reason=None):
+    delta = {'content': content} if content is not None else {}
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': request.get('model', 'gpt-4'),
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+    }
+
+
+class StubServer:
+    """Minimal HTTP/1.1 server with keep-alive, enough for the OpenAI client."""
+
+    def __init__(self, latency, prefill_ms_per_1k=0.0, token_interval=0.0, words=0,
+                 limit=0, window=60.0, max_concurrent=0, error_rate=0.0, retry_after=True, seed=0):
+        self.latency = latency
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.token_interval = token_interval
+        self.words = answer_words(words)
+        self.limit = limit
+        self.window = window
+        self.max_concurrent = max_concurrent
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        # start times of the completions accepted within the window
+        self.accepted = deque()
+        self.in_flight = 0
+        self.requests = 0
+        self.connections = 0
+        self.counts = {'completed': 0, 'throttled': 0, 'errors': 0}
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', '0')))
+                self.requests += 1
+
+                path = request_line.split()[1].decode()
+                refused = self.refuse() if path.endswith('/chat/completions') else None
+                if refused:
+                    self.send_json(writer, *refused)
+                elif path.endswith('/chat/completions') and json.loads(body).get('stream'):
+                    self.in_flight += 1
+                    try:
+                        await self.stream(json.loads(body), writer)
+                    finally:
+                        self.in_flight -= 1
+                    self.counts['completed'] += 1
+                    continue
+                else:
+                    self.in_flight += 1
+                    try:
+                        status, payload = await self.respond(path, body)
+                    finally:
+                        self.in_flight -= 1
+                    self.send_json(writer, status, payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def send_json(self, writer, status, payload, headers=()):
+        content = json.dumps(payload).encode('utf-8')
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in headers)
+        writer.write(
+            f"HTTP/1.1 {status}\r\ncontent-type: application/json\r\n{extra}"
+            f"content-length: {len(content)}\r\n\r\n".encode('latin-1') + content
+        )
+
+    def refuse(self):
+        """The (status, payload, headers) a completion is turned away with, or None to serve it."""
+        now = time.monotonic()
+        while self.accepted and self.accepted[0] <= now - self.window:
+            self.accepted.popleft()
+        wait = None
+        if self.limit and len(self.accepted) >= self.limit:
+            wait = self.accepted[0] + self.window - now
+        elif self.max_concurrent and self.in_flight >= self.max_concurrent:
+            wait = self.latency
+        if wait is not None:
+            self.counts['throttled'] += 1
+            headers = [('retry-after', max(1, math.ceil(wait))), ('retry-after-ms', int(wait * 1000))]
+            return ("429 Too Many Requests",
+                    {'error': {'message': "Rate limit reached", 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                    headers if self.retry_after else [])
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.counts['errors'] += 1
+            return "503 Service Unavailable", {'error': {'message': "The server is overloaded", 'type': 'server_error'}}, []
+        self.accepted.append(now)
+        return None
+
+    def first_token_delay(self, request):
+        prompt_tokens = len(request['messages'][-1]['content']) // 4
+        return self.latency + prompt_tokens / 1000 * self.prefill_ms_per_1k / 1000
+
+    async def respond(self, path, body):
+        if path.endswith('/chat/completions'):
+            request = json.loads(body)
+            await asyncio.sleep(self.first_token_delay(request) + self.token_interval * (len(self.words) - 1))
+            self.counts['completed'] += 1
+            return "200 OK", completion(request, ' '.join(self.words))
+        if path == '/stats':
+            return "200 OK", {'requests': self.requests, **self.counts}
+        return "404 Not Found", {'error': {'message': f"no route {path}"}}
+
+    async def stream(self, request, writer):
+        """Send the answer a word at a time as chunked server-sent events, ending with [DONE]."""
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n")
+
+        def send(data):
+            event = f"data: {data}\n\n".encode('utf-8')
+            writer.write(f"{len(event):x}\r\n".encode('latin-1') + event + b"\r\n")
+
+        await asyncio.sleep(self.first_token_delay(request))
+        for i, word in enumerate(self.words):
+            if i:
+                await asyncio.sleep(self.token_interval)
+            send(json.dumps(chunk(request, word if i == 0 else ' ' + word)))
+            await writer.drain()
+        send(json.dumps(chunk(request, None, 'stop')))
+        send('[DONE]')
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def serve(port, latency, **options):
+    stub = StubServer(latency, **options)
+    server = await asyncio.start_server(stub.handle, '127.0.0.1', port)
+    print(server.sockets[0].getsockname()[1], flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def start_stub(latency, extra_args=()):
+    """Run the stub in a child process and point the OpenAI client at it; returns the process."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--port', '0', '--latency', str(latency), *extra_args],
+        stdout=subprocess.PIPE, text=True,
+    )
+    port = int(process.stdout.readline())
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-stub')
+    return process
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve stub OpenAI chat completions.")
+    arg_parser.add_argument('--port', type=int, default=8089)
+    arg_parser.add_argument('--latency', type=float, default=0.5, help="seconds per completion")
+    arg_parser.add_argument('--prefill-ms-per-1k', type=float, default=0.0,
+                            help="extra milliseconds per thousand prompt tokens")
+    arg_parser.add_argument('--token-interval', type=float, default=0.0, help="seconds between answer words")
+    arg_parser.add_argument('--words', type=int, default=0, help="answer length in words (default: a short sentence)")
+    arg_parser.add_argument('--limit', type=int, default=0, help="completions allowed per window (default: no limit)")
+    arg_parser.add_argument('--window', type=float, default=60.0, help="seconds the --limit applies to")
+    arg_parser.add_argument('--max-concurrent', type=int, default=0,
+                            help="completions served at once before the rest get 429 (default: no limit)")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of completions failing with 503")
+    arg_parser.add_argument('--no-retry-after', dest='retry_after', action='store_false',
+                            help="send 429s without a Retry-After header")
+    arg_parser.add_argument('--seed', type=int, default=0, help="seed for the injected errors")
+    args = arg_parser.parse_args()
+    try:
+        asyncio.run(serve(
+            args.port, args.latency, prefill_ms_per_1k=args.prefill_ms_per_1k, token_interval=args.token_interval,
+            words=args.words, limit=args.limit, window=args.window, max_concurrent=args.max_concurrent,
+            error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/query_parity.py
+#
+# Checks that the query backend collects exactly what walk() collects, and
+# compares the time both take. Run from the backend directory:
+#
+#   python benchmarks/query_parity.py path/to/project another_file.py
+#
+# Exits with status 1 if any file differs between the two backends.
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.code_analyzer import get_parser, query_walk, walk
+
+
+def iter_python_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith('.py'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def timed(extract, tree, source, count_node_types):
+    start = time.perf_counter()
+    info = extract(tree.root_node, source, count_node_types=count_node_types)
+    return info, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare the walker and query analysis backends.")
+    arg_parser.add_argument('paths', nargs='+', help="Python files or directories to check")
+    arg_parser.add_argument('--no-node-types', action='store_true',
+                            help="skip node type counting in both backends")
+    args = arg_parser.parse_args()
+    count_node_types = not args.no_node_types
+
+    checked = 0
+    mismatches = []
+    walker_total = query_total = 0.0
+    for path in iter_python_files(args.paths):
+        with open(path, 'rb') as f:
+            source = f.read()
+        tree = get_parser().parse(source)
+
+        walker_info, walker_time = timed(walk, tree, source, count_node_types)
+        query_info, query_time = timed(query_walk, tree, source, count_node_types)
+        walker_total += walker_time
+        query_total += query_time
+        checked += 1
+
+        if walker_info != query_info:
+            walker_fields, query_fields = walker_info.to_dict(), query_info.to_dict()
+            differing = sorted(key for key in walker_fields if walker_fields[key] != query_fields[key])
+            mismatches.append((path, differing))
+
+    for path, keys in mismatches:
+        print(f"MISMATCH {path}: {', '.join(keys)}")
+    print(f"{checked} files, {len(mismatches)} mismatches")
+    if checked:
+        print(f"walker {walker_total * 1000:.1f} ms, query {query_total * 1000:.1f} ms "
+              f"({walker_total / query_total:.2f}x)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
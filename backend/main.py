@@ -1,12 +1,22 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import analyzer, gpt, mermaid
+from app.routers import analyzer, call_graph, gpt, mermaid, metrics, symbol_index
+from app.services import analysis_workers
+from app.services.llm_client import close_llm_client
+from app.services.stage_timing import StageTimingMiddleware
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+try:
+    import orjson  # noqa: F401
+    default_response_class = ORJSONResponse
+except ImportError:
+    default_response_class = JSONResponse
+
+app = FastAPI(default_response_class=default_response_class)
 
 # Configure CORS
 app.add_middleware(
@@ -15,9 +25,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # lets the browser read the stage timings and batch call counts of cross-origin responses
+    expose_headers=["Server-Timing", "X-LLM-Calls"],
 )
+# stage timers for the Server-Timing header and /metrics
+app.add_middleware(StageTimingMiddleware)
 
 # Include routers
 app.include_router(analyzer.router)
+app.include_router(call_graph.router)
+app.include_router(symbol_index.router)
 app.include_router(gpt.router)
-app.include_router(mermaid.router)
\ No newline at end of file
+app.include_router(mermaid.router)
+app.include_router(metrics.router)
+
+@app.on_event("startup")
+def start_analysis_workers():
+    # spawning the analysis workers before the first upload arrives
+    analysis_workers.start_pool()
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    analysis_workers.shutdown_pool()
+
+@app.on_event("shutdown")
+async def close_llm_connections():
+    await close_llm_client()
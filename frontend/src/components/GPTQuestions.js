@@ -12,6 +12,33 @@ const PREDEFINED_QUESTIONS = [
   "How many functions are related in both app.py and api.py?"
 ];
 
+// Reads a /gpt/stream response, calling onDelta with each piece of the answer,
+// and resolves with the saved response carried by the final "done" event
+const readAnswerStream = async (response, onDelta) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || 'null');
+      if (event === 'delta') onDelta(data.text);
+      else if (event === 'done') return data;
+      else if (event === 'error') throw new Error(data.detail);
+    }
+  }
+  throw new Error('The answer stream ended early');
+};
+
 function GPTQuestions({ analysisData }) {
   const [question, setQuestion] = useState('');
   const [gptResponse, setGptResponse] = useState(null);
@@ -46,9 +73,11 @@ function GPTQuestions({ analysisData }) {
 
     setLoading(true);
     setError(null);
+    setGptResponse('');
 
     try {
-      const response = await fetch('http://localhost:8000/gpt/', {
+      // the answer arrives as server-sent events and is shown as it is written
+      const response = await fetch('http://localhost:8000/gpt/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ analysis_data: analysisData, question }),
@@ -58,7 +87,7 @@ function GPTQuestions({ analysisData }) {
         throw new Error('Failed to get response from GPT');
       }
 
-      const result = await response.json();
+      const result = await readAnswerStream(response, (text) => setGptResponse(prev => prev + text));
       const newInteraction = {
         question,
         response: result.response,
@@ -100,9 +129,10 @@ function GPTQuestions({ analysisData }) {
       }
 
       const results = await response.json();
+      // a question that failed comes back with an error; the others are still answered
       const newInteractions = results.map(result => ({
         question: result.question,
-        response: result.response,
+        response: result.error ? `Error: ${result.error}` : result.response,
         timestamp: result.timestamp,
         file_path: result.file_path
       }));